@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .metrics import cache_requests
+from .models import TeacherClass, User
+
+
+# Without EDUPOINTX_SECRET_KEY every restart signs everyone out, and several
+# app processes would not accept each other's tokens.
+SECRET_KEY = os.getenv("EDUPOINTX_SECRET_KEY", "").encode("utf-8") or secrets.token_bytes(32)
+TOKEN_TTL_SECONDS = int(os.getenv("EDUPOINTX_TOKEN_TTL", str(12 * 60 * 60)))
+CLASS_CACHE_TTL_SECONDS = float(os.getenv("EDUPOINTX_AUTH_CACHE_TTL", "300"))
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: int
+    role: str
+    teacher_id: int | None
+    student_id: int | None
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == "admin"
+
+
+def _b64encode(value: bytes) -> str:
+    return base64.urlsafe_b64encode(value).decode("ascii").rstrip("=")
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def _sign(body: str) -> str:
+    return _b64encode(hmac.new(SECRET_KEY, body.encode("ascii"), hashlib.sha256).digest())
+
+
+def issue_token(user: User, ttl: int = TOKEN_TTL_SECONDS) -> str:
+    claims = {
+        "uid": user.id,
+        "role": user.role,
+        "tid": user.teacher_id,
+        "sid": user.student_id,
+        "exp": int(time.time()) + ttl,
+    }
+    body = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    return f"{body}.{_sign(body)}"
+
+
+def decode_token(token: str) -> Principal:
+    body, _, signature = token.partition(".")
+    if not body or not hmac.compare_digest(signature, _sign(body)):
+        raise InvalidToken("Invalid session token.")
+    try:
+        claims = json.loads(_b64decode(body))
+        principal = Principal(int(claims["uid"]), str(claims["role"]), claims.get("tid"), claims.get("sid"))
+        expires_at = int(claims["exp"])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise InvalidToken("Invalid session token.") from exc
+    if expires_at < time.time():
+        raise InvalidToken("Session expired. Please log in again.")
+    return principal
+
+
+class TeacherClassCache:
+    """Assigned classes per teacher, kept for a TTL and dropped when assignments change."""
+
+    def __init__(self, ttl: float = CLASS_CACHE_TTL_SECONDS) -> None:
+        self.ttl = ttl
+        self._entries: dict[int, tuple[float, frozenset[str]]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, teacher_id: int) -> frozenset[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(teacher_id)
+            generation = self._generation
+        if entry is not None and entry[0] > now:
+            cache_requests.inc("teacher_classes", "hit")
+            return entry[1]
+        cache_requests.inc("teacher_classes", "miss")
+        classes = frozenset(db.scalars(select(TeacherClass.class_name).where(TeacherClass.teacher_id == teacher_id)))
+        with self._lock:
+            # Skip the store if an assignment changed while we were reading.
+            if generation == self._generation:
+                self._entries[teacher_id] = (now + self.ttl, classes)
+        return classes
+
+    def invalidate(self, teacher_id: int | None = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if teacher_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(teacher_id, None)
+
+
+teacher_class_cache = TeacherClassCache()
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import csv
+import os
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from typing import IO
+
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.orm import Session
+
+from .ledger import chunked, credit_balances
+from .models import Activity, Student
+from .rollups import record_activities
+
+
+CSV_MAX_ROWS = int(os.getenv("EDUPOINTX_CSV_MAX_ROWS", "10000"))
+CSV_MAX_ERRORS = 100
+MIN_POINTS = 1
+MAX_POINTS = 100
+
+activities = Activity.__table__
+
+
+class CsvFormatError(ValueError):
+    pass
+
+
+def award_points(
+    session: Session, teacher_id: int | None, awards: Iterable[tuple[int, str, str, str, int]]
+) -> int:
+    """Insert one activity per (student_id, class_name, category, reason, points) and credit balances.
+
+    Rows go in through executemany, in chunks, and are added to the daily
+    class rollups. They share one timestamp so the rollup day always matches
+    the rows. The caller commits.
+    """
+    awarded_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    awards = list(awards)
+    rows = [
+        {
+            "student_id": student_id,
+            "teacher_id": teacher_id,
+            "category": category,
+            "reason": reason,
+            "points": points,
+            "created_at": awarded_at,
+        }
+        for student_id, _class_name, category, reason, points in awards
+    ]
+    if not rows:
+        return 0
+    for chunk in chunked(rows):
+        session.execute(insert(activities), chunk)
+    totals: dict[int, int] = defaultdict(int)
+    for row in rows:
+        totals[row["student_id"]] += row["points"]
+    credit_balances(session, totals)
+    record_activities(
+        session,
+        awarded_at.date(),
+        ((class_name, category, points) for _student_id, class_name, category, _reason, points in awards),
+    )
+    return len(rows)
+
+
+def _clean(row: dict, *names: str) -> str:
+    for name in names:
+        value = row.get(name)
+        if value is not None and value.strip():
+            return value.strip()
+    return ""
+
+
+def parse_award_csv(stream: IO[str], max_rows: int = CSV_MAX_ROWS) -> tuple[list[dict], list[dict]]:
+    """Read award rows from CSV text without loading the whole file.
+
+    Columns: ``student_id`` or ``name`` plus ``class_name``, then ``category``,
+    ``points`` and ``reason``. Returns (parsed rows, row errors); row numbers
+    count the header as row 1.
+    """
+    reader = csv.DictReader(stream)
+    headers = {(name or "").strip().lower() for name in reader.fieldnames or []}
+    if not headers:
+        raise CsvFormatError("The CSV file is empty.")
+    missing = {"category", "points", "reason"} - headers
+    if missing:
+        raise CsvFormatError(f"Missing column(s): {', '.join(sorted(missing))}.")
+    if "student_id" not in headers and not ({"name", "class_name"} <= headers or {"name", "class"} <= headers):
+        raise CsvFormatError("Add a student_id column, or name and class_name columns.")
+
+    rows: list[dict] = []
+    errors: list[dict] = []
+    for line_number, raw in enumerate(reader, start=2):
+        if len(rows) + len(errors) >= max_rows:
+            raise CsvFormatError(f"Upload at most {max_rows} rows at once.")
+        row = {(key or "").strip().lower(): value for key, value in raw.items() if isinstance(value, str)}
+        if not any(value.strip() for value in row.values()):
+            continue
+        parsed = {
+            "row": line_number,
+            "student_id": None,
+            "name": _clean(row, "name"),
+            "class_name": _clean(row, "class_name", "class"),
+            "category": _clean(row, "category"),
+            "reason": _clean(row, "reason"),
+        }
+        student_id = _clean(row, "student_id")
+        points = _clean(row, "points")
+        if student_id:
+            if not student_id.isdigit():
+                errors.append({"row": line_number, "error": f"Invalid student_id {student_id!r}."})
+                continue
+            parsed["student_id"] = int(student_id)
+        elif not (parsed["name"] and parsed["class_name"]):
+            errors.append({"row": line_number, "error": "Give a student_id, or a name and class_name."})
+            continue
+        if not parsed["category"] or not parsed["reason"]:
+            errors.append({"row": line_number, "error": "Category and reason are required."})
+            continue
+        try:
+            parsed["points"] = int(points)
+        except ValueError:
+            errors.append({"row": line_number, "error": f"Invalid points {points!r}."})
+            continue
+        if not MIN_POINTS <= parsed["points"] <= MAX_POINTS:
+            errors.append({"row": line_number, "error": f"Points must be between {MIN_POINTS} and {MAX_POINTS}."})
+            continue
+        rows.append(parsed)
+    return rows, errors
+
+
+def resolve_award_students(session: Session, rows: list[dict]) -> tuple[dict[int, tuple[int, str]], list[dict]]:
+    """Map each parsed row to (student_id, class_name) with one lookup per chunk of keys."""
+    ids = sorted({row["student_id"] for row in rows if row["student_id"] is not None})
+    keys = sorted({(row["name"].lower(), row["class_name"].lower()) for row in rows if row["student_id"] is None})
+
+    by_id: dict[int, str] = {}
+    for chunk in chunked(ids):
+        by_id.update(session.execute(select(Student.id, Student.class_name).where(Student.id.in_(chunk))).tuples().all())
+    by_key: dict[tuple[str, str], list[tuple[int, str]]] = defaultdict(list)
+    lowered = tuple_(func.lower(Student.name), func.lower(Student.class_name))
+    for chunk in chunked(keys, 250):
+        for student_id, name, class_name in session.execute(
+            select(Student.id, Student.name, Student.class_name).where(lowered.in_(chunk))
+        ):
+            by_key[(name.lower(), class_name.lower())].append((student_id, class_name))
+
+    resolved: dict[int, tuple[int, str]] = {}
+    errors: list[dict] = []
+    for row in rows:
+        if row["student_id"] is not None:
+            if row["student_id"] in by_id:
+                resolved[row["row"]] = (row["student_id"], by_id[row["student_id"]])
+            else:
+                errors.append({"row": row["row"], "error": f"Student {row['student_id']} not found."})
+            continue
+        matches = by_key.get((row["name"].lower(), row["class_name"].lower()), [])
+        if len(matches) == 1:
+            resolved[row["row"]] = matches[0]
+        elif matches:
+            errors.append(
+                {"row": row["row"], "error": f"More than one {row['name']} in {row['class_name']}; use student_id."}
+            )
+        else:
+            errors.append({"row": row["row"], "error": f"{row['name']} not found in {row['class_name']}."})
+    return resolved, errors
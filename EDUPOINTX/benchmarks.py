@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import argparse
+import io
+import itertools
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+
+import sqlalchemy
+from PIL import Image
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from .auth import Principal
+from .database import DATA_DIR, create_profile_engine
+from .main import (
+    ActivityBulkCreate,
+    RedemptionDecisionItem,
+    RedemptionDecisionRequest,
+    add_bulk_activities,
+    build_admin_dashboard,
+    build_student_dashboard,
+    build_teacher_dashboard,
+    decide_redemptions,
+)
+from .migrations import run_migrations
+from .models import Redemption, Reward, Student, StudentBalance, Teacher
+from .qr import QR_ACTIONS, QrCardManifest, generate_qr_card, qr_payload, render_card_image, render_qr_image
+from .qr_decode import decode_qr_strings
+from .scale_dataset import PRESETS, generate_dataset
+
+
+BENCH_DIR = DATA_DIR / "benchmarks"
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_OUTPUT = BENCH_DIR / "results.json"
+DECIDE_BATCH = 100
+PHOTO_WIDTH = 3000
+
+ADMIN = Principal(user_id=0, role="admin", teacher_id=None, student_id=None)
+
+
+class StatementCounter:
+    def __init__(self, target_engine) -> None:
+        self.count = 0
+        event.listen(target_engine, "before_cursor_execute", self._count)
+
+    def _count(self, *_args) -> None:
+        self.count += 1
+
+
+def measure(run: Callable[[], object], repeat: int, counter: StatementCounter | None = None, setup=None) -> dict:
+    """Median and best wall time, statements per call and peak traced memory of ``run``.
+
+    ``setup`` runs before every call and is not measured. Memory is traced on
+    a separate call so tracing does not inflate the timings.
+    """
+    if setup:
+        setup()
+    run()
+    timings: list[float] = []
+    statements: list[int] = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        if counter:
+            counter.count = 0
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+        statements.append(counter.count if counter else 0)
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "statements": max(statements),
+        "peak_kib": peak // 1024,
+        "repeat": repeat,
+    }
+
+
+def prepare_dataset(preset: str, seed: int, cache_dir: Path = BENCH_DIR) -> Path:
+    """Generate the preset once and keep it; every run works on a copy."""
+    path = cache_dir / f"{preset}-seed{seed}.db"
+    if path.exists():
+        return path
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".partial")
+    partial.unlink(missing_ok=True)
+    target_engine = create_profile_engine(f"sqlite:///{partial.as_posix()}")
+    try:
+        generate_dataset(PRESETS[preset], seed=seed, target_engine=target_engine)
+    finally:
+        target_engine.dispose()
+    partial.replace(path)
+    return path
+
+
+def dataset_cases(preset: str, dataset: Path, workdir: Path, repeat: int, only: list[str]) -> dict[str, dict]:
+    working_copy = workdir / f"{preset}.db"
+    shutil.copyfile(dataset, working_copy)
+    target_engine = create_profile_engine(f"sqlite:///{working_copy.as_posix()}")
+    run_migrations(target_engine)
+    Session = sessionmaker(bind=target_engine, autoflush=False, future=True)
+    counter = StatementCounter(target_engine)
+
+    with Session() as session:
+        # The busiest student is the worst case for history-heavy views.
+        student_id = session.scalar(
+            select(StudentBalance.student_id).order_by(StudentBalance.earned_points.desc()).limit(1)
+        )
+        class_name = session.scalar(select(Student.class_name).where(Student.id == student_id))
+        class_ids = list(session.scalars(select(Student.id).where(Student.class_name == class_name)))
+        top_earners = list(
+            session.scalars(
+                select(StudentBalance.student_id).order_by(StudentBalance.live_points.desc()).limit(DECIDE_BATCH)
+            )
+        )
+        cheapest_reward = session.scalar(select(Reward.id).order_by(Reward.cost).limit(1))
+        teacher_id = session.scalar(select(Teacher.id).order_by(Teacher.id).limit(1))
+
+    pending_ids: list[int] = []
+
+    def add_pending() -> None:
+        with Session() as session:
+            # Refill stock so every call approves the whole batch instead of running dry.
+            session.execute(update(Reward).where(Reward.id == cheapest_reward).values(stock=DECIDE_BATCH))
+            result = session.execute(
+                insert(Redemption).returning(Redemption.id),
+                [{"student_id": sid, "reward_id": cheapest_reward, "status": "pending"} for sid in top_earners],
+            )
+            pending_ids[:] = result.scalars().all()
+            session.commit()
+
+    def with_session(build: Callable) -> Callable[[], object]:
+        def run():
+            with Session() as session:
+                return build(session)
+
+        return run
+
+    bulk_payload = ActivityBulkCreate(student_ids=class_ids, category="Sports", reason="Benchmark", points=5)
+    cases: dict[str, tuple[Callable[[], object], Callable[[], None] | None]] = {
+        "student_dashboard": (with_session(lambda db: build_student_dashboard(db, student_id)), None),
+        "teacher_dashboard": (with_session(lambda db: build_teacher_dashboard(db, class_name)), None),
+        "admin_dashboard": (with_session(lambda db: build_admin_dashboard(db, class_name)), None),
+        "bulk_award": (with_session(lambda db: add_bulk_activities(teacher_id, bulk_payload, ADMIN, db)), None),
+        "decide_redemptions": (
+            with_session(
+                lambda db: decide_redemptions(
+                    RedemptionDecisionRequest(
+                        items=[RedemptionDecisionItem(id=rid, decision="Approve") for rid in pending_ids]
+                    ),
+                    ADMIN,
+                    db,
+                )
+            ),
+            add_pending,
+        ),
+    }
+    results = {}
+    try:
+        for name, (run, setup) in cases.items():
+            if only and not any(pattern in name for pattern in only):
+                continue
+            results[f"{preset}/{name}"] = measure(run, repeat, counter, setup)
+    finally:
+        target_engine.dispose()
+    return results
+
+
+def _phone_photo_of_card(student_id: int) -> bytes:
+    card = render_card_image([render_qr_image(qr_payload(student_id, action)) for action in QR_ACTIONS])
+    scale = PHOTO_WIDTH / card.width
+    photo = card.convert("RGB").resize((PHOTO_WIDTH, int(card.height * scale)), Image.Resampling.BILINEAR)
+    buffer = io.BytesIO()
+    photo.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def qr_cases(workdir: Path, repeat: int, only: list[str]) -> dict[str, dict]:
+    photo = _phone_photo_of_card(1)
+    runs = itertools.count()
+
+    def render_card() -> None:
+        # A fresh directory each time, so every call renders and writes all files.
+        manifest = QrCardManifest(workdir / f"cards-{next(runs)}" / "manifest.json")
+        generate_qr_card(1, "Bench Student", "1 Bench", manifest)
+
+    cases = {
+        "decode_qr_strings": lambda: decode_qr_strings(photo),
+        "generate_qr_card": render_card,
+    }
+    return {
+        f"qr/{name}": measure(run, repeat)
+        for name, run in cases.items()
+        if not only or any(pattern in name for pattern in only)
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_ms: float, min_kib: int) -> list[str]:
+    """Human-readable regressions of ``results`` against ``baseline``.
+
+    Time and memory may grow by ``threshold`` (a fraction) and by at least the
+    noise floors before they count; any extra SQL statement counts.
+    """
+    regressions = []
+    for key, current in sorted(results.items()):
+        base = baseline.get(key)
+        if base is None:
+            continue
+        # Best-of-N time: noise on a busy machine only ever adds to it.
+        slower = current["min_ms"] - base["min_ms"]
+        if current["min_ms"] > base["min_ms"] * (1 + threshold) and slower >= min_ms:
+            regressions.append(f"{key}: best {base['min_ms']:.1f} ms -> {current['min_ms']:.1f} ms")
+        if current["statements"] > base["statements"]:
+            regressions.append(f"{key}: {base['statements']} -> {current['statements']} statements")
+        grown = current["peak_kib"] - base["peak_kib"]
+        if current["peak_kib"] > base["peak_kib"] * (1 + threshold) and grown >= min_kib:
+            regressions.append(f"{key}: peak {base['peak_kib']} KiB -> {current['peak_kib']} KiB")
+    return regressions
+
+
+def run_suite(presets: list[str], seed: int, repeat: int, only: list[str]) -> dict:
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory(prefix="edupointx-bench-") as tmp:
+        workdir = Path(tmp)
+        for preset in presets:
+            dataset = prepare_dataset(preset, seed)
+            results.update(dataset_cases(preset, dataset, workdir, repeat, only))
+        results.update(qr_cases(workdir, repeat, only))
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "seed": seed,
+            "presets": presets,
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dashboards, award paths and the QR pipeline.")
+    parser.add_argument("--presets", nargs="+", choices=list(PRESETS), default=list(PRESETS))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5, help="measured calls per case")
+    parser.add_argument("--only", nargs="*", default=[], help="run cases whose name contains any of these")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.5, help="allowed slowdown, as a fraction")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="ignore slowdowns smaller than this")
+    parser.add_argument("--min-kib", type=int, default=256, help="ignore memory growth smaller than this")
+    args = parser.parse_args()
+
+    report = run_suite(args.presets, args.seed, args.repeat, args.only)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
+
+    print(f"{'case':<32} {'median ms':>10} {'min ms':>10} {'stmts':>6} {'peak KiB':>9}")
+    for key, row in report["results"].items():
+        print(f"{key:<32} {row['median_ms']:>10.1f} {row['min_ms']:>10.1f} {row['statements']:>6} {row['peak_kib']:>9}")
+    print(f"Results written to {args.output}.")
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
+        print(f"Baseline saved to {args.baseline}.")
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+        regressions = compare(report["results"], baseline, args.threshold, args.min_ms, args.min_kib)
+        if regressions:
+            print(f"{len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}.")
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
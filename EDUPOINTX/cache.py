@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, TypeVar
+
+from .metrics import cache_requests
+
+
+DASHBOARD_CACHE_SIZE = int(os.getenv("EDUPOINTX_DASHBOARD_CACHE_SIZE", "256"))
+DASHBOARD_CACHE_TTL = float(os.getenv("EDUPOINTX_DASHBOARD_CACHE_TTL", "30"))
+SCHOOL_SCOPE = "*"
+
+T = TypeVar("T")
+
+
+def class_scope(class_name: str) -> str:
+    return f"class:{class_name}"
+
+
+class GenerationCache:
+    """LRU + TTL cache whose entries die when any scope they were built from is bumped.
+
+    Writers call ``bump`` after committing. Bumping a class also bumps the
+    school scope, so school-wide views see every change while one class's
+    views ignore writes to other classes. Values are shared between callers
+    and must not be mutated.
+    """
+
+    def __init__(
+        self, name: str = "dashboard", max_entries: int = DASHBOARD_CACHE_SIZE, ttl: float = DASHBOARD_CACHE_TTL
+    ) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, tuple[int, ...], object]] = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _snapshot(self, scopes: tuple[str, ...]) -> tuple[int, ...]:
+        return (self._epoch, *(self._generations.get(scope, 0) for scope in scopes))
+
+    def bump(self, *class_names: str) -> None:
+        with self._lock:
+            for scope in {*map(class_scope, class_names), SCHOOL_SCOPE}:
+                self._generations[scope] = self._generations.get(scope, 0) + 1
+
+    def bump_all(self) -> None:
+        with self._lock:
+            self._epoch += 1
+
+    def get_or_build(self, key: Hashable, scopes: tuple[str, ...], build: Callable[[], T]) -> T:
+        now = time.monotonic()
+        with self._lock:
+            snapshot = self._snapshot(scopes)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now and entry[1] == snapshot:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                cache_requests.inc(self.name, "hit")
+                return entry[2]
+            self.misses += 1
+        cache_requests.inc(self.name, "miss")
+        # Built outside the lock against the snapshot taken before reading, so a
+        # write that lands mid-build leaves an entry that is already stale.
+        value = build()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, snapshot, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+
+dashboard_cache = GenerationCache()
@@ -3,9 +3,11 @@ from __future__ import annotations
 import os
 from pathlib import Path
 
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
+from .metrics import metered_queue_pool, watch_engine
+
 
 BASE_DIR = Path(__file__).resolve().parent
 RENDER_DATA_DIR = Path("/var/data")
@@ -15,40 +17,102 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 DEFAULT_DB_PATH = DATA_DIR / "edupointx.db"
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DEFAULT_DB_PATH.as_posix()}")
 
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+IS_MEMORY_SQLITE = IS_SQLITE and (DATABASE_URL in {"sqlite://", "sqlite:///"} or ":memory:" in DATABASE_URL)
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+# Connection settings per deployment shape, picked with EDUPOINTX_DB_PROFILE.
+# "legacy" keeps SQLAlchemy's defaults; the others run SQLite in WAL mode so
+# dashboard reads no longer wait on award writes.
+DB_PROFILES: dict[str, dict] = {
+    "legacy": {},
+    "balanced": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            "mmap_size": 64 * 1024 * 1024,
+            "cache_size": -16000,
+        },
+        "pool": {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30},
+        "read_pool": {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30},
+    },
+    "throughput": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 10000,
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64000,
+        },
+        "pool": {"pool_size": 8, "max_overflow": 16, "pool_timeout": 30},
+        "read_pool": {"pool_size": 16, "max_overflow": 32, "pool_timeout": 30},
+    },
+    "durable": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "FULL",
+            "busy_timeout": 5000,
+            "cache_size": -8000,
+        },
+        "pool": {"pool_size": 5, "max_overflow": 5, "pool_timeout": 30},
+        "read_pool": {"pool_size": 5, "max_overflow": 5, "pool_timeout": 30},
+    },
+}
+DB_PROFILE_NAME = os.getenv("EDUPOINTX_DB_PROFILE", "balanced").strip().lower()
+if DB_PROFILE_NAME not in DB_PROFILES:
+    raise RuntimeError(f"Unknown EDUPOINTX_DB_PROFILE {DB_PROFILE_NAME!r}; choose one of: {', '.join(DB_PROFILES)}.")
+DB_PROFILE = DB_PROFILES[DB_PROFILE_NAME]
 
+connect_args = {"check_same_thread": False} if IS_SQLITE else {}
 
-class Base(DeclarativeBase):
-    pass
 
+def _apply_pragmas(target_engine, pragmas: dict) -> None:
+    @event.listens_for(target_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, _connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
 
-def ensure_legacy_sqlite_compatibility() -> None:
-    if not DATABASE_URL.startswith("sqlite"):
-        return
 
-    inspector = inspect(engine)
-    existing_tables = set(inspector.get_table_names())
+def _build_engine(name: str, pool: dict, pragmas: dict):
+    # In-memory SQLite uses a per-thread pool that takes no sizing arguments.
+    target_engine = create_engine(
+        DATABASE_URL,
+        connect_args=connect_args,
+        future=True,
+        **({} if IS_MEMORY_SQLITE else {"poolclass": metered_queue_pool(name), **pool}),
+    )
+    if IS_SQLITE and pragmas:
+        _apply_pragmas(target_engine, pragmas)
+    watch_engine(target_engine, name)
+    return target_engine
 
-    column_additions = {
-        "students": {
-            "gender": "ALTER TABLE students ADD COLUMN gender VARCHAR(20)",
-        },
-        "teachers": {
-            "gender": "ALTER TABLE teachers ADD COLUMN gender VARCHAR(20)",
-        },
-        "rewards": {
-            "source": "ALTER TABLE rewards ADD COLUMN source VARCHAR(30) DEFAULT 'School' NOT NULL",
-        },
+
+def create_profile_engine(url: str):
+    """An engine for another SQLite file with the active profile's pragmas, for offline tools."""
+    target_engine = create_engine(url, connect_args={"check_same_thread": False}, future=True)
+    if DB_PROFILE.get("pragmas"):
+        _apply_pragmas(target_engine, DB_PROFILE["pragmas"])
+    return target_engine
+
+
+engine = _build_engine("write", DB_PROFILE.get("pool", {}), DB_PROFILE.get("pragmas", {}))
+SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+# Dashboards read through their own pool. On SQLite the connections are also
+# query_only, so a stray write fails loudly instead of taking the write lock.
+if IS_SQLITE and not IS_MEMORY_SQLITE:
+    read_pragmas = {
+        name: value for name, value in DB_PROFILE.get("pragmas", {}).items() if name != "journal_mode"
     }
+    read_engine = _build_engine("read", DB_PROFILE.get("read_pool", {}), {**read_pragmas, "query_only": "ON"})
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False, future=True)
+
 
-    with engine.begin() as conn:
-        for table_name, additions in column_additions.items():
-            if table_name not in existing_tables:
-                continue
-            current_columns = {column["name"] for column in inspector.get_columns(table_name)}
-            for column_name, ddl in additions.items():
-                if column_name not in current_columns:
-                    conn.execute(text(ddl))
+class Base(DeclarativeBase):
+    pass
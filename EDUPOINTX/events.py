@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import os
+from typing import AsyncIterator
+
+
+EVENT_QUEUE_SIZE = int(os.getenv("EDUPOINTX_EVENT_QUEUE_SIZE", "100"))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EDUPOINTX_EVENT_HEARTBEAT", "15"))
+# What a student dashboard refreshes on; the only events sent without a staff token.
+STUDENT_EVENT_TYPES = frozenset({"points_awarded", "redemptions_decided", "stock_changed"})
+
+
+class Subscription:
+    def __init__(self, class_name: str | None, queue_size: int, event_types: frozenset[str] | None = None) -> None:
+        self.class_name = class_name
+        self.event_types = event_types
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=queue_size)
+
+    def wants(self, event: dict) -> bool:
+        if self.event_types is not None and event["type"] not in self.event_types:
+            return False
+        # School-wide events (no classes) reach everyone; class events reach
+        # that class's subscribers and the unfiltered ones.
+        return self.class_name is None or not event["class_names"] or self.class_name in event["class_names"]
+
+    def offer(self, event: dict) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A slow client gets one "resync" instead of an unbounded backlog.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"id": event["id"], "type": "resync", "class_names": [], "data": {}})
+
+
+class EventBroker:
+    """Fans change events out to SSE subscribers on the event loop.
+
+    ``publish`` may be called from any thread, including the threadpool that
+    runs sync endpoints.
+    """
+
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE) -> None:
+        self.queue_size = queue_size
+        self._subscribers: set[Subscription] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._ids = itertools.count(1)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, data: dict, class_names: list[str] | tuple[str, ...] = ()) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self._subscribers:
+            return
+        event = {"id": next(self._ids), "type": event_type, "class_names": sorted(set(class_names)), "data": data}
+        loop.call_soon_threadsafe(self._fan_out, event)
+
+    def _fan_out(self, event: dict) -> None:
+        for subscription in list(self._subscribers):
+            if subscription.wants(event):
+                subscription.offer(event)
+
+    def subscribe(self, class_name: str | None = None, event_types: frozenset[str] | None = None) -> Subscription:
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(class_name, self.queue_size, event_types)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+
+event_broker = EventBroker()
+
+
+def format_sse(event: dict) -> str:
+    payload = json.dumps({**event["data"], "class_names": event["class_names"]}, separators=(",", ":"))
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
+
+
+async def event_stream(
+    subscription: Subscription,
+    is_disconnected,
+    heartbeat: float = EVENT_HEARTBEAT_SECONDS,
+) -> AsyncIterator[str]:
+    try:
+        yield "retry: 5000\nevent: ready\ndata: {}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                yield ": ping\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        event_broker.unsubscribe(subscription)
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import csv
+import io
+import os
+from collections.abc import Callable, Iterator
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import Select, func, select
+
+from .database import read_engine
+from .models import (
+    Activity,
+    ArchivedActivity,
+    ArchivedRedemption,
+    Redemption,
+    Reward,
+    Student,
+    StudentBalance,
+    Teacher,
+)
+
+
+EXPORT_BATCH_ROWS = int(os.getenv("EDUPOINTX_EXPORT_BATCH_ROWS", "1000"))
+EXPORT_KINDS = ("activities", "redemptions", "balances")
+
+# Spreadsheet apps run cells that start with these as formulas.
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def _window(stmt: Select, column, start: date | None, end: date | None) -> Select:
+    if start is not None:
+        stmt = stmt.where(column >= datetime.combine(start, time.min))
+    if end is not None:
+        stmt = stmt.where(column < datetime.combine(end + timedelta(days=1), time.min))
+    return stmt
+
+
+def activities_query(
+    class_name: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    source: type[Activity] | type[ArchivedActivity] = Activity,
+) -> Select:
+    stmt = (
+        select(
+            source.id,
+            source.created_at,
+            source.student_id,
+            Student.name,
+            Student.class_name,
+            Teacher.name,
+            source.category,
+            source.reason,
+            source.points,
+        )
+        .join(Student, Student.id == source.student_id)
+        .outerjoin(Teacher, Teacher.id == source.teacher_id)
+        .order_by(source.created_at, source.id)
+    )
+    if class_name:
+        stmt = stmt.where(Student.class_name == class_name)
+    return _window(stmt, source.created_at, start, end)
+
+
+def redemptions_query(
+    class_name: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    source: type[Redemption] | type[ArchivedRedemption] = Redemption,
+) -> Select:
+    stmt = (
+        select(
+            source.id,
+            source.created_at,
+            source.student_id,
+            Student.name,
+            Student.class_name,
+            Reward.name,
+            # What an approval actually deducted; undecided requests show the current price.
+            func.coalesce(source.charged_points, Reward.cost),
+            source.status,
+        )
+        .join(Student, Student.id == source.student_id)
+        .join(Reward, Reward.id == source.reward_id)
+        .order_by(source.created_at, source.id)
+    )
+    if class_name:
+        stmt = stmt.where(Student.class_name == class_name)
+    return _window(stmt, source.created_at, start, end)
+
+
+def balances_query(class_name: str | None = None, start: date | None = None, end: date | None = None) -> Select:
+    stmt = (
+        select(
+            Student.id,
+            Student.name,
+            Student.class_name,
+            StudentBalance.earned_points,
+            StudentBalance.spent_points,
+            StudentBalance.live_points,
+        )
+        .join(StudentBalance, StudentBalance.student_id == Student.id)
+        .order_by(Student.class_name, Student.name, Student.id)
+    )
+    if class_name:
+        stmt = stmt.where(Student.class_name == class_name)
+    return stmt
+
+
+# kind -> (header, query builder, archive table the builder can also read from)
+EXPORTS: dict[str, tuple[list[str], Callable[..., Select], type | None]] = {
+    "activities": (
+        ["id", "date", "student_id", "student_name", "class_name", "teacher_name", "category", "reason", "points"],
+        activities_query,
+        ArchivedActivity,
+    ),
+    "redemptions": (
+        ["id", "date", "student_id", "student_name", "class_name", "reward_name", "cost", "status"],
+        redemptions_query,
+        ArchivedRedemption,
+    ),
+    "balances": (
+        ["student_id", "student_name", "class_name", "earned_points", "spent_points", "live_points"],
+        balances_query,
+        None,
+    ),
+}
+
+
+def stream_csv(
+    kind: str,
+    class_name: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    batch_rows: int = EXPORT_BATCH_ROWS,
+) -> Iterator[str]:
+    """Yield CSV text one batch of rows at a time, reading through a streaming cursor.
+
+    Opens its own read connection: the response body is sent after request
+    dependencies have been torn down, so it cannot borrow their session.
+    Rows from closed terms are read from the archive ahead of the current term.
+    """
+    header, build_query, archive = EXPORTS[kind]
+    queries = [build_query(class_name, start, end)]
+    if archive is not None:
+        queries.insert(0, build_query(class_name, start, end, source=archive))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    with read_engine.connect() as conn:
+        for query in queries:
+            result = conn.execution_options(yield_per=batch_rows).execute(query)
+            for partition in result.partitions():
+                writer.writerows([_cell(value) for value in row] for row in partition)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import date, timedelta
+
+from sqlalchemy import String, and_, desc, func, or_, select, type_coerce, union_all
+from sqlalchemy.orm import Session
+
+from .models import Activity, ArchivedActivity, ArchivedRedemption, Redemption, Reward
+
+
+TREND_GRANULARITIES = ("day", "week", "month")
+DEFAULT_TREND_DAYS = 30
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _raw(column):
+    # Compare timestamps as the text SQLite stores them. Rows written with
+    # CURRENT_TIMESTAMP and rows written from Python differ in precision, so
+    # binding a datetime would not round-trip a cursor exactly.
+    return type_coerce(column, String)
+
+
+def encode_cursor(created_at: str, row_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at, row_id]).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return str(created_at), int(row_id)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor("Invalid cursor.") from exc
+
+
+def _keyset(created_at_column, id_column, cursor: str | None):
+    if not cursor:
+        return None
+    created_at, row_id = decode_cursor(cursor)
+    raw = _raw(created_at_column)
+    return or_(raw < created_at, and_(raw == created_at, id_column < row_id))
+
+
+def _page(rows: list, limit: int, to_item) -> dict:
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].raw_created_at, rows[-1].id) if has_more and rows else None
+    return {"items": [to_item(row) for row in rows], "next_cursor": next_cursor}
+
+
+def _newest_first(branches: list, limit: int):
+    """One page across the hot and archive tables.
+
+    Each branch takes its own ``limit + 1`` newest rows off its index before
+    the two are merged, so a page never scans a whole term's history.
+    """
+    merged = union_all(
+        *(
+            select(query.order_by(desc(model.created_at), desc(model.id)).limit(limit + 1).subquery())
+            for model, query in branches
+        )
+    ).subquery()
+    return select(merged).order_by(desc(merged.c.created_at), desc(merged.c.id)).limit(limit + 1)
+
+
+def activity_page(db: Session, student_id: int, limit: int = 20, cursor: str | None = None) -> dict:
+    branches = []
+    for model in (Activity, ArchivedActivity):
+        query = select(
+            model.id,
+            model.category,
+            model.reason,
+            model.points,
+            model.created_at,
+            _raw(model.created_at).label("raw_created_at"),
+        ).where(model.student_id == student_id)
+        keyset = _keyset(model.created_at, model.id, cursor)
+        if keyset is not None:
+            query = query.where(keyset)
+        branches.append((model, query))
+    rows = db.execute(_newest_first(branches, limit)).all()
+    return _page(
+        rows,
+        limit,
+        lambda row: {
+            "id": row.id,
+            "category": row.category,
+            "reason": row.reason,
+            "points": row.points,
+            "date": row.created_at.isoformat(),
+        },
+    )
+
+
+def redemption_page(db: Session, student_id: int, limit: int = 20, cursor: str | None = None) -> dict:
+    branches = []
+    for model in (Redemption, ArchivedRedemption):
+        query = (
+            select(
+                model.id,
+                Reward.name,
+                model.status,
+                model.created_at,
+                _raw(model.created_at).label("raw_created_at"),
+            )
+            .join(Reward, Reward.id == model.reward_id)
+            .where(model.student_id == student_id)
+        )
+        keyset = _keyset(model.created_at, model.id, cursor)
+        if keyset is not None:
+            query = query.where(keyset)
+        branches.append((model, query))
+    rows = db.execute(_newest_first(branches, limit)).all()
+    return _page(
+        rows,
+        limit,
+        lambda row: {
+            "id": row.id,
+            "reward": row.name,
+            "status": row.status,
+            "date": row.created_at.isoformat(),
+        },
+    )
+
+
+def _bucket(column, granularity: str):
+    if granularity == "week":
+        return func.date(column, "weekday 0", "-6 days")
+    if granularity == "month":
+        return func.strftime("%Y-%m-01", column)
+    return func.date(column)
+
+
+def default_trend_window(db: Session, student_id: int) -> tuple[date, date]:
+    """The DEFAULT_TREND_DAYS ending at the student's latest activity (or today)."""
+    latest = db.scalar(
+        select(
+            func.coalesce(
+                *(
+                    select(func.max(model.created_at)).where(model.student_id == student_id).scalar_subquery()
+                    for model in (Activity, ArchivedActivity)
+                )
+            )
+        )
+    )
+    end = latest.date() if latest else date.today()
+    return end - timedelta(days=DEFAULT_TREND_DAYS - 1), end
+
+
+def points_trend(db: Session, student_id: int, granularity: str, start: date, end: date) -> list[dict]:
+    if granularity not in TREND_GRANULARITIES:
+        raise ValueError(f"Granularity must be one of: {', '.join(TREND_GRANULARITIES)}.")
+    history = union_all(
+        *(
+            select(model.created_at, model.points).where(
+                model.student_id == student_id,
+                _raw(model.created_at) >= start.isoformat(),
+                _raw(model.created_at) < (end + timedelta(days=1)).isoformat(),
+            )
+            for model in (Activity, ArchivedActivity)
+        )
+    ).subquery()
+    bucket = _bucket(history.c.created_at, granularity)
+    rows = db.execute(
+        select(bucket, func.sum(history.c.points)).group_by(bucket).order_by(bucket)
+    ).all()
+    return [{"date": str(bucket_date), "points": int(points or 0)} for bucket_date, points in rows]
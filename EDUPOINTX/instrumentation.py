@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .metrics import http_request_seconds
+
+
+# Log requests that run more statements than this; 0 turns the guard off.
+QUERY_GUARD = int(os.getenv("EDUPOINTX_QUERY_GUARD", "50"))
+
+logger = logging.getLogger("edupointx.queries")
+
+_IN_LIST = re.compile(r"\((?:\?, )+\?\)")
+
+
+class RequestStats:
+    """What one request spent on the database and in named phases such as "qr-decode"."""
+
+    __slots__ = ("db_count", "db_ms", "statements", "timings")
+
+    def __init__(self) -> None:
+        self.db_count = 0
+        self.db_ms = 0.0
+        self.statements: Counter[str] = Counter()
+        self.timings: dict[str, float] = {}
+
+    def add_timing(self, name: str, ms: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + ms
+
+    def most_repeated(self) -> tuple[str, int]:
+        # Expanded IN lists differ in length; fold them so one N+1 loop is one entry.
+        folded: Counter[str] = Counter()
+        for statement, count in self.statements.items():
+            folded[_IN_LIST.sub("(?...)", " ".join(statement.split()))] += count
+        return folded.most_common(1)[0] if folded else ("", 0)
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("edupointx_request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, _cursor, statement, _parameters, _context, _executemany) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.statements[statement] += 1
+        conn.info.setdefault("edupointx_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, _cursor, _statement, _parameters, _context, _executemany) -> None:
+    stats = _current.get()
+    starts = conn.info.get("edupointx_query_start")
+    if stats is not None and starts:
+        stats.db_count += 1
+        stats.db_ms += (time.perf_counter() - starts.pop()) * 1000
+
+
+def instrument_engine(target_engine: Engine) -> None:
+    """Attribute every statement on ``target_engine`` to the request running it."""
+    if not event.contains(target_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    stats = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.add_timing(name, (time.perf_counter() - started) * 1000)
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that reports its rendering time as the "serialize" phase."""
+
+    def render(self, content) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
+
+
+def server_timing(stats: RequestStats, total_ms: float) -> str:
+    parts = [f"db;dur={stats.db_ms:.1f}", f'db-count;desc="{stats.db_count}"']
+    parts.extend(f"{name};dur={ms:.1f}" for name, ms in stats.timings.items())
+    parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """Pure ASGI middleware: per-request stats, a Server-Timing header, the query guard and latency metrics.
+
+    Headers go out when the response starts, so streamed responses report the
+    work done before their first byte. The latency histogram is labelled with
+    the route template, never the raw path, so ids do not explode its series.
+    """
+
+    def __init__(self, app, query_guard: int = QUERY_GUARD) -> None:
+        self.app = app
+        self.query_guard = query_guard
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total_ms = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(stats, total_ms).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            http_request_seconds.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status),
+            )
+            if self.query_guard and stats.db_count > self.query_guard:
+                statement, repeats = stats.most_repeated()
+                logger.warning(
+                    "%s %s ran %d statements (guard %d); most repeated (%dx): %s",
+                    scope.get("method"),
+                    getattr(route, "path", scope.get("path")),
+                    stats.db_count,
+                    self.query_guard,
+                    repeats,
+                    statement,
+                )
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from sqlalchemy import desc, func, select
+from sqlalchemy.orm import Session
+
+from .models import Student, StudentBalance
+
+
+def _ranked(class_name: str | None = None, student_scope_id: int | None = None):
+    """Every student in scope with balances, competition rank and a stable position."""
+    earned = func.coalesce(StudentBalance.earned_points, 0)
+    spent = func.coalesce(StudentBalance.spent_points, 0)
+    live = func.coalesce(StudentBalance.live_points, 0)
+    query = select(
+        Student.id.label("student_id"),
+        Student.name.label("student_name"),
+        Student.class_name.label("class_name"),
+        earned.label("earned_points"),
+        spent.label("spent_points"),
+        live.label("live_points"),
+        func.rank().over(order_by=desc(live)).label("rank"),
+        func.row_number().over(order_by=(desc(live), Student.name, Student.id)).label("position"),
+        func.count().over().label("total"),
+    ).outerjoin(StudentBalance, StudentBalance.student_id == Student.id)
+    if class_name is not None:
+        query = query.where(Student.class_name == class_name)
+    elif student_scope_id is not None:
+        query = query.where(
+            Student.class_name == select(Student.class_name).where(Student.id == student_scope_id).scalar_subquery()
+        )
+    return query.subquery("ranked")
+
+
+def _to_rows(result) -> list[dict[str, int | str]]:
+    return [
+        {
+            "student_id": row.student_id,
+            "student_name": row.student_name,
+            "class_name": row.class_name,
+            "earned_points": int(row.earned_points),
+            "spent_points": int(row.spent_points),
+            "live_points": int(row.live_points),
+            "rank": int(row.rank),
+        }
+        for row in result
+    ]
+
+
+def class_leaderboard(db: Session, class_name: str) -> list[dict[str, int | str]]:
+    ranked = _ranked(class_name)
+    return _to_rows(db.execute(select(ranked).order_by(ranked.c.position)))
+
+
+def leaderboard_page(db: Session, class_name: str | None = None, limit: int = 50, offset: int = 0) -> dict:
+    ranked = _ranked(class_name)
+    result = db.execute(select(ranked).order_by(ranked.c.position).limit(limit).offset(offset)).all()
+    if result:
+        total = int(result[0].total)
+    else:
+        total = int(db.scalar(select(func.count()).select_from(ranked)) or 0)
+    return {
+        "class_name": class_name,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "rows": _to_rows(result),
+    }
+
+
+def leaderboard_top(db: Session, class_name: str | None = None, k: int = 10) -> list[dict[str, int | str]]:
+    ranked = _ranked(class_name)
+    return _to_rows(db.execute(select(ranked).order_by(ranked.c.position).limit(k)))
+
+
+def leaderboard_bottom(db: Session, class_name: str | None = None, k: int = 10) -> list[dict[str, int | str]]:
+    """Lowest live points first."""
+    ranked = _ranked(class_name)
+    return _to_rows(db.execute(select(ranked).order_by(desc(ranked.c.position)).limit(k)))
+
+
+def leaderboard_around(db: Session, student_id: int, radius: int = 2, school_wide: bool = False) -> dict | None:
+    ranked = _ranked(student_scope_id=None if school_wide else student_id)
+    position = select(ranked.c.position).where(ranked.c.student_id == student_id).scalar_subquery()
+    result = db.execute(
+        select(ranked)
+        .where(ranked.c.position.between(position - radius, position + radius))
+        .order_by(ranked.c.position)
+    ).all()
+    rows = _to_rows(result)
+    me = next((row for row in rows if row["student_id"] == student_id), None)
+    if me is None:
+        return None
+    return {
+        "scope": "school" if school_wide else me["class_name"],
+        "total": int(result[0].total),
+        "student": me,
+        "neighbours": rows,
+    }
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Mapping
+
+from sqlalchemy import bindparam, exists, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from .models import Activity, OpeningBalance, Redemption, Student, StudentBalance
+
+
+CHUNK_SIZE = 500
+
+balances = StudentBalance.__table__
+students = Student.__table__
+
+
+def chunked(values: list, size: int = CHUNK_SIZE) -> Iterator[list]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def _opening(column, student_id_column):
+    # Closed terms are carried in as one row per student instead of being rescanned.
+    return func.coalesce(
+        select(column).where(OpeningBalance.student_id == student_id_column).scalar_subquery(), 0
+    )
+
+
+def _earned_total(student_id_column):
+    return _opening(OpeningBalance.earned_points, student_id_column) + (
+        select(func.coalesce(func.sum(Activity.points), 0))
+        .where(Activity.student_id == student_id_column)
+        .scalar_subquery()
+    )
+
+
+def _spent_total(student_id_column):
+    return _opening(OpeningBalance.spent_points, student_id_column) + (
+        select(func.coalesce(func.sum(Redemption.charged_points), 0))
+        .where(Redemption.student_id == student_id_column, Redemption.status == "approved")
+        .scalar_subquery()
+    )
+
+
+def _sync_total_points(session: Session, student_ids: list[int] | None = None) -> None:
+    """Mirror ledger balances onto the legacy ``students.total_points`` column."""
+    live = select(balances.c.live_points).where(balances.c.student_id == students.c.id).scalar_subquery()
+    stmt = update(students).values(total_points=live).where(
+        exists().where(balances.c.student_id == students.c.id)
+    )
+    if student_ids is None:
+        session.execute(stmt.where(students.c.total_points != live))
+        return
+    for chunk in chunked(student_ids):
+        session.execute(stmt.where(students.c.id.in_(chunk)))
+
+
+def seed_missing_balances(session: Session, student_ids: Iterable[int] | None = None) -> int:
+    """Create ledger rows from history; runs once per student, then balances are incremental."""
+    session.flush()
+    earned = _earned_total(Student.id)
+    spent = _spent_total(Student.id)
+    source = select(Student.id, earned, spent, earned - spent, literal(1)).where(
+        ~exists().where(StudentBalance.student_id == Student.id)
+    )
+    columns = ["student_id", "earned_points", "spent_points", "live_points", "version"]
+
+    if student_ids is None:
+        seeded = session.execute(insert(balances).from_select(columns, source)).rowcount or 0
+        if seeded:
+            _sync_total_points(session)
+        return seeded
+
+    ids = list(dict.fromkeys(student_ids))
+    seeded = 0
+    for chunk in chunked(ids):
+        seeded += session.execute(
+            insert(balances).from_select(columns, source.where(Student.id.in_(chunk)))
+        ).rowcount or 0
+    if seeded:
+        _sync_total_points(session, ids)
+    return seeded
+
+
+def _present_ids(session: Session, student_ids: list[int]) -> set[int]:
+    present: set[int] = set()
+    for chunk in chunked(student_ids):
+        present.update(
+            session.scalars(select(StudentBalance.student_id).where(StudentBalance.student_id.in_(chunk)))
+        )
+    return present
+
+
+def apply_balance_deltas(session: Session, deltas: Mapping[int, tuple[int, int]]) -> None:
+    """Add (earned, spent) deltas and bump versions; call after the source rows are added.
+
+    Students without a ledger row are seeded from history, which already includes
+    those rows, so their delta is not applied twice.
+    """
+    if not deltas:
+        return
+    session.flush()
+    student_ids = list(deltas)
+    present = _present_ids(session, student_ids)
+    missing = [student_id for student_id in student_ids if student_id not in present]
+    if missing:
+        seed_missing_balances(session, missing)
+
+    params = [
+        {"b_student_id": student_id, "b_earned": earned, "b_spent": spent}
+        for student_id, (earned, spent) in deltas.items()
+        if student_id in present
+    ]
+    if params:
+        session.execute(
+            update(balances)
+            .where(balances.c.student_id == bindparam("b_student_id"))
+            .values(
+                earned_points=balances.c.earned_points + bindparam("b_earned"),
+                spent_points=balances.c.spent_points + bindparam("b_spent"),
+                live_points=balances.c.live_points + bindparam("b_earned") - bindparam("b_spent"),
+                version=balances.c.version + 1,
+            ),
+            params,
+        )
+        _sync_total_points(session, [param["b_student_id"] for param in params])
+
+
+def credit_balances(session: Session, points_by_student: Mapping[int, int]) -> None:
+    """Add earned points like apply_balance_deltas, but with one UPDATE per distinct amount.
+
+    A class-wide award is a single ``WHERE student_id IN (...)`` statement per
+    chunk instead of one statement execution per student.
+    """
+    if not points_by_student:
+        return
+    session.flush()
+    student_ids = list(points_by_student)
+    present = _present_ids(session, student_ids)
+    missing = [student_id for student_id in student_ids if student_id not in present]
+    if missing:
+        seed_missing_balances(session, missing)
+
+    by_amount: dict[int, list[int]] = {}
+    for student_id, points in points_by_student.items():
+        if student_id in present:
+            by_amount.setdefault(points, []).append(student_id)
+    for points, ids in by_amount.items():
+        for chunk in chunked(ids):
+            session.execute(
+                update(balances)
+                .where(balances.c.student_id.in_(chunk))
+                .values(
+                    earned_points=balances.c.earned_points + points,
+                    live_points=balances.c.live_points + points,
+                    version=balances.c.version + 1,
+                )
+            )
+    _sync_total_points(session, [student_id for student_id in student_ids if student_id in present])
+
+
+def charge_balances(session: Session, charges: Mapping[int, int]) -> bool:
+    """Move points from live to spent where the live balance still covers the charge.
+
+    Returns False when any student's balance no longer covers it; the caller
+    should roll back. Rows must already exist (see seed_missing_balances).
+    """
+    if not charges:
+        return True
+    params = [{"b_student_id": student_id, "b_amount": amount} for student_id, amount in charges.items()]
+    result = session.execute(
+        update(balances)
+        .where(
+            balances.c.student_id == bindparam("b_student_id"),
+            balances.c.live_points >= bindparam("b_amount"),
+        )
+        .values(
+            spent_points=balances.c.spent_points + bindparam("b_amount"),
+            live_points=balances.c.live_points - bindparam("b_amount"),
+            version=balances.c.version + 1,
+        ),
+        params,
+    )
+    if result.rowcount != len(params):
+        return False
+    _sync_total_points(session, list(charges))
+    return True
+
+
+def touch_balances(session: Session, student_ids: Iterable[int]) -> None:
+    """Bump versions for changes that do not move points, such as a new or rejected request."""
+    apply_balance_deltas(session, {student_id: (0, 0) for student_id in student_ids})
+
+
+def get_live_points(session: Session, student_id: int) -> int:
+    live_points = session.scalar(
+        select(StudentBalance.live_points).where(StudentBalance.student_id == student_id)
+    )
+    if live_points is None:
+        seed_missing_balances(session, [student_id])
+        live_points = session.scalar(
+            select(StudentBalance.live_points).where(StudentBalance.student_id == student_id)
+        )
+    return int(live_points or 0)
+
+
+def rebuild_student_balances(session: Session, student_ids: Iterable[int] | None = None) -> None:
+    """Recompute balances from history. Used for repairs, never on the request path."""
+    session.flush()
+    earned = _earned_total(balances.c.student_id)
+    spent = _spent_total(balances.c.student_id)
+    stmt = update(balances).values(
+        earned_points=earned,
+        spent_points=spent,
+        live_points=earned - spent,
+        version=balances.c.version + 1,
+    )
+    if student_ids is None:
+        session.execute(stmt)
+        seed_missing_balances(session)
+        _sync_total_points(session)
+        return
+
+    ids = list(dict.fromkeys(student_ids))
+    for chunk in chunked(ids):
+        session.execute(stmt.where(balances.c.student_id.in_(chunk)))
+    seed_missing_balances(session, ids)
+    _sync_total_points(session, ids)
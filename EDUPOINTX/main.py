@@ -1,46 +1,125 @@
 from __future__ import annotations
 
-import re
+import hashlib
+import io
+from collections import Counter
+from datetime import date
 from pathlib import Path
 from urllib.parse import parse_qs, urlparse
 import base64
 
-import qrcode
-from PIL import Image
-from fastapi import Depends, FastAPI, File, HTTPException, UploadFile
+from fastapi import Depends, FastAPI, File, Form, Header, HTTPException, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
-from sqlalchemy import desc, func, select
+from sqlalchemy import and_, case, desc, func, literal, or_, select, true, union_all
 from sqlalchemy.orm import Session
 
-from .database import Base, SessionLocal, engine, ensure_legacy_sqlite_compatibility
-from .models import Activity, Redemption, Reward, Student, Teacher, TeacherClass, User
-from .services import ensure_demo_data, hash_password, recalc_student_points, verify_password
+from .auth import InvalidToken, Principal, decode_token, issue_token, teacher_class_cache
+from .awards import CSV_MAX_ERRORS, CsvFormatError, award_points, parse_award_csv, resolve_award_students
+from .cache import SCHOOL_SCOPE, class_scope, dashboard_cache
+from .database import ReadSessionLocal, SessionLocal, engine, read_engine
+from .events import STUDENT_EVENT_TYPES, event_broker, event_stream
+from .exports import EXPORT_KINDS, stream_csv
+from .history import (
+    TREND_GRANULARITIES,
+    InvalidCursor,
+    activity_page,
+    default_trend_window,
+    points_trend,
+    redemption_page,
+)
+from .instrumentation import ServerTimingMiddleware, TimedJSONResponse, instrument_engine, timed
+from .leaderboard import class_leaderboard, leaderboard_around, leaderboard_bottom, leaderboard_page, leaderboard_top
+from .ledger import seed_missing_balances, touch_balances
+from .metrics import render_metrics
+from .migrations import run_migrations
+from .models import (
+    Activity,
+    ArchivedRedemption,
+    Redemption,
+    Reward,
+    Student,
+    StudentBalance,
+    Teacher,
+    TeacherClass,
+    User,
+)
+from .passwords import PASSWORD_RETRY_AFTER, PasswordPoolSaturated, password_pool
+from .qr import (
+    QR_ACTIONS,
+    QR_CARDS_DIR,
+    QR_DISK_CACHE_ENABLED,
+    qr_card_worker,
+    render_student_qr_png,
+    student_qr_asset_key,
+    student_qr_url,
+)
+from .qr_decode import (
+    QR_DECODE_RETRY_AFTER,
+    QR_UPLOAD_MAX_BYTES,
+    UPLOAD_FORM_OVERHEAD,
+    DecodePoolSaturated,
+    DecodeTimeout,
+    UploadLimitMiddleware,
+    UploadTooLarge,
+    qr_decode_pool,
+    read_upload,
+)
+from .redemptions import RedemptionConflict, decide_redemptions_bulk
+from .rollups import (
+    PERIODS,
+    approval_timeline,
+    category_totals,
+    daily_points,
+    period_window,
+    reward_totals,
+)
+from .roster import RosterChanged, import_roster, parse_roster_csv, split_new_rows
+from .services import DEFAULT_PASSWORD, ensure_demo_data
+from .terms import TermCloseError, close_term, list_terms
 
 
 APP_DIR = Path(__file__).resolve().parent
 STATIC_DIR = APP_DIR / "static"
 LEGACY_ASSETS_DIR = APP_DIR / "assets"
-QR_CARDS_DIR = APP_DIR / "qr_cards"
+HISTORY_PAGE_SIZE = 20
+QR_BATCH_MAX_FILES = 10
 
 FAVICON_BYTES = base64.b64decode(
     "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAA" \
     "AAAABJRU5ErkJggg=="
 )
 
+
+def qr_upload_limit(path: str) -> int | None:
+    """Whole-body cap for the QR upload routes; UploadLimitMiddleware enforces it while the body streams."""
+    if path in ("/api/qr/decode", "/api/qr/decode-addpoints"):
+        return QR_UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD
+    if path.startswith("/api/teachers/") and path.endswith("/qr/scan-batch"):
+        return QR_UPLOAD_MAX_BYTES * QR_BATCH_MAX_FILES + UPLOAD_FORM_OVERHEAD
+    return None
+
+
 app = FastAPI(
     title="EduPointX Mobile",
     description="Publishable mobile web version of the original EduPointX flow.",
     version="2.0.0",
+    default_response_class=TimedJSONResponse,
 )
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(UploadLimitMiddleware, limit_for=qr_upload_limit)
+app.add_middleware(ServerTimingMiddleware)
+instrument_engine(engine)
+instrument_engine(read_engine)
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 if LEGACY_ASSETS_DIR.exists():
     app.mount("/legacy-assets", StaticFiles(directory=LEGACY_ASSETS_DIR), name="legacy-assets")
@@ -112,6 +191,11 @@ class RedemptionDecisionRequest(BaseModel):
     items: list[RedemptionDecisionItem]
 
 
+class TermCloseRequest(BaseModel):
+    name: str
+    end_date: date
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -120,6 +204,39 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_principal(authorization: str | None = Header(None)) -> Principal:
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Please log in again.", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return decode_token(token.strip())
+    except InvalidToken as exc:
+        raise HTTPException(status_code=401, detail=str(exc), headers={"WWW-Authenticate": "Bearer"}) from exc
+
+
+def get_teacher_principal(teacher_id: int, principal: Principal = Depends(get_principal)) -> Principal:
+    """The caller, who must be this teacher or an admin."""
+    if principal.role not in {"teacher", "admin"}:
+        raise HTTPException(status_code=403, detail="Teacher access required.")
+    if not principal.is_admin and principal.teacher_id != teacher_id:
+        raise HTTPException(status_code=403, detail="You can only act as yourself.")
+    return principal
+
+
+def get_admin_principal(principal: Principal = Depends(get_principal)) -> Principal:
+    if not principal.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required.")
+    return principal
+
+
 def get_display_name(user: User, db: Session) -> str:
     if user.student_id:
         student = db.get(Student, user.student_id)
@@ -130,68 +247,38 @@ def get_display_name(user: User, db: Session) -> str:
     return user.username
 
 
-def decode_qr_strings(image_bytes: bytes) -> list[str]:
-    try:
-        import cv2
-        import numpy as np
-    except ImportError as exc:
-        raise HTTPException(status_code=500, detail="QR scanning dependency is not installed.") from exc
-
-    np_bytes = np.frombuffer(image_bytes, dtype=np.uint8)
-    image = cv2.imdecode(np_bytes, cv2.IMREAD_COLOR)
-    if image is None:
-        return []
-
-    detector = cv2.QRCodeDetector()
-    decoded: list[str] = []
-
-    retval, decoded_info, _points, _ = detector.detectAndDecodeMulti(image)
-    if retval and decoded_info:
-        decoded.extend([item.strip() for item in decoded_info if item and item.strip()])
-
-    if not decoded:
-        single, _points, _ = detector.detectAndDecode(image)
-        if single and single.strip():
-            decoded.append(single.strip())
-
-    uniq: list[str] = []
-    seen: set[str] = set()
-    for item in decoded:
-        if item not in seen:
-            uniq.append(item)
-            seen.add(item)
-    return uniq
+def parse_qr_payload(raw: str) -> tuple[str, str] | None:
+    payload = raw.strip()
+    if not payload:
+        return None
+    parsed = urlparse(payload)
+    query_string = parsed.query or payload.lstrip("?")
+    params = parse_qs(query_string, keep_blank_values=True)
+    sid_values = params.get("sid") or params.get("student_id")
+    if not sid_values:
+        return None
+    sid = sid_values[0].strip()
+    if not sid:
+        return None
+    action = None
+    action_values = params.get("action") or params.get("mode")
+    if action_values:
+        action = action_values[0].strip().lower()
+        if action == "deed":
+            action = "addpoints"
+    if not action:
+        low = payload.lower()
+        if "redeem" in low:
+            action = "redeem"
+        elif "deed" in low or "addpoints" in low:
+            action = "addpoints"
+    if not action:
+        return None
+    return action, sid
 
 
 def parse_qr_action_sid(decoded_list: list[str]) -> tuple[str | None, str | None]:
-    candidates: list[tuple[str, str]] = []
-    for raw in decoded_list:
-        payload = raw.strip()
-        if not payload:
-            continue
-        parsed = urlparse(payload)
-        query_string = parsed.query or payload.lstrip("?")
-        params = parse_qs(query_string, keep_blank_values=True)
-        sid_values = params.get("sid") or params.get("student_id")
-        if not sid_values:
-            continue
-        sid = sid_values[0].strip()
-        if not sid:
-            continue
-        action = None
-        action_values = params.get("action") or params.get("mode")
-        if action_values:
-            action = action_values[0].strip().lower()
-            if action == "deed":
-                action = "addpoints"
-        if not action:
-            low = payload.lower()
-            if "redeem" in low:
-                action = "redeem"
-            elif "deed" in low or "addpoints" in low:
-                action = "addpoints"
-        if action:
-            candidates.append((action, sid))
+    candidates = [candidate for candidate in map(parse_qr_payload, decoded_list) if candidate]
     if not candidates:
         return None, None
     for preferred in ("addpoints", "redeem"):
@@ -201,73 +288,9 @@ def parse_qr_action_sid(decoded_list: list[str]) -> tuple[str | None, str | None
     return candidates[0]
 
 
-def build_student_card_filename(name: str, class_name: str) -> str:
-    name_safe = "_".join(name.strip().split())
-    class_safe = "_".join(class_name.strip().split())
-    return f"{name_safe}_{class_safe}.png"
-
-
-def _slug_words(value: str, separator: str = "_", join_words: bool = False) -> str:
-    words = re.findall(r"[a-z0-9]+", value.lower())
-    if join_words:
-        return "".join(words)
-    return separator.join(words)
-
-
-def build_student_qr_basename(name: str, class_name: str) -> str:
-    """Return meaningful QR file prefix, e.g. alikarim_1_bestari."""
-    name_safe = _slug_words(name, join_words=True) or "student"
-    class_safe = _slug_words(class_name) or "class"
-    return f"{name_safe}_{class_safe}"
-
-
-def build_student_qr_filename(name: str, class_name: str, action: str) -> str:
-    suffix = "addpoint" if action == "addpoints" else "redemption"
-    return f"{build_student_qr_basename(name, class_name)}_{suffix}.png"
-
-
-def generate_qr_card(student_id: int, name: str, class_name: str) -> None:
-    QR_CARDS_DIR.mkdir(parents=True, exist_ok=True)
-    payloads = [
-        ("addpoints", f"?action=addpoints&sid={student_id}"),
-        ("redeem", f"?action=redeem&sid={student_id}"),
-    ]
-    for action, payload in payloads:
-        qr = qrcode.QRCode(box_size=10, border=2)
-        qr.add_data(payload)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white").convert("RGB")
-        filename = build_student_qr_filename(name, class_name, action)
-        img.save(QR_CARDS_DIR / filename)
-
-    # Also create the combined card for legacy compatibility
-    filename = build_student_card_filename(name, class_name)
-    card_path = QR_CARDS_DIR / filename
-    qr_images = []
-    for _action, payload in payloads:
-        qr = qrcode.QRCode(box_size=10, border=2)
-        qr.add_data(payload)
-        qr.make(fit=True)
-        qr_images.append(qr.make_image(fill_color="black", back_color="white").convert("RGB"))
-
-    spacing = 20
-    widths = [img.width for img in qr_images]
-    heights = [img.height for img in qr_images]
-    total_width = sum(widths) + spacing * (len(qr_images) - 1)
-    max_height = max(heights)
-
-    combined = Image.new("RGB", (total_width, max_height), "white")
-    x = 0
-    for img in qr_images:
-        combined.paste(img, (x, (max_height - img.height) // 2))
-        x += img.width + spacing
-    combined.save(card_path)
-
-
-def sync_qr_cards_for_students(db: Session) -> None:
-    QR_CARDS_DIR.mkdir(parents=True, exist_ok=True)
-    for student in db.scalars(select(Student)).all():
-        generate_qr_card(student.id, student.name, student.class_name)
+def ensure_student_exists(db: Session, student_id: int) -> None:
+    if db.scalar(select(Student.id).where(Student.id == student_id)) is None:
+        raise HTTPException(status_code=404, detail="Student not found.")
 
 
 def get_students_for_activity(db: Session, student_ids: list[int]) -> list[Student]:
@@ -285,22 +308,12 @@ def get_students_for_activity(db: Session, student_ids: list[int]) -> list[Stude
     return [students_by_id[student_id] for student_id in unique_ids]
 
 
-def ensure_teacher_can_award_students(db: Session, teacher_id: int, students: list[Student]) -> None:
-    user = db.scalar(select(User).where(User.teacher_id == teacher_id))
-    is_admin = bool(user and user.role == "admin")
-    if is_admin:
+def ensure_teacher_can_award_students(db: Session, principal: Principal, students: list[Student]) -> None:
+    if principal.is_admin:
         return
 
-    class_names = sorted({student.class_name for student in students})
-    assigned_classes = set(
-        db.scalars(
-            select(TeacherClass.class_name).where(
-                TeacherClass.teacher_id == teacher_id,
-                TeacherClass.class_name.in_(class_names),
-            )
-        )
-    )
-    unauthorized_classes = [class_name for class_name in class_names if class_name not in assigned_classes]
+    assigned_classes = teacher_class_cache.get(db, principal.teacher_id)
+    unauthorized_classes = sorted({student.class_name for student in students} - assigned_classes)
     if unauthorized_classes:
         raise HTTPException(
             status_code=403,
@@ -308,33 +321,79 @@ def ensure_teacher_can_award_students(db: Session, teacher_id: int, students: li
         )
 
 
-def build_student_points_rows(db: Session, class_name: str) -> list[dict[str, int | str]]:
-    students = db.scalars(
-        select(Student).where(Student.class_name == class_name).order_by(Student.name)
-    ).all()
-    rows = []
-    for student in students:
-        earned = db.scalar(
-            select(func.coalesce(func.sum(Activity.points), 0)).where(Activity.student_id == student.id)
-        )
-        spent = db.scalar(
-            select(func.coalesce(func.sum(Reward.cost), 0))
-            .select_from(Redemption)
-            .join(Reward, Reward.id == Redemption.reward_id)
-            .where(Redemption.student_id == student.id, Redemption.status == "approved")
-        )
-        live_points = int(earned or 0) - int(spent or 0)
-        rows.append(
-            {
-                "student_id": student.id,
-                "student_name": student.name,
-                "earned_points": int(earned or 0),
-                "spent_points": int(spent or 0),
-                "live_points": live_points,
-            }
+def publish_points_awarded(targets: list[tuple[int, str]], points: int, category: str | None) -> None:
+    """Bump cached dashboards and notify subscribers; call after the award commits."""
+    class_names = {class_name for _student_id, class_name in targets}
+    dashboard_cache.bump(*class_names)
+    event_broker.publish(
+        "points_awarded",
+        {
+            "student_ids": sorted({student_id for student_id, _class_name in targets}),
+            "points": points,
+            "category": category,
+        },
+        list(class_names),
+    )
+
+
+def ensure_valid_period(period: str) -> None:
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"Period must be one of: {', '.join(PERIODS)}.")
+
+
+def ensure_teacher_can_view_class(db: Session, principal: Principal, class_name: str) -> None:
+    if not principal.is_admin and class_name not in teacher_class_cache.get(db, principal.teacher_id):
+        raise HTTPException(status_code=403, detail="Teacher is not assigned to this class.")
+
+
+def award_activity(
+    db: Session,
+    teacher_id: int,
+    students: list[Student],
+    category: str,
+    reason: str,
+    points: int,
+) -> list[tuple[int, str]]:
+    """Record the same deed for every student and credit their balances; the caller commits.
+
+    Returns (student_id, class_name) pairs read before the commit expires the students.
+    """
+    targets = [(student.id, student.class_name) for student in students]
+    award_points(db, teacher_id, [(*target, category, reason, points) for target in targets])
+    return targets
+
+
+def student_dashboard_etag(db: Session, student_id: int) -> str | None:
+    """Strong validator for everything the student dashboard shows, read in one query."""
+    class_name = select(Student.class_name).where(Student.id == student_id).scalar_subquery()
+    row = db.execute(
+        select(
+            class_name,
+            select(StudentBalance.version).where(StudentBalance.student_id == student_id).scalar_subquery(),
+            select(func.count(Student.id)).where(Student.class_name == class_name).scalar_subquery(),
+            select(func.coalesce(func.sum(StudentBalance.version), 0))
+            .join(Student, Student.id == StudentBalance.student_id)
+            .where(Student.class_name == class_name)
+            .scalar_subquery(),
+            # Every edit raises the version sum; a delete lowers the count and a create raises max(id).
+            select(func.count(Reward.id)).scalar_subquery(),
+            select(func.max(Reward.id)).scalar_subquery(),
+            select(func.coalesce(func.sum(Reward.version), 0)).scalar_subquery(),
         )
-    rows.sort(key=lambda row: (-int(row["live_points"]), str(row["student_name"])))
-    return rows
+    ).one()
+    if row[0] is None:
+        return None
+    digest = hashlib.sha1(repr(("student-dashboard-v2", student_id, *row)).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {value.strip().removeprefix("W/") for value in if_none_match.split(",")}
+    return etag in candidates
 
 
 def build_student_dashboard(db: Session, student_id: int) -> dict:
@@ -342,26 +401,12 @@ def build_student_dashboard(db: Session, student_id: int) -> dict:
     if not student:
         raise HTTPException(status_code=404, detail="Student not found.")
 
-    recalc_student_points(db, student_id)
-    db.commit()
-    db.refresh(student)
-
     rewards = db.scalars(select(Reward).where(Reward.stock > 0).order_by(Reward.cost)).all()
-    activities = db.scalars(
-        select(Activity).where(Activity.student_id == student_id).order_by(desc(Activity.created_at))
-    ).all()
-    redemptions = db.execute(
-        select(Reward.name, Redemption.status, Redemption.created_at)
-        .join(Redemption, Redemption.reward_id == Reward.id)
-        .where(Redemption.student_id == student_id)
-        .order_by(desc(Redemption.created_at))
-    ).all()
-    leaderboard_rows = build_student_points_rows(db, student.class_name)
-
-    trend = {}
-    for activity in reversed(activities):
-        key = activity.created_at.date().isoformat()
-        trend[key] = trend.get(key, 0) + int(activity.points)
+    activities = activity_page(db, student_id, limit=HISTORY_PAGE_SIZE)
+    redemptions = redemption_page(db, student_id, limit=HISTORY_PAGE_SIZE)
+    leaderboard_rows = class_leaderboard(db, student.class_name)
+    own_row = next((row for row in leaderboard_rows if row["student_id"] == student.id), None)
+    trend_start, trend_end = default_trend_window(db, student_id)
 
     return {
         "student": {
@@ -369,7 +414,7 @@ def build_student_dashboard(db: Session, student_id: int) -> dict:
             "name": student.name,
             "gender": student.gender,
             "class_name": student.class_name,
-            "total_points": student.total_points,
+            "total_points": own_row["live_points"] if own_row else student.total_points,
         },
         "rewards": [
             {
@@ -382,48 +427,31 @@ def build_student_dashboard(db: Session, student_id: int) -> dict:
             }
             for reward in rewards
         ],
-        "redemptions": [
-            {"reward": name, "status": status, "date": created_at.isoformat()}
-            for name, status, created_at in redemptions
-        ],
-        "activities": [
-            {
-                "category": activity.category,
-                "reason": activity.reason,
-                "points": activity.points,
-                "date": activity.created_at.isoformat(),
-            }
-            for activity in activities
-        ],
+        "redemptions": redemptions["items"],
+        "redemptions_next_cursor": redemptions["next_cursor"],
+        "activities": activities["items"],
+        "activities_next_cursor": activities["next_cursor"],
         "leaderboard": leaderboard_rows,
-        "trend": [{"date": date, "points": points} for date, points in trend.items()],
-        "qr_addpoints_url": f"/qr_cards/{build_student_qr_filename(student.name, student.class_name, 'addpoints')}",
-        "qr_redeem_url": f"/qr_cards/{build_student_qr_filename(student.name, student.class_name, 'redeem')}",
+        "trend": points_trend(db, student_id, "day", trend_start, trend_end),
+        "trend_window": {"granularity": "day", "start": trend_start.isoformat(), "end": trend_end.isoformat()},
+        "qr_addpoints_url": student_qr_url(student.id, "addpoints"),
+        "qr_redeem_url": student_qr_url(student.id, "redeem"),
+        "qr_card_url": student_qr_url(student.id, "card"),
     }
 
 
-def build_teacher_dashboard(db: Session, teacher_id: int, class_name: str, is_admin: bool) -> dict:
-    if not is_admin:
-        allowed = db.scalar(
-            select(TeacherClass).where(
-                TeacherClass.teacher_id == teacher_id,
-                TeacherClass.class_name == class_name,
-            )
-        )
-        if not allowed:
-            raise HTTPException(status_code=403, detail="Teacher is not assigned to this class.")
+def period_info(period: str, start: date | None, end: date | None) -> dict:
+    return {
+        "name": period,
+        "start": start.isoformat() if start else None,
+        "end": end.isoformat() if end else None,
+    }
 
-    students = db.scalars(
-        select(Student).where(Student.class_name == class_name).order_by(Student.name)
-    ).all()
-    student_rows = build_student_points_rows(db, class_name)
-    categories = db.execute(
-        select(Activity.category, func.count(Activity.id), func.coalesce(func.sum(Activity.points), 0))
-        .join(Student, Student.id == Activity.student_id)
-        .where(Student.class_name == class_name)
-        .group_by(Activity.category)
-        .order_by(desc(func.coalesce(func.sum(Activity.points), 0)))
-    ).all()
+
+def build_teacher_dashboard(db: Session, class_name: str, period: str = "all") -> dict:
+    """Class view; category totals and the points chart come from the daily rollups for ``period``."""
+    student_rows = class_leaderboard(db, class_name)
+    start, end = period_window(db, period)
 
     recent = db.execute(
         select(Student.name, Activity.category, Activity.reason, Activity.points, Activity.created_at)
@@ -435,14 +463,16 @@ def build_teacher_dashboard(db: Session, teacher_id: int, class_name: str, is_ad
 
     return {
         "class_name": class_name,
-        "students": [{"id": student.id, "name": student.name} for student in students],
+        "students": [
+            {"id": row["student_id"], "name": row["student_name"]}
+            for row in sorted(student_rows, key=lambda row: (str(row["student_name"]), int(row["student_id"])))
+        ],
         "class_points": [
             {"name": row["student_name"], "points": row["live_points"]} for row in student_rows
         ],
-        "categories": [
-            {"category": category, "count": int(count), "total_points": int(total_points)}
-            for category, count, total_points in categories
-        ],
+        "period": period_info(period, start, end),
+        "categories": category_totals(db, class_name, start, end),
+        "daily_points": daily_points(db, class_name, start, end),
         "top3": student_rows[:3],
         "bottom3": list(reversed(student_rows[-3:])) if student_rows else [],
         "recent": [
@@ -458,7 +488,20 @@ def build_teacher_dashboard(db: Session, teacher_id: int, class_name: str, is_ad
     }
 
 
-def build_admin_dashboard(db: Session, selected_class: str | None, redemption_status: str = "pending") -> dict:
+def build_admin_dashboard(
+    db: Session,
+    selected_class: str | None,
+    redemption_status: str = "pending",
+    redemption_page: int = 1,
+    redemption_page_size: int = 25,
+    period: str = "all",
+) -> dict:
+    """School admin view; redemption insights are limited to ``period``.
+
+    Spend, top rewards and the approval timeline come from the daily rollups;
+    top students still read approved redemptions, within the period only.
+    """
+    start, end = period_window(db, period)
     class_names = list(db.scalars(select(Student.class_name).distinct().order_by(Student.class_name)))
     class_name = selected_class or (class_names[0] if class_names else None)
 
@@ -484,6 +527,25 @@ def build_admin_dashboard(db: Session, selected_class: str | None, redemption_st
 
     rewards = db.scalars(select(Reward).order_by(Reward.name)).all()
 
+    insufficient = and_(
+        Redemption.status == "pending",
+        or_(Student.total_points < Reward.cost, Reward.stock <= 0),
+    )
+    display_status = case((insufficient, literal("insufficient")), else_=Redemption.status)
+    class_filter = Student.class_name == class_name if class_name else true()
+
+    status_rows = db.execute(
+        select(display_status, func.count(Redemption.id))
+        .select_from(Redemption)
+        .join(Student, Student.id == Redemption.student_id)
+        .join(Reward, Reward.id == Redemption.reward_id)
+        .where(class_filter)
+        .group_by(display_status)
+        .order_by(display_status)
+    ).all()
+    status_counts = {str(status): int(count) for status, count in status_rows}
+
+    stored_status = "pending" if redemption_status == "insufficient" else redemption_status
     redemption_rows = db.execute(
         select(
             Redemption.id,
@@ -495,21 +557,36 @@ def build_admin_dashboard(db: Session, selected_class: str | None, redemption_st
             Reward.name,
             Reward.cost,
             Reward.stock,
-            Redemption.status,
+            display_status,
             Redemption.created_at,
         )
         .join(Student, Student.id == Redemption.student_id)
         .join(Reward, Reward.id == Redemption.reward_id)
-        .order_by(desc(Redemption.created_at))
+        .where(class_filter, Redemption.status == stored_status, display_status == redemption_status)
+        .order_by(desc(Redemption.created_at), desc(Redemption.id))
+        .limit(redemption_page_size)
+        .offset((redemption_page - 1) * redemption_page_size)
     ).all()
 
-    filtered_redemptions = []
-    status_counts: dict[str, int] = {}
-    for row in redemption_rows:
-        (
+    filtered_redemptions = [
+        {
+            "id": redemption_id,
+            "student_id": student_id,
+            "reward_id": reward_id,
+            "student_name": student_name,
+            "class_name": student_class,
+            "points": int(total_points),
+            "reward_name": reward_name,
+            "cost": int(cost),
+            "stock": int(stock),
+            "status": status,
+            "date": created_at.isoformat(),
+            "insufficient": status == "insufficient",
+        }
+        for (
             redemption_id,
             student_id,
-            _student_name,
+            student_name,
             student_class,
             total_points,
             reward_id,
@@ -518,87 +595,31 @@ def build_admin_dashboard(db: Session, selected_class: str | None, redemption_st
             stock,
             status,
             created_at,
-        ) = row
-        if class_name and student_class != class_name:
-            continue
-        insufficient = status == "pending" and (int(total_points) < int(cost) or int(stock) <= 0)
-        display_status = "insufficient" if insufficient else status
-        status_counts[display_status] = status_counts.get(display_status, 0) + 1
-        if display_status != redemption_status:
-            continue
-        filtered_redemptions.append(
-            {
-                "id": redemption_id,
-                "student_id": student_id,
-                "reward_id": reward_id,
-                "student_name": row[2],
-                "class_name": student_class,
-                "points": int(total_points),
-                "reward_name": reward_name,
-                "cost": int(cost),
-                "stock": int(stock),
-                "status": display_status,
-                "date": created_at.isoformat(),
-                "insufficient": insufficient,
-            }
-        )
-
-    status_rows = sorted(status_counts.items())
+        ) in redemption_rows
+    ]
 
-    total_spent_query = (
-        select(func.coalesce(func.sum(Reward.cost), 0))
-        .select_from(Redemption)
-        .join(Reward, Reward.id == Redemption.reward_id)
-        .join(Student, Student.id == Redemption.student_id)
-        .where(Redemption.status == "approved")
-    )
-    if class_name:
-        total_spent_query = total_spent_query.where(Student.class_name == class_name)
-    total_spent = db.scalar(total_spent_query)
-
-    top_rewards_query = (
-        select(Reward.name, func.count(Redemption.id))
-        .join(Redemption, Redemption.reward_id == Reward.id)
-        .join(Student, Student.id == Redemption.student_id)
-        .where(Redemption.status == "approved")
-    )
-    if class_name:
-        top_rewards_query = top_rewards_query.where(Student.class_name == class_name)
-    top_rewards = db.execute(
-        top_rewards_query
-        .group_by(Reward.id, Reward.name)
-        .order_by(desc(func.count(Redemption.id)))
-        .limit(10)
-    ).all()
+    top_rewards, total_spent = reward_totals(db, class_name, start, end)
 
+    approved_branches = []
+    for model in (Redemption, ArchivedRedemption):
+        branch = select(model.id, model.student_id, model.charged_points).where(model.status == "approved")
+        if start is not None and end is not None:
+            branch = branch.where(func.date(model.created_at).between(start, end))
+        approved_branches.append(branch)
+    approved = union_all(*approved_branches).subquery()
     top_students_query = (
-        select(Student.name, func.count(Redemption.id), func.coalesce(func.sum(Reward.cost), 0))
-        .join(Redemption, Redemption.student_id == Student.id)
-        .join(Reward, Reward.id == Redemption.reward_id)
-        .where(Redemption.status == "approved")
+        select(Student.name, func.count(approved.c.id), func.coalesce(func.sum(approved.c.charged_points), 0))
+        .join(approved, approved.c.student_id == Student.id)
     )
     if class_name:
         top_students_query = top_students_query.where(Student.class_name == class_name)
     top_students = db.execute(
         top_students_query
         .group_by(Student.id, Student.name)
-        .order_by(desc(func.count(Redemption.id)))
+        .order_by(desc(func.count(approved.c.id)))
         .limit(10)
     ).all()
 
-    timeline_query = (
-        select(func.date(Redemption.created_at), func.count(Redemption.id))
-        .join(Student, Student.id == Redemption.student_id)
-        .where(Redemption.status == "approved")
-    )
-    if class_name:
-        timeline_query = timeline_query.where(Student.class_name == class_name)
-    timeline = db.execute(
-        timeline_query
-        .group_by(func.date(Redemption.created_at))
-        .order_by(func.date(Redemption.created_at))
-    ).all()
-
     transaction_query = (
         select(
             Activity.id,
@@ -650,14 +671,20 @@ def build_admin_dashboard(db: Session, selected_class: str | None, redemption_st
             for reward in rewards
         ],
         "redemptions": filtered_redemptions,
+        "redemption_page": {
+            "page": redemption_page,
+            "page_size": redemption_page_size,
+            "total": status_counts.get(redemption_status, 0),
+        },
         "redemption_insights": {
-            "status_counts": [{"status": status, "count": int(count)} for status, count in status_rows],
-            "total_spent": int(total_spent or 0),
-            "top_rewards": [{"name": name, "count": int(count)} for name, count in top_rewards],
+            "status_counts": [{"status": status, "count": count} for status, count in status_counts.items()],
+            "period": period_info(period, start, end),
+            "total_spent": total_spent,
+            "top_rewards": top_rewards,
             "top_students": [
                 {"name": name, "count": int(count), "spent": int(spent)} for name, count, spent in top_students
             ],
-            "timeline": [{"date": str(date), "count": int(count)} for date, count in timeline],
+            "timeline": approval_timeline(db, class_name, start, end),
         },
         "point_transactions": [
             {
@@ -688,14 +715,22 @@ def build_admin_dashboard(db: Session, selected_class: str | None, redemption_st
 
 @app.on_event("startup")
 def on_startup() -> None:
-    Base.metadata.create_all(bind=engine)
-    ensure_legacy_sqlite_compatibility()
+    run_migrations()
     with SessionLocal() as session:
         ensure_demo_data(session, QR_CARDS_DIR)
-        sync_qr_cards_for_students(session)
-        for student in session.scalars(select(Student)).all():
-            recalc_student_points(session, student.id)
+        seed_missing_balances(session)
         session.commit()
+        if QR_DISK_CACHE_ENABLED:
+            students = session.execute(select(Student.id, Student.name, Student.class_name)).all()
+            qr_card_worker.start()
+            qr_card_worker.enqueue([tuple(student) for student in students])
+
+
+@app.on_event("shutdown")
+def on_shutdown() -> None:
+    qr_card_worker.stop()
+    qr_decode_pool.shutdown()
+    password_pool.shutdown()
 
 
 @app.get("/")
@@ -723,44 +758,69 @@ def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/api/metrics")
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/version")
 def version() -> dict[str, str]:
     return {"version": "2.0.0", "commit": "8e1a8bc", "branch": "dev"}
 
 
 @app.get("/api/classes")
-def classes(db: Session = Depends(get_db)) -> list[str]:
+def classes(db: Session = Depends(get_read_db)) -> list[str]:
     return list(db.scalars(select(Student.class_name).distinct().order_by(Student.class_name)))
 
 
-@app.post("/api/auth/login")
-def login(payload: LoginRequest, db: Session = Depends(get_db)) -> dict:
-    user = db.scalar(select(User).where(User.username == payload.username))
-    if not user or not verify_password(payload.password, user.password_hash):
-        raise HTTPException(status_code=401, detail="Invalid username or password.")
+async def run_password_job(job):
+    try:
+        return await job
+    except PasswordPoolSaturated as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-ins at once. Please retry shortly.",
+            headers={"Retry-After": str(PASSWORD_RETRY_AFTER)},
+        ) from exc
+
+
+def session_payload(db: Session, user: User, display_name: str | None = None) -> dict:
     return {
         "id": user.id,
         "username": user.username,
         "role": user.role,
         "student_id": user.student_id,
         "teacher_id": user.teacher_id,
-        "display_name": get_display_name(user, db),
+        "display_name": display_name or get_display_name(user, db),
+        "token": issue_token(user),
     }
 
 
-@app.post("/api/auth/signup")
-def signup(payload: SignupRequest, db: Session = Depends(get_db)) -> dict:
-    role = payload.role.lower()
-    if role not in {"student", "teacher"}:
-        raise HTTPException(status_code=400, detail="Role must be student or teacher.")
-    if db.scalar(select(User).where(User.username == payload.username)):
-        raise HTTPException(status_code=409, detail="Username already exists.")
+def complete_login(db: Session, user: User, upgraded_hash: str | None) -> dict:
+    if upgraded_hash:
+        user.password_hash = upgraded_hash
+        db.commit()
+    return session_payload(db, user)
 
+
+# The auth handlers are async so they can await the password pool; their
+# database work goes through run_in_threadpool so a write-lock wait never
+# blocks the event loop.
+@app.post("/api/auth/login")
+async def login(payload: LoginRequest, db: Session = Depends(get_db)) -> dict:
+    user = await run_in_threadpool(db.scalar, select(User).where(User.username == payload.username))
+    valid, upgraded_hash = await run_password_job(
+        password_pool.verify(payload.password, user.password_hash if user else None)
+    )
+    if not user or not valid:
+        raise HTTPException(status_code=401, detail="Invalid username or password.")
+    return await run_in_threadpool(complete_login, db, user, upgraded_hash)
+
+
+def create_account(db: Session, payload: SignupRequest, role: str, password_hash: str) -> dict:
     student_id = None
     teacher_id = None
     if role == "student":
-        if not payload.class_name:
-            raise HTTPException(status_code=400, detail="Students must select a class.")
         student = Student(
             name=payload.full_name,
             class_name=payload.class_name,
@@ -770,6 +830,7 @@ def signup(payload: SignupRequest, db: Session = Depends(get_db)) -> dict:
         db.add(student)
         db.flush()
         student_id = student.id
+        db.add(StudentBalance(student_id=student_id))
     else:
         teacher = Teacher(name=payload.full_name, gender=payload.gender)
         db.add(teacher)
@@ -778,31 +839,153 @@ def signup(payload: SignupRequest, db: Session = Depends(get_db)) -> dict:
 
     user = User(
         username=payload.username,
-        password_hash=hash_password(payload.password),
+        password_hash=password_hash,
         role=role,
         student_id=student_id,
         teacher_id=teacher_id,
     )
     db.add(user)
     db.commit()
-    if role == "student" and student_id is not None:
-        try:
-            generate_qr_card(student_id, payload.full_name, payload.class_name or "")
-        except (OSError, ValueError):
-            pass
+    dashboard_cache.bump(*([payload.class_name] if student_id else []))
+    return session_payload(db, user, payload.full_name)
+
+
+@app.post("/api/auth/signup")
+async def signup(payload: SignupRequest, db: Session = Depends(get_db)) -> dict:
+    role = payload.role.lower()
+    if role not in {"student", "teacher"}:
+        raise HTTPException(status_code=400, detail="Role must be student or teacher.")
+    if role == "student" and not payload.class_name:
+        raise HTTPException(status_code=400, detail="Students must select a class.")
+    if await run_in_threadpool(db.scalar, select(User.id).where(User.username == payload.username)) is not None:
+        raise HTTPException(status_code=409, detail="Username already exists.")
+    password_hash = await run_password_job(password_pool.hash(payload.password))
+    return await run_in_threadpool(create_account, db, payload, role, password_hash)
+
+
+@app.get("/api/students/{student_id}/dashboard")
+def student_dashboard(student_id: int, request: Request, db: Session = Depends(get_read_db)) -> Response:
+    etag = student_dashboard_etag(db, student_id)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Student not found.")
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return TimedJSONResponse(build_student_dashboard(db, student_id), headers=headers)
+
+
+@app.get("/api/students/{student_id}/activities")
+def student_activities(
+    student_id: int,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=200),
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db),
+) -> dict:
+    ensure_student_exists(db, student_id)
+    try:
+        return activity_page(db, student_id, limit=limit, cursor=cursor)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@app.get("/api/students/{student_id}/redemptions")
+def student_redemptions(
+    student_id: int,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=200),
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db),
+) -> dict:
+    ensure_student_exists(db, student_id)
+    try:
+        return redemption_page(db, student_id, limit=limit, cursor=cursor)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@app.get("/api/students/{student_id}/trend")
+def student_trend(
+    student_id: int,
+    granularity: str = "day",
+    start: date | None = None,
+    end: date | None = None,
+    db: Session = Depends(get_read_db),
+) -> dict:
+    if granularity not in TREND_GRANULARITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Granularity must be one of: {', '.join(TREND_GRANULARITIES)}.",
+        )
+    ensure_student_exists(db, student_id)
+    if start is None or end is None:
+        default_start, default_end = default_trend_window(db, student_id)
+        start = start or default_start
+        end = end or default_end
+    if start > end:
+        raise HTTPException(status_code=400, detail="Start date must not be after end date.")
     return {
-        "id": user.id,
-        "username": user.username,
-        "role": user.role,
-        "student_id": user.student_id,
-        "teacher_id": user.teacher_id,
-        "display_name": payload.full_name,
+        "granularity": granularity,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "points": points_trend(db, student_id, granularity, start, end),
     }
 
 
-@app.get("/api/students/{student_id}/dashboard")
-def student_dashboard(student_id: int, db: Session = Depends(get_db)) -> dict:
-    return build_student_dashboard(db, student_id)
+@app.get("/api/students/{student_id}/qr/{asset}.png")
+def student_qr_png(student_id: int, asset: str, request: Request, db: Session = Depends(get_read_db)) -> Response:
+    if asset not in {*QR_ACTIONS, "card"}:
+        raise HTTPException(status_code=404, detail="QR asset not found.")
+    headers = {
+        "ETag": f'"{student_qr_asset_key(student_id, asset)}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    ensure_student_exists(db, student_id)
+    _key, data = render_student_qr_png(student_id, asset)
+    return Response(content=data, media_type="image/png", headers=headers)
+
+
+@app.get("/api/leaderboard")
+def leaderboard(
+    class_name: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
+) -> dict:
+    return leaderboard_page(db, class_name, limit=limit, offset=offset)
+
+
+@app.get("/api/leaderboard/top")
+def leaderboard_top_students(
+    class_name: str | None = None,
+    k: int = Query(10, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+) -> list[dict]:
+    return leaderboard_top(db, class_name, k=k)
+
+
+@app.get("/api/leaderboard/bottom")
+def leaderboard_bottom_students(
+    class_name: str | None = None,
+    k: int = Query(10, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+) -> list[dict]:
+    return leaderboard_bottom(db, class_name, k=k)
+
+
+@app.get("/api/students/{student_id}/rank")
+def student_rank(
+    student_id: int,
+    scope: str = "class",
+    radius: int = Query(2, ge=0, le=50),
+    db: Session = Depends(get_read_db),
+) -> dict:
+    if scope not in {"class", "school"}:
+        raise HTTPException(status_code=400, detail="Scope must be class or school.")
+    result = leaderboard_around(db, student_id, radius=radius, school_wide=scope == "school")
+    if result is None:
+        raise HTTPException(status_code=404, detail="Student not found.")
+    return result
 
 
 @app.post("/api/redemptions/request")
@@ -811,14 +994,39 @@ def request_redemption(payload: RedemptionRequest, db: Session = Depends(get_db)
     reward = db.get(Reward, payload.reward_id)
     if not student or not reward:
         raise HTTPException(status_code=404, detail="Student or reward not found.")
-    db.add(Redemption(student_id=payload.student_id, reward_id=payload.reward_id, status="pending"))
+    redemption = Redemption(student_id=payload.student_id, reward_id=payload.reward_id, status="pending")
+    db.add(redemption)
+    touch_balances(db, [payload.student_id])
     db.commit()
+    dashboard_cache.bump(student.class_name)
+    event_broker.publish(
+        "redemption_requested",
+        {"redemption_id": redemption.id, "student_id": student.id, "reward_id": reward.id},
+        [student.class_name],
+    )
     return {"message": f"Request submitted for '{reward.name}'."}
 
 
+async def decode_upload(file: UploadFile) -> tuple[list[str], str | None]:
+    try:
+        upload = await read_upload(file)
+        with timed("qr-decode"):
+            return await qr_decode_pool.decode(upload)
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail="QR image is too large.") from exc
+    except DecodePoolSaturated as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="QR scanner is busy. Please retry shortly.",
+            headers={"Retry-After": str(QR_DECODE_RETRY_AFTER)},
+        ) from exc
+    except DecodeTimeout as exc:
+        raise HTTPException(status_code=504, detail="QR decoding timed out. Please retry with a clearer photo.") from exc
+
+
 @app.post("/api/qr/decode")
 async def decode_qr(file: UploadFile = File(...), db: Session = Depends(get_db)) -> dict:
-    decoded = decode_qr_strings(await file.read())
+    decoded, decode_pass = await decode_upload(file)
     action, sid = parse_qr_action_sid(decoded)
     if not sid:
         raise HTTPException(status_code=400, detail="No valid QR found in the uploaded image.")
@@ -826,7 +1034,7 @@ async def decode_qr(file: UploadFile = File(...), db: Session = Depends(get_db))
         student_id = int(sid)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail="Invalid student ID in QR.") from exc
-    student = db.get(Student, student_id)
+    student = await run_in_threadpool(db.get, Student, student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found.")
     return {
@@ -835,6 +1043,7 @@ async def decode_qr(file: UploadFile = File(...), db: Session = Depends(get_db))
         "class_name": student.class_name,
         "action": action or "addpoints",
         "decoded": decoded,
+        "decode_pass": decode_pass,
     }
 
 
@@ -846,43 +1055,137 @@ async def decode_addpoints_qr(file: UploadFile = File(...), db: Session = Depend
     return result
 
 
+@app.post("/api/teachers/{teacher_id}/qr/scan-batch")
+async def scan_qr_batch(
+    teacher_id: int,
+    files: list[UploadFile] = File(...),
+    category: str | None = Form(None),
+    reason: str | None = Form(None),
+    points: int | None = Form(None, ge=1, le=100),
+    principal: Principal = Depends(get_teacher_principal),
+    db: Session = Depends(get_db),
+) -> dict:
+    award_fields = [category, reason, points]
+    award = all(value not in (None, "") for value in award_fields)
+    if not award and any(value not in (None, "") for value in award_fields):
+        raise HTTPException(status_code=400, detail="Category, reason and points are all required to award points.")
+    if len(files) > QR_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Upload at most {QR_BATCH_MAX_FILES} images at once.")
+
+    # One image at a time so a single batch cannot take every decode slot.
+    decoded: list[str] = []
+    scanned_files = []
+    for upload in files:
+        strings, decode_pass = await decode_upload(upload)
+        decoded.extend(item for item in strings if item not in decoded)
+        scanned_files.append({"filename": upload.filename, "decode_pass": decode_pass, "count": len(strings)})
+
+    student_ids: list[int] = []
+    invalid = []
+    for raw in decoded:
+        candidate = parse_qr_payload(raw)
+        if candidate is None:
+            continue
+        try:
+            student_id = int(candidate[1])
+        except ValueError:
+            invalid.append(raw)
+            continue
+        if student_id not in student_ids:
+            student_ids.append(student_id)
+    if not student_ids:
+        raise HTTPException(status_code=400, detail="No valid QR found in the uploaded image(s).")
+
+    def resolve_and_award() -> tuple[list[dict], list[int], list[tuple[int, str]]]:
+        # Lookups, the award and its commit can wait on the write lock, so they run off the event loop.
+        students_by_id = {
+            student.id: student for student in db.scalars(select(Student).where(Student.id.in_(student_ids)))
+        }
+        students = [students_by_id[student_id] for student_id in student_ids if student_id in students_by_id]
+        unknown_ids = [student_id for student_id in student_ids if student_id not in students_by_id]
+        found = [
+            {"student_id": student.id, "name": student.name, "class_name": student.class_name} for student in students
+        ]
+        targets: list[tuple[int, str]] = []
+        if award and students:
+            ensure_teacher_can_award_students(db, principal, students)
+            targets = award_activity(db, teacher_id, students, category, reason, points)
+            db.commit()
+        return found, unknown_ids, targets
+
+    found, unknown_ids, targets = await run_in_threadpool(resolve_and_award)
+    if targets:
+        publish_points_awarded(targets, points, category)
+    awarded = len(targets)
+
+    return {
+        "message": f"Points added to {awarded} student(s)." if award else f"Found {len(found)} student(s).",
+        "students": found,
+        "unknown_student_ids": unknown_ids,
+        "invalid": invalid,
+        "awarded": awarded,
+        "files": scanned_files,
+        "decoded": decoded,
+    }
+
+
+@app.get("/api/events")
+async def events(request: Request, class_name: str | None = None, token: str | None = None) -> StreamingResponse:
+    """Server-sent change events, optionally only those touching one class.
+
+    EventSource cannot send headers, so the session token comes as ``?token=``.
+    Without a teacher or admin token only student dashboard events are sent.
+    """
+    principal = get_principal(f"Bearer {token}") if token else None
+    staff = principal is not None and principal.role in {"teacher", "admin"}
+    subscription = event_broker.subscribe(class_name or None, None if staff else STUDENT_EVENT_TYPES)
+    return StreamingResponse(
+        event_stream(subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/api/teachers/{teacher_id}/classes")
-def teacher_classes(teacher_id: int, db: Session = Depends(get_db)) -> list[str]:
-    user = db.scalar(select(User).where(User.teacher_id == teacher_id))
-    if user and user.role == "admin":
+def teacher_classes(
+    teacher_id: int,
+    principal: Principal = Depends(get_teacher_principal),
+    db: Session = Depends(get_read_db),
+) -> list[str]:
+    if principal.is_admin:
         return list(db.scalars(select(Student.class_name).distinct().order_by(Student.class_name)))
-    return list(
-        db.scalars(
-            select(TeacherClass.class_name)
-            .where(TeacherClass.teacher_id == teacher_id)
-            .order_by(TeacherClass.class_name)
-        )
-    )
+    return sorted(teacher_class_cache.get(db, teacher_id))
 
 
 @app.get("/api/teachers/{teacher_id}/dashboard")
-def teacher_dashboard(teacher_id: int, class_name: str, db: Session = Depends(get_db)) -> dict:
-    user = db.scalar(select(User).where(User.teacher_id == teacher_id))
-    is_admin = bool(user and user.role == "admin")
-    return build_teacher_dashboard(db, teacher_id, class_name, is_admin=is_admin)
+def teacher_dashboard(
+    teacher_id: int,
+    class_name: str,
+    period: str = "all",
+    principal: Principal = Depends(get_teacher_principal),
+    db: Session = Depends(get_read_db),
+) -> dict:
+    ensure_valid_period(period)
+    ensure_teacher_can_view_class(db, principal, class_name)
+    return dashboard_cache.get_or_build(
+        ("teacher", class_name, period),
+        (class_scope(class_name),),
+        lambda: build_teacher_dashboard(db, class_name, period),
+    )
 
 
 @app.post("/api/teachers/{teacher_id}/activities")
-def add_activity(teacher_id: int, payload: ActivityCreate, db: Session = Depends(get_db)) -> dict[str, str]:
+def add_activity(
+    teacher_id: int,
+    payload: ActivityCreate,
+    principal: Principal = Depends(get_teacher_principal),
+    db: Session = Depends(get_db),
+) -> dict[str, str]:
     student = get_students_for_activity(db, [payload.student_id])[0]
-    ensure_teacher_can_award_students(db, teacher_id, [student])
-
-    db.add(
-        Activity(
-            student_id=payload.student_id,
-            teacher_id=teacher_id,
-            category=payload.category,
-            reason=payload.reason,
-            points=payload.points,
-        )
-    )
-    recalc_student_points(db, payload.student_id)
+    ensure_teacher_can_award_students(db, principal, [student])
+    targets = award_activity(db, teacher_id, [student], payload.category, payload.reason, payload.points)
     db.commit()
+    publish_points_awarded(targets, payload.points, payload.category)
     return {"message": "Points added successfully."}
 
 
@@ -890,40 +1193,100 @@ def add_activity(teacher_id: int, payload: ActivityCreate, db: Session = Depends
 def add_bulk_activities(
     teacher_id: int,
     payload: ActivityBulkCreate,
+    principal: Principal = Depends(get_teacher_principal),
     db: Session = Depends(get_db),
 ) -> dict[str, int | str]:
     students = get_students_for_activity(db, payload.student_ids)
-    ensure_teacher_can_award_students(db, teacher_id, students)
-
-    for student in students:
-        db.add(
-            Activity(
-                student_id=student.id,
-                teacher_id=teacher_id,
-                category=payload.category,
-                reason=payload.reason,
-                points=payload.points,
-            )
+    ensure_teacher_can_award_students(db, principal, students)
+    targets = award_activity(db, teacher_id, students, payload.category, payload.reason, payload.points)
+    db.commit()
+    publish_points_awarded(targets, payload.points, payload.category)
+    return {"message": f"Points added to {len(students)} student(s).", "count": len(students)}
+
+
+@app.post("/api/teachers/{teacher_id}/activities/csv")
+def upload_award_csv(
+    teacher_id: int,
+    file: UploadFile = File(...),
+    principal: Principal = Depends(get_teacher_principal),
+    db: Session = Depends(get_db),
+) -> Response:
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        rows, errors = parse_award_csv(stream)
+    except UnicodeDecodeError as exc:
+        raise HTTPException(status_code=400, detail="Save the CSV file as UTF-8 and try again.") from exc
+    except CsvFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    finally:
+        stream.detach()
+
+    resolved, lookup_errors = resolve_award_students(db, rows)
+    errors.extend(lookup_errors)
+    if not principal.is_admin:
+        assigned_classes = teacher_class_cache.get(db, principal.teacher_id)
+        errors.extend(
+            {"row": row_number, "error": f"Teacher is not assigned to class {class_name}."}
+            for row_number, (_student_id, class_name) in resolved.items()
+            if class_name not in assigned_classes
+        )
+    if errors:
+        errors.sort(key=lambda error: error["row"])
+        return TimedJSONResponse(
+            status_code=400,
+            content={
+                "detail": f"{len(errors)} row(s) need fixing; nothing was awarded.",
+                "error_count": len(errors),
+                "errors": errors[:CSV_MAX_ERRORS],
+            },
         )
+    if not rows:
+        raise HTTPException(status_code=400, detail="The CSV file has no award rows.")
 
-    db.flush()
-    for student in students:
-        recalc_student_points(db, student.id)
+    awarded = award_points(
+        db,
+        teacher_id,
+        [(*resolved[row["row"]], row["category"], row["reason"], row["points"]) for row in rows],
+    )
     db.commit()
-    return {"message": f"Points added to {len(students)} student(s).", "count": len(students)}
+    targets = list(resolved.values())
+    student_count = len({student_id for student_id, _class_name in targets})
+    publish_points_awarded(targets, sum(row["points"] for row in rows), None)
+    return TimedJSONResponse(
+        {
+            "message": f"Added {awarded} award(s) for {student_count} student(s).",
+            "awarded": awarded,
+            "students": student_count,
+        }
+    )
 
 
 @app.get("/api/admin/dashboard")
 def admin_dashboard(
     class_name: str | None = None,
     redemption_status: str = "pending",
-    db: Session = Depends(get_db),
+    redemption_page: int = Query(1, ge=1),
+    redemption_page_size: int = Query(25, ge=1, le=200),
+    period: str = "all",
+    _principal: Principal = Depends(get_admin_principal),
+    db: Session = Depends(get_read_db),
 ) -> dict:
-    return build_admin_dashboard(db, class_name, redemption_status)
+    ensure_valid_period(period)
+    return dashboard_cache.get_or_build(
+        ("admin", class_name, redemption_status, redemption_page, redemption_page_size, period),
+        (SCHOOL_SCOPE,),
+        lambda: build_admin_dashboard(
+            db, class_name, redemption_status, redemption_page, redemption_page_size, period
+        ),
+    )
 
 
 @app.post("/api/admin/teacher-assignment")
-def teacher_assignment(payload: TeacherAssignmentRequest, db: Session = Depends(get_db)) -> dict[str, str]:
+def teacher_assignment(
+    payload: TeacherAssignmentRequest,
+    _principal: Principal = Depends(get_admin_principal),
+    db: Session = Depends(get_db),
+) -> dict[str, str]:
     existing = db.scalar(
         select(TeacherClass).where(
             TeacherClass.teacher_id == payload.teacher_id,
@@ -935,98 +1298,222 @@ def teacher_assignment(payload: TeacherAssignmentRequest, db: Session = Depends(
     if not payload.assign and existing:
         db.delete(existing)
     db.commit()
+    teacher_class_cache.invalidate(payload.teacher_id)
+    dashboard_cache.bump()
     return {"message": "Teacher assignment updated."}
 
 
 @app.post("/api/admin/rewards")
-def create_reward(payload: RewardCreate, db: Session = Depends(get_db)) -> dict[str, str]:
-    db.add(
-        Reward(
-            name=payload.name,
-            description=payload.description,
-            cost=payload.cost,
-            stock=payload.stock,
-            source=payload.source,
-        )
+def create_reward(
+    payload: RewardCreate,
+    _principal: Principal = Depends(get_admin_principal),
+    db: Session = Depends(get_db),
+) -> dict[str, str]:
+    reward = Reward(
+        name=payload.name,
+        description=payload.description,
+        cost=payload.cost,
+        stock=payload.stock,
+        source=payload.source,
     )
+    db.add(reward)
     db.commit()
+    dashboard_cache.bump()
+    event_broker.publish("stock_changed", {"reward_id": reward.id, "stock": payload.stock, "cost": payload.cost})
     return {"message": "Reward created."}
 
 
 @app.patch("/api/admin/rewards/{reward_id}")
-def update_reward(reward_id: int, payload: RewardUpdate, db: Session = Depends(get_db)) -> dict[str, str]:
+def update_reward(
+    reward_id: int,
+    payload: RewardUpdate,
+    _principal: Principal = Depends(get_admin_principal),
+    db: Session = Depends(get_db),
+) -> dict[str, str]:
     reward = db.get(Reward, reward_id)
     if not reward:
         raise HTTPException(status_code=404, detail="Reward not found.")
     reward.cost = payload.cost
     reward.stock = payload.stock
+    reward.version += 1
     db.commit()
+    dashboard_cache.bump()
+    event_broker.publish("stock_changed", {"reward_id": reward_id, "stock": payload.stock, "cost": payload.cost})
     return {"message": "Reward updated."}
 
 
 @app.delete("/api/admin/rewards/{reward_id}")
-def delete_reward(reward_id: int, db: Session = Depends(get_db)) -> dict[str, str]:
+def delete_reward(
+    reward_id: int,
+    _principal: Principal = Depends(get_admin_principal),
+    db: Session = Depends(get_db),
+) -> dict[str, str]:
     reward = db.get(Reward, reward_id)
     if not reward:
         raise HTTPException(status_code=404, detail="Reward not found.")
     db.delete(reward)
     db.commit()
+    dashboard_cache.bump()
+    event_broker.publish("stock_changed", {"reward_id": reward_id, "stock": None, "deleted": True})
     return {"message": "Reward deleted."}
 
 
 @app.post("/api/admin/redemptions/decide")
-def decide_redemptions(payload: RedemptionDecisionRequest, db: Session = Depends(get_db)) -> dict[str, str]:
-    approved = 0
-    rejected = 0
-    skipped = 0
-    for item in payload.items:
-        redemption = db.get(Redemption, item.id)
-        if not redemption:
-            skipped += 1
-            continue
-        decision = item.decision.strip().lower()
-        if decision == "reject":
-            if redemption.status == "pending":
-                redemption.status = "rejected"
-                rejected += 1
-            else:
-                skipped += 1
-        elif decision == "approve":
-            if redemption.status != "pending":
-                skipped += 1
-                continue
-            student = db.get(Student, redemption.student_id)
-            reward = db.get(Reward, redemption.reward_id)
-            if not student or not reward:
-                skipped += 1
-                continue
-            recalc_student_points(db, student.id)
-            if student.total_points >= reward.cost and reward.stock > 0:
-                redemption.status = "approved"
-                reward.stock -= 1
-                recalc_student_points(db, student.id)
-                approved += 1
-            else:
-                skipped += 1
-        else:
-            skipped += 1
+def decide_redemptions(
+    payload: RedemptionDecisionRequest,
+    _principal: Principal = Depends(get_admin_principal),
+    db: Session = Depends(get_db),
+) -> dict:
+    try:
+        results = decide_redemptions_bulk(db, [(item.id, item.decision) for item in payload.items])
+    except RedemptionConflict as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
     db.commit()
+    # Approvals move points in every class they touch.
+    dashboard_cache.bump_all()
+
+    counts = Counter(result["status"] for result in results)
+    if counts["approved"] or counts["rejected"]:
+        event_broker.publish(
+            "redemptions_decided",
+            {
+                "approved": [result["id"] for result in results if result["status"] == "approved"],
+                "rejected": [result["id"] for result in results if result["status"] == "rejected"],
+            },
+        )
     parts = []
-    if approved:
-        parts.append(f"approved {approved}")
-    if rejected:
-        parts.append(f"rejected {rejected}")
-    if skipped:
-        parts.append(f"skipped {skipped}")
+    if counts["approved"]:
+        parts.append(f"approved {counts['approved']}")
+    if counts["rejected"]:
+        parts.append(f"rejected {counts['rejected']}")
+    if counts["skipped"]:
+        parts.append(f"skipped {counts['skipped']}")
     detail = ", ".join(parts) if parts else "no changes"
-    return {"message": f"Redemption decisions applied: {detail}."}
+    return {
+        "message": f"Redemption decisions applied: {detail}.",
+        "approved": counts["approved"],
+        "rejected": counts["rejected"],
+        "skipped": counts["skipped"],
+        "results": results,
+    }
+
+
+@app.post("/api/admin/roster/import")
+def import_roster_csv(
+    file: UploadFile = File(...),
+    _principal: Principal = Depends(get_admin_principal),
+    db: Session = Depends(get_db),
+) -> Response:
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        rows, errors = parse_roster_csv(stream)
+    except UnicodeDecodeError as exc:
+        raise HTTPException(status_code=400, detail="Save the CSV file as UTF-8 and try again.") from exc
+    except CsvFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    finally:
+        stream.detach()
+    if errors:
+        return TimedJSONResponse(
+            status_code=400,
+            content={
+                "detail": f"{len(errors)} row(s) need fixing; nothing was imported.",
+                "error_count": len(errors),
+                "errors": errors[:CSV_MAX_ERRORS],
+            },
+        )
+    if not rows:
+        raise HTTPException(status_code=400, detail="The CSV file has no students.")
+
+    # Each account gets its own salt. Hash before writing, and end the read
+    # transaction first, so the KDF never holds the database.
+    new_rows, _ = split_new_rows(db, rows)
+    db.rollback()
+    try:
+        password_hashes = password_pool.hash_many(DEFAULT_PASSWORD, len(new_rows))
+    except PasswordPoolSaturated as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="Sign-ins are using every password worker. Please retry the import shortly.",
+            headers={"Retry-After": str(PASSWORD_RETRY_AFTER)},
+        ) from exc
+    try:
+        created, skipped = import_roster(db, rows, password_hashes)
+    except RosterChanged as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    db.commit()
+    if created:
+        dashboard_cache.bump(*{student["class_name"] for student in created})
+        if QR_DISK_CACHE_ENABLED:
+            qr_card_worker.start()
+            qr_card_worker.enqueue(
+                [(student["student_id"], student["name"], student["class_name"]) for student in created]
+            )
+    return TimedJSONResponse(
+        {
+            "message": f"Imported {len(created)} student(s); skipped {len(skipped)} already on the roster.",
+            "created": created,
+            "skipped": skipped,
+            "password": DEFAULT_PASSWORD,
+        }
+    )
+
+
+@app.get("/api/admin/exports/{kind}.csv")
+def export_csv(
+    kind: str,
+    class_name: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    _principal: Principal = Depends(get_admin_principal),
+) -> StreamingResponse:
+    if kind not in EXPORT_KINDS:
+        raise HTTPException(status_code=404, detail=f"Export must be one of: {', '.join(EXPORT_KINDS)}.")
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="Start date must not be after end date.")
+    return StreamingResponse(
+        stream_csv(kind, class_name, start, end),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="edupointx-{kind}.csv"'},
+    )
+
+
+@app.get("/api/admin/terms")
+def terms(_principal: Principal = Depends(get_admin_principal), db: Session = Depends(get_read_db)) -> dict:
+    return {"terms": list_terms(db)}
+
+
+@app.post("/api/admin/terms/close")
+def close_school_term(
+    payload: TermCloseRequest,
+    _principal: Principal = Depends(get_admin_principal),
+    db: Session = Depends(get_db),
+) -> dict:
+    try:
+        closed = close_term(db, payload.name, payload.end_date)
+    except TermCloseError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    db.commit()
+    # Recent lists and redemption queues lose the archived rows in every class.
+    dashboard_cache.bump_all()
+    return {
+        "message": (
+            f"Closed {closed['name']}: archived {closed['activities']} activities "
+            f"and {closed['redemptions']} redemptions."
+        ),
+        "term": closed,
+    }
 
 
 @app.post("/api/admin/reset-password")
-def reset_password(payload: PasswordResetRequest, db: Session = Depends(get_db)) -> dict[str, str]:
-    user = db.scalar(select(User).where(User.username == payload.username))
+async def reset_password(
+    payload: PasswordResetRequest,
+    _principal: Principal = Depends(get_admin_principal),
+    db: Session = Depends(get_db),
+) -> dict[str, str]:
+    user = await run_in_threadpool(db.scalar, select(User).where(User.username == payload.username))
     if not user:
         raise HTTPException(status_code=404, detail="User not found.")
-    user.password_hash = hash_password("password123")
-    db.commit()
-    return {"message": "Password reset to password123."}
+    user.password_hash = await run_password_job(password_pool.hash(DEFAULT_PASSWORD))
+    await run_in_threadpool(db.commit)
+    return {"message": f"Password reset to {DEFAULT_PASSWORD}."}
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+# (labels, value) pairs read at scrape time.
+Sample = tuple[tuple[str, ...], float]
+
+
+class _Shards:
+    """One dict per thread, written only by that thread, so updates take no lock.
+
+    Readers copy every shard and add them up. Shards of finished threads are
+    kept so totals never go backwards.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._all: list[dict] = []
+        self._lock = threading.Lock()
+
+    def mine(self) -> dict:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._lock:
+                self._all.append(shard)
+        return shard
+
+    def copies(self) -> list[dict]:
+        with self._lock:
+            shards = list(self._all)
+        return [shard.copy() for shard in shards]
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._shards = _Shards()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self._shards.mine()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def samples(self) -> list[Sample]:
+        totals: dict[tuple[str, ...], float] = {}
+        for shard in self._shards.copies():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return sorted(totals.items())
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in self.samples()]
+
+
+class Histogram:
+    """Fixed upper bounds; each shard keeps per-bucket counts followed by the sum."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._shards = _Shards()
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shards.mine()
+        counts = shard.get(labels)
+        if counts is None:
+            # One slot per bound, one for +Inf, then the running sum.
+            counts = shard[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def render(self) -> list[str]:
+        totals: dict[tuple[str, ...], list[float]] = {}
+        for shard in self._shards.copies():
+            for labels, counts in shard.items():
+                merged = totals.setdefault(labels, [0] * len(counts))
+                for index, value in enumerate(list(counts)):
+                    merged[index] += value
+        lines = []
+        names = (*self.labelnames, "le")
+        for labels, counts in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, (*labels, _number(bound)))} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(counts[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {_number(cumulative)}")
+        return lines
+
+
+class Gauge:
+    """Read from ``collect`` at scrape time instead of being updated in place."""
+
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, help_text: str, labelnames: tuple[str, ...], collect: Callable[[], Iterable[Sample]]
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.collect = collect
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in self.collect()]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _number(value) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+http_request_seconds = Histogram(
+    "edupointx_http_request_duration_seconds",
+    "Request latency until the response body is sent, by route template.",
+    ("method", "route", "status"),
+)
+qr_decode_seconds = Histogram(
+    "edupointx_qr_decode_duration_seconds",
+    "QR upload decodes, including time queued for a worker, by outcome.",
+    ("outcome",),
+)
+qr_decode_rejected = Counter(
+    "edupointx_qr_decode_rejected_total",
+    "QR uploads refused because every decode slot was taken.",
+)
+qr_render_seconds = Histogram(
+    "edupointx_qr_render_duration_seconds",
+    "QR rendering: PNG assets served by the API and card files written to qr_cards/.",
+    ("target",),
+)
+cache_requests = Counter(
+    "edupointx_cache_requests_total",
+    "Cache lookups by cache and result (hit or miss).",
+    ("cache", "result"),
+)
+db_pool_checkouts = Counter(
+    "edupointx_db_pool_checkouts_total",
+    "Connections taken from a pool.",
+    ("pool",),
+)
+db_pool_timeouts = Counter(
+    "edupointx_db_pool_timeouts_total",
+    "Checkouts that gave up after pool_timeout.",
+    ("pool",),
+)
+db_pool_wait_seconds = Histogram(
+    "edupointx_db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    ("pool",),
+    WAIT_BUCKETS,
+)
+sqlite_busy = Counter(
+    "edupointx_sqlite_busy_total",
+    "Statements that failed with SQLITE_BUSY or SQLITE_LOCKED after busy_timeout.",
+    ("pool",),
+)
+
+# Engines rather than pools: dispose() swaps in a new pool.
+_engines: dict[str, object] = {}
+
+
+def _pool_samples(read: Callable[[QueuePool], int]) -> list[Sample]:
+    return [
+        ((name,), read(target_engine.pool))
+        for name, target_engine in sorted(_engines.items())
+        if isinstance(target_engine.pool, QueuePool)
+    ]
+
+
+REGISTRY = [
+    http_request_seconds,
+    qr_decode_seconds,
+    qr_decode_rejected,
+    qr_render_seconds,
+    cache_requests,
+    db_pool_checkouts,
+    db_pool_timeouts,
+    db_pool_wait_seconds,
+    Gauge("edupointx_db_pool_size", "Configured pool_size.", ("pool",), lambda: _pool_samples(QueuePool.size)),
+    Gauge(
+        "edupointx_db_pool_checked_out",
+        "Connections currently in use.",
+        ("pool",),
+        lambda: _pool_samples(QueuePool.checkedout),
+    ),
+    Gauge(
+        "edupointx_db_pool_overflow",
+        "Connections open beyond pool_size; negative while the pool is still filling.",
+        ("pool",),
+        lambda: _pool_samples(QueuePool.overflow),
+    ),
+    sqlite_busy,
+]
+
+
+def render_metrics() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def metered_queue_pool(name: str) -> type[QueuePool]:
+    """A QueuePool class that times checkouts under ``name``; recreated pools keep the name."""
+
+    class MeteredQueuePool(QueuePool):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                db_pool_timeouts.inc(name)
+                raise
+            finally:
+                db_pool_checkouts.inc(name)
+                db_pool_wait_seconds.observe(time.perf_counter() - started, name)
+
+    MeteredQueuePool.__name__ = f"MeteredQueuePool[{name}]"
+    return MeteredQueuePool
+
+
+def watch_engine(target_engine, name: str) -> None:
+    """Report ``target_engine``'s pool gauges and SQLite busy errors under ``name``."""
+    _engines[name] = target_engine
+
+    @event.listens_for(target_engine, "handle_error")
+    def count_busy(context) -> None:
+        errorname = getattr(context.original_exception, "sqlite_errorname", "") or ""
+        if errorname.startswith(("SQLITE_BUSY", "SQLITE_LOCKED")):
+            sqlite_busy.inc(name)
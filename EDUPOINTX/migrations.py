@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import argparse
+from typing import Callable
+
+from sqlalchemy import Connection, Engine, MetaData, inspect, select, text, update
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from . import models  # noqa: F401  (registers the tables on Base.metadata)
+from .database import IS_SQLITE, Base, engine
+from .passwords import hash_password, is_plaintext
+from .rollups import rebuild_rollups
+
+
+# Each migration runs once, in order, and must be safe to re-run: SQLite
+# commits DDL as it goes, so a crash can leave a step half applied.
+Migration = tuple[int, str, Callable[[Connection], None]]
+
+LEGACY_COLUMNS = {
+    "students": {
+        "gender": "ALTER TABLE students ADD COLUMN gender VARCHAR(20)",
+    },
+    "teachers": {
+        "gender": "ALTER TABLE teachers ADD COLUMN gender VARCHAR(20)",
+    },
+    "rewards": {
+        "source": "ALTER TABLE rewards ADD COLUMN source VARCHAR(30) DEFAULT 'School' NOT NULL",
+    },
+}
+
+# Hot tables whose rows move to an archive when a term closes.
+ARCHIVED_TABLES = {"activities": "archived_activities", "redemptions": "archived_redemptions"}
+
+CHARGED_COLUMNS = {
+    "redemptions": ("charged_points", "ALTER TABLE redemptions ADD COLUMN charged_points INTEGER"),
+    "archived_redemptions": ("charged_points", "ALTER TABLE archived_redemptions ADD COLUMN charged_points INTEGER"),
+    "class_reward_daily": (
+        "spent_points",
+        "ALTER TABLE class_reward_daily ADD COLUMN spent_points INTEGER DEFAULT 0 NOT NULL",
+    ),
+}
+
+
+def _create_indexes(conn: Connection, *names: str) -> None:
+    indexes = {index.name: index for table in Base.metadata.sorted_tables for index in table.indexes}
+    for name in names:
+        indexes[name].create(conn, checkfirst=True)
+
+
+def _baseline(conn: Connection) -> None:
+    """Tables from the models plus the columns older SQLite files were created without."""
+    Base.metadata.create_all(conn)
+    if not IS_SQLITE:
+        return
+    inspector = inspect(conn)
+    for table_name, additions in LEGACY_COLUMNS.items():
+        current_columns = {column["name"] for column in inspector.get_columns(table_name)}
+        for column_name, ddl in additions.items():
+            if column_name not in current_columns:
+                conn.execute(text(ddl))
+
+
+def _hot_path_indexes(conn: Connection) -> None:
+    _create_indexes(
+        conn,
+        "ix_students_class_name_name",
+        "ix_activities_student_id_created_at",
+        "ix_activities_created_at",
+        "ix_redemptions_status_created_at",
+        "ix_redemptions_student_id_status",
+        "ix_redemptions_student_id_created_at",
+        "ix_redemptions_reward_id_status",
+        "ix_users_teacher_id",
+        "ix_users_student_id",
+        "ix_teacher_class_class_name",
+    )
+
+
+def _daily_rollups(conn: Connection) -> None:
+    for model in (models.ClassCategoryDaily, models.ClassRewardDaily):
+        model.__table__.create(conn, checkfirst=True)
+    _create_indexes(conn, "ix_class_category_daily_class_name_day", "ix_class_reward_daily_class_name_day")
+    # Filled by migration 5, once redemptions record what they charged.
+
+
+def _term_archive(conn: Connection) -> None:
+    for model in (models.Term, models.ArchivedActivity, models.ArchivedRedemption, models.OpeningBalance):
+        model.__table__.create(conn, checkfirst=True)
+    _create_indexes(
+        conn,
+        "ix_archived_activities_student_id_created_at",
+        "ix_archived_activities_created_at",
+        "ix_archived_activities_term_id",
+        "ix_archived_redemptions_student_id_created_at",
+        "ix_archived_redemptions_status_created_at",
+        "ix_archived_redemptions_term_id",
+    )
+
+
+def _charged_points(conn: Connection) -> None:
+    """Record each approval's charge; approvals made before this used the reward's cost at upgrade time."""
+    inspector = inspect(conn)
+    for table_name, (column_name, ddl) in CHARGED_COLUMNS.items():
+        if column_name not in {column["name"] for column in inspector.get_columns(table_name)}:
+            conn.execute(text(ddl))
+    for table_name in ("redemptions", "archived_redemptions"):
+        conn.execute(
+            text(
+                f"UPDATE {table_name} SET charged_points = "
+                f"(SELECT cost FROM rewards WHERE rewards.id = {table_name}.reward_id) "
+                "WHERE status = 'approved' AND charged_points IS NULL"
+            )
+        )
+    rebuild_rollups(conn)
+
+
+def _reward_versions(conn: Connection) -> None:
+    if "version" not in {column["name"] for column in inspect(conn).get_columns("rewards")}:
+        conn.execute(text("ALTER TABLE rewards ADD COLUMN version INTEGER DEFAULT 0 NOT NULL"))
+
+
+def _hash_plaintext_passwords(conn: Connection) -> None:
+    """Sign-in no longer accepts stored plaintext, so hash any left over while the value is known."""
+    users = models.User.__table__
+    for user_id, stored in conn.execute(select(users.c.id, users.c.password_hash)).all():
+        if is_plaintext(stored):
+            conn.execute(update(users).where(users.c.id == user_id).values(password_hash=hash_password(stored)))
+
+
+def _rebuild_with_autoincrement(conn: Connection, table_name: str) -> None:
+    # SQLite cannot add AUTOINCREMENT in place: copy into a new table and swap it in.
+    table = Base.metadata.tables[table_name]
+    rebuild_name = f"{table_name}_rebuild"
+    scratch = MetaData()
+    for other in Base.metadata.sorted_tables:
+        other.to_metadata(scratch)  # so the copy's foreign keys resolve
+    rebuild = table.to_metadata(scratch, name=rebuild_name)
+    columns = ", ".join(column.name for column in table.columns)
+    conn.execute(text(f"DROP TABLE IF EXISTS {rebuild_name}"))
+    conn.execute(CreateTable(rebuild))
+    conn.execute(text(f"INSERT INTO {rebuild_name} ({columns}) SELECT {columns} FROM {table_name}"))
+    conn.execute(text(f"DROP TABLE {table_name}"))
+    conn.execute(text(f"ALTER TABLE {rebuild_name} RENAME TO {table_name}"))
+    _create_indexes(conn, *(index.name for index in table.indexes))
+
+
+def _archive_safe_ids(conn: Connection) -> None:
+    """Stop SQLite reusing activity and redemption ids that a closed term archived.
+
+    Rows that already took an archived id are moved past every id in use, and
+    the id sequence starts above the archive.
+    """
+    if not IS_SQLITE:
+        return
+    for table_name, archive_name in ARCHIVED_TABLES.items():
+        top = f"(SELECT MAX(id) FROM (SELECT id FROM {table_name} UNION ALL SELECT id FROM {archive_name}))"
+        conn.execute(
+            text(f"UPDATE {table_name} SET id = id + {top} WHERE id IN (SELECT id FROM {archive_name})")
+        )
+        created = conn.scalar(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table_name}
+        )
+        if "AUTOINCREMENT" not in created.upper():
+            _rebuild_with_autoincrement(conn, table_name)
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": table_name})
+        conn.execute(
+            text(f"INSERT INTO sqlite_sequence (name, seq) SELECT :name, COALESCE({top}, 0)"), {"name": table_name}
+        )
+
+
+MIGRATIONS: list[Migration] = [
+    (1, "baseline schema", _baseline),
+    (2, "hot path indexes", _hot_path_indexes),
+    (3, "daily class rollups", _daily_rollups),
+    (4, "term archive", _term_archive),
+    (5, "charged redemption points", _charged_points),
+    (6, "reward versions", _reward_versions),
+    (7, "hash plaintext passwords", _hash_plaintext_passwords),
+    (8, "archive-safe activity and redemption ids", _archive_safe_ids),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: Connection) -> int:
+    try:
+        return int(conn.execute(text("SELECT version FROM schema_version")).scalar() or 0)
+    except (OperationalError, ProgrammingError):
+        conn.rollback()
+        return 0
+
+
+def _set_version(conn: Connection, version: int) -> None:
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    conn.execute(text("DELETE FROM schema_version"))
+    conn.execute(text("INSERT INTO schema_version (version) VALUES (:version)"), {"version": version})
+
+
+def run_migrations(target_engine: Engine = engine) -> int:
+    """Bring the schema up to LATEST_VERSION; costs one query when it already is."""
+    with target_engine.connect() as conn:
+        version = current_version(conn)
+    for number, _description, apply in MIGRATIONS:
+        if number <= version:
+            continue
+        with target_engine.begin() as conn:
+            apply(conn)
+            _set_version(conn, number)
+        version = number
+    return version
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bring the database schema up to date.")
+    parser.add_argument(
+        "--rebuild-rollups",
+        action="store_true",
+        help="recompute the daily class rollups from activities and redemptions, archived terms included",
+    )
+    args = parser.parse_args()
+    print(f"Schema at version {run_migrations()} of {LATEST_VERSION}.")
+    if args.rebuild_rollups:
+        with engine.begin() as conn:
+            rebuild_rollups(conn)
+        print("Daily rollups rebuilt.")
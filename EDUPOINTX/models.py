@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, func
+from sqlalchemy import Date, DateTime, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
@@ -10,6 +10,7 @@ from .database import Base
 
 class Student(Base):
     __tablename__ = "students"
+    __table_args__ = (Index("ix_students_class_name_name", "class_name", "name"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
@@ -20,6 +21,19 @@ class Student(Base):
     activities: Mapped[list["Activity"]] = relationship(back_populates="student")
     user: Mapped["User | None"] = relationship(back_populates="student", uselist=False)
     redemptions: Mapped[list["Redemption"]] = relationship(back_populates="student")
+    balance: Mapped["StudentBalance | None"] = relationship(back_populates="student", uselist=False)
+
+
+class StudentBalance(Base):
+    __tablename__ = "student_balances"
+
+    student_id: Mapped[int] = mapped_column(ForeignKey("students.id"), primary_key=True)
+    earned_points: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    spent_points: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    live_points: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    student: Mapped[Student] = relationship(back_populates="balance")
 
 
 class Teacher(Base):
@@ -36,6 +50,7 @@ class Teacher(Base):
 
 class TeacherClass(Base):
     __tablename__ = "teacher_class"
+    __table_args__ = (Index("ix_teacher_class_class_name", "class_name"),)
 
     teacher_id: Mapped[int] = mapped_column(ForeignKey("teachers.id"), primary_key=True)
     class_name: Mapped[str] = mapped_column(String(50), primary_key=True)
@@ -45,6 +60,13 @@ class TeacherClass(Base):
 
 class Activity(Base):
     __tablename__ = "activities"
+    __table_args__ = (
+        Index("ix_activities_student_id_created_at", "student_id", "created_at", "id"),
+        Index("ix_activities_created_at", "created_at", "id"),
+        # Closing a term empties this table; ids must never be handed out again
+        # or the next close would collide with the archived rows.
+        {"sqlite_autoincrement": True},
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     student_id: Mapped[int] = mapped_column(ForeignKey("students.id"), nullable=False)
@@ -69,16 +91,28 @@ class Reward(Base):
     cost: Mapped[int] = mapped_column(Integer, nullable=False)
     stock: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     source: Mapped[str] = mapped_column(String(30), default="School", nullable=False)
+    # Bumped on every edit, including stock taken by approvals; student dashboard ETags fingerprint it.
+    version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     redemptions: Mapped[list["Redemption"]] = relationship(back_populates="reward")
 
 
 class Redemption(Base):
     __tablename__ = "redemptions"
+    __table_args__ = (
+        Index("ix_redemptions_status_created_at", "status", "created_at"),
+        Index("ix_redemptions_student_id_status", "student_id", "status"),
+        Index("ix_redemptions_student_id_created_at", "student_id", "created_at", "id"),
+        Index("ix_redemptions_reward_id_status", "reward_id", "status"),
+        # Never reuse ids that closed terms archived (see Activity).
+        {"sqlite_autoincrement": True},
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     student_id: Mapped[int] = mapped_column(ForeignKey("students.id"), nullable=False)
     reward_id: Mapped[int] = mapped_column(ForeignKey("rewards.id"), nullable=False)
     status: Mapped[str] = mapped_column(String(20), default="pending", nullable=False)
+    # The reward's cost when the request was approved; later price edits leave it alone.
+    charged_points: Mapped[int | None] = mapped_column(Integer)
     created_at: Mapped[datetime] = mapped_column(
         DateTime, nullable=False, server_default=func.now()
     )
@@ -87,8 +121,96 @@ class Redemption(Base):
     reward: Mapped[Reward] = relationship(back_populates="redemptions")
 
 
+class ClassCategoryDaily(Base):
+    """Activities per day, class and category, kept in step with every award."""
+
+    __tablename__ = "class_category_daily"
+    __table_args__ = (Index("ix_class_category_daily_class_name_day", "class_name", "day"),)
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    class_name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    category: Mapped[str] = mapped_column(String(50), primary_key=True)
+    activity_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    points: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class ClassRewardDaily(Base):
+    """Approved redemptions per request day, class and reward, kept in step with every approval."""
+
+    __tablename__ = "class_reward_daily"
+    __table_args__ = (Index("ix_class_reward_daily_class_name_day", "class_name", "day"),)
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    class_name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    reward_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    approved_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    spent_points: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class Term(Base):
+    """A closed school term; its activities and decided redemptions live in the archive tables."""
+
+    __tablename__ = "terms"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(50), unique=True, nullable=False)
+    start_date: Mapped[date | None] = mapped_column(Date)
+    end_date: Mapped[date] = mapped_column(Date, nullable=False)
+    closed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+
+
+class ArchivedActivity(Base):
+    __tablename__ = "archived_activities"
+    __table_args__ = (
+        Index("ix_archived_activities_student_id_created_at", "student_id", "created_at", "id"),
+        Index("ix_archived_activities_created_at", "created_at", "id"),
+        Index("ix_archived_activities_term_id", "term_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    term_id: Mapped[int] = mapped_column(ForeignKey("terms.id"), nullable=False)
+    student_id: Mapped[int] = mapped_column(ForeignKey("students.id"), nullable=False)
+    teacher_id: Mapped[int | None] = mapped_column(ForeignKey("teachers.id"))
+    category: Mapped[str] = mapped_column(String(50), nullable=False)
+    points: Mapped[int] = mapped_column(Integer, nullable=False)
+    reason: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class ArchivedRedemption(Base):
+    __tablename__ = "archived_redemptions"
+    __table_args__ = (
+        Index("ix_archived_redemptions_student_id_created_at", "student_id", "created_at", "id"),
+        Index("ix_archived_redemptions_status_created_at", "status", "created_at"),
+        Index("ix_archived_redemptions_term_id", "term_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    term_id: Mapped[int] = mapped_column(ForeignKey("terms.id"), nullable=False)
+    student_id: Mapped[int] = mapped_column(ForeignKey("students.id"), nullable=False)
+    reward_id: Mapped[int] = mapped_column(ForeignKey("rewards.id"), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    charged_points: Mapped[int | None] = mapped_column(Integer)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class OpeningBalance(Base):
+    """Points a student carried into the current term: everything earned and spent in archived terms."""
+
+    __tablename__ = "opening_balances"
+
+    student_id: Mapped[int] = mapped_column(ForeignKey("students.id"), primary_key=True)
+    term_id: Mapped[int] = mapped_column(ForeignKey("terms.id"), nullable=False)
+    earned_points: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    spent_points: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_teacher_id", "teacher_id"),
+        Index("ix_users_student_id", "student_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     username: Mapped[str] = mapped_column(String(50), unique=True, nullable=False)
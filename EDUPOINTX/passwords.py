@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+SCRYPT_N = int(os.getenv("EDUPOINTX_SCRYPT_N", str(2**14)))
+SCRYPT_R = int(os.getenv("EDUPOINTX_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("EDUPOINTX_SCRYPT_P", "1"))
+SALT_BYTES = 16
+KEY_BYTES = 32
+PASSWORD_WORKERS = int(os.getenv("EDUPOINTX_PASSWORD_WORKERS", "2"))
+PASSWORD_QUEUE = int(os.getenv("EDUPOINTX_PASSWORD_QUEUE", "64"))
+PASSWORD_RETRY_AFTER = 1
+LEGACY_DIGEST = re.compile(r"[0-9a-f]{64}")
+
+
+class PasswordPoolSaturated(RuntimeError):
+    pass
+
+
+def _b64encode(value: bytes) -> str:
+    return base64.b64encode(value).decode("ascii").rstrip("=")
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.b64decode(value + "=" * (-len(value) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode("utf-8"),
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        maxmem=256 * n * r * p + 1024 * 1024,
+        dklen=KEY_BYTES,
+    )
+
+
+def hash_password(password: str, n: int = SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P) -> str:
+    """Return ``scrypt$n$r$p$salt$hash`` with a fresh random salt."""
+    salt = secrets.token_bytes(SALT_BYTES)
+    return f"scrypt${n}${r}${p}${_b64encode(salt)}${_b64encode(_scrypt(password, salt, n, r, p))}"
+
+
+def _parse_scrypt(stored_hash: str) -> tuple[int, int, int, bytes, bytes] | None:
+    parts = stored_hash.split("$")
+    if len(parts) != 6 or parts[0] != "scrypt":
+        return None
+    try:
+        return int(parts[1]), int(parts[2]), int(parts[3]), _b64decode(parts[4]), _b64decode(parts[5])
+    except ValueError:
+        return None
+
+
+def verify_password(password: str, stored_hash: str) -> bool:
+    parsed = _parse_scrypt(stored_hash)
+    if parsed is not None:
+        n, r, p, salt, expected = parsed
+        return hmac.compare_digest(_scrypt(password, salt, n, r, p), expected)
+    # Accounts created before scrypt hold an unsalted SHA-256 digest, rehashed on
+    # next login. Only the digest of the password matches: submitting the stored
+    # digest itself must not sign in.
+    if not LEGACY_DIGEST.fullmatch(stored_hash):
+        return False
+    return hmac.compare_digest(hashlib.sha256(password.encode("utf-8")).hexdigest(), stored_hash)
+
+
+def is_plaintext(stored_hash: str) -> bool:
+    """The oldest databases stored the password itself; migration 7 hashes those in place."""
+    return _parse_scrypt(stored_hash) is None and not LEGACY_DIGEST.fullmatch(stored_hash)
+
+
+def needs_rehash(stored_hash: str) -> bool:
+    parsed = _parse_scrypt(stored_hash)
+    return parsed is None or parsed[:3] != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+def verify_and_upgrade(password: str, stored_hash: str) -> tuple[bool, str | None]:
+    """Verify, and when the stored hash is outdated return its replacement."""
+    if not verify_password(password, stored_hash):
+        return False, None
+    return True, hash_password(password) if needs_rehash(stored_hash) else None
+
+
+# Checked for unknown usernames so a miss costs as much as a wrong password.
+_DUMMY_HASH: str | None = None
+
+
+def _dummy_hash() -> str:
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hash_password(secrets.token_hex(8))
+    return _DUMMY_HASH
+
+
+def _hash_repeated(password: str, count: int) -> list[str]:
+    return [hash_password(password) for _ in range(count)]
+
+
+def _verify_unknown_user(password: str) -> tuple[bool, None]:
+    # Runs on a pool thread, so building the dummy hash on first use never blocks the event loop.
+    verify_password(password, _dummy_hash())
+    return False, None
+
+
+class PasswordHasherPool:
+    """Runs the KDF on a few dedicated threads so logins never hold the request threadpool.
+
+    hashlib.scrypt releases the GIL. Work beyond ``workers + queue_size``
+    pending jobs is refused.
+    """
+
+    def __init__(self, workers: int = PASSWORD_WORKERS, queue_size: int = PASSWORD_QUEUE) -> None:
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+            return self._executor
+
+    async def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordPoolSaturated("Too many logins in progress.")
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _future: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, stored_hash: str | None) -> tuple[bool, str | None]:
+        if stored_hash is None:
+            return await self._run(_verify_unknown_user, password)
+        return await self._run(verify_and_upgrade, password, stored_hash)
+
+    def hash_many(self, password: str, count: int) -> list[str]:
+        """Hash ``password`` ``count`` times, each with its own salt; blocks the calling thread.
+
+        The work is split across the workers and takes one slot per worker.
+        """
+        if count <= 0:
+            return []
+        parts = min(self.workers, count)
+        acquired = 0
+        try:
+            for _ in range(parts):
+                if not self._slots.acquire(blocking=False):
+                    raise PasswordPoolSaturated("Too many logins in progress.")
+                acquired += 1
+            executor = self._get_executor()
+            futures = [
+                executor.submit(_hash_repeated, password, count // parts + (index < count % parts))
+                for index in range(parts)
+            ]
+            return [password_hash for future in futures for password_hash in future.result()]
+        finally:
+            for _ in range(acquired):
+                self._slots.release()
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_pool = PasswordHasherPool()
+
+
+def benchmark(costs: list[int], seconds: float, workers: int) -> list[dict]:
+    results = []
+    for log_n in costs:
+        n = 2**log_n
+        stored = hash_password("password123", n=n)
+        deadline = time.perf_counter() + seconds
+        done = 0
+        lock = threading.Lock()
+
+        def worker() -> None:
+            nonlocal done
+            while time.perf_counter() < deadline:
+                verify_password("password123", stored)
+                with lock:
+                    done += 1
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        results.append(
+            {
+                "n": n,
+                "r": SCRYPT_R,
+                "p": SCRYPT_P,
+                "memory_mb": round(128 * n * SCRYPT_R * SCRYPT_P / (1024 * 1024), 1),
+                "ms_per_login": round(elapsed * 1000 * workers / max(done, 1), 1),
+                "logins_per_sec": round(done / elapsed, 1),
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure password verifications per second for each scrypt cost.")
+    parser.add_argument("--log-n", type=int, nargs="+", default=[13, 14, 15, 16], help="log2 of the scrypt N parameter")
+    parser.add_argument("--seconds", type=float, default=2.0, help="time spent on each cost")
+    parser.add_argument("--workers", type=int, default=PASSWORD_WORKERS, help="concurrent verifying threads")
+    args = parser.parse_args()
+    print(f"{'N':>8} {'MiB':>6} {'ms/login':>9} {'logins/s':>9}  (workers={args.workers})")
+    for row in benchmark(args.log_n, args.seconds, args.workers):
+        print(f"{row['n']:>8} {row['memory_mb']:>6} {row['ms_per_login']:>9} {row['logins_per_sec']:>9}")
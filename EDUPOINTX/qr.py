@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import qrcode
+from PIL import Image
+
+from .metrics import cache_requests, qr_render_seconds
+
+
+APP_DIR = Path(__file__).resolve().parent
+QR_CARDS_DIR = APP_DIR / "qr_cards"
+QR_MANIFEST_PATH = QR_CARDS_DIR / "manifest.json"
+
+QR_ACTIONS = ("addpoints", "redeem")
+QR_BOX_SIZE = 10
+QR_BORDER = 2
+QR_FILL_COLOR = "black"
+QR_BACK_COLOR = "white"
+CARD_SPACING = 20
+# Bump when the rendering code changes in a way the parameters above do not capture.
+QR_RENDER_VERSION = 1
+QR_PNG_CACHE_BYTES = int(os.getenv("EDUPOINTX_QR_CACHE_BYTES", str(16 * 1024 * 1024)))
+QR_DISK_CACHE_ENABLED = os.getenv("EDUPOINTX_QR_DISK_CACHE", "1").lower() not in {"0", "false", "no"}
+
+
+def build_student_card_filename(name: str, class_name: str) -> str:
+    name_safe = "_".join(name.strip().split())
+    class_safe = "_".join(class_name.strip().split())
+    return f"{name_safe}_{class_safe}.png"
+
+
+def _slug_words(value: str, separator: str = "_", join_words: bool = False) -> str:
+    words = re.findall(r"[a-z0-9]+", value.lower())
+    if join_words:
+        return "".join(words)
+    return separator.join(words)
+
+
+def build_student_qr_basename(name: str, class_name: str) -> str:
+    """Return meaningful QR file prefix, e.g. alikarim_1_bestari."""
+    name_safe = _slug_words(name, join_words=True) or "student"
+    class_safe = _slug_words(class_name) or "class"
+    return f"{name_safe}_{class_safe}"
+
+
+def build_student_qr_filename(name: str, class_name: str, action: str) -> str:
+    suffix = "addpoint" if action == "addpoints" else "redemption"
+    return f"{build_student_qr_basename(name, class_name)}_{suffix}.png"
+
+
+def qr_payload(student_id: int, action: str) -> str:
+    return f"?action={action}&sid={student_id}"
+
+
+def qr_cache_key(kind: str, *payloads: str) -> str:
+    """Content address for a rendered asset: its payloads plus every rendering parameter."""
+    parts = [QR_RENDER_VERSION, kind, QR_BOX_SIZE, QR_BORDER, QR_FILL_COLOR, QR_BACK_COLOR]
+    if kind == "card":
+        parts.append(CARD_SPACING)
+    return hashlib.sha256(json.dumps([*parts, *payloads]).encode("utf-8")).hexdigest()
+
+
+def render_qr_image(payload: str) -> Image.Image:
+    qr = qrcode.QRCode(box_size=QR_BOX_SIZE, border=QR_BORDER)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return qr.make_image(fill_color=QR_FILL_COLOR, back_color=QR_BACK_COLOR).convert("RGB")
+
+
+def render_card_image(qr_images: list[Image.Image]) -> Image.Image:
+    widths = [img.width for img in qr_images]
+    heights = [img.height for img in qr_images]
+    total_width = sum(widths) + CARD_SPACING * (len(qr_images) - 1)
+    max_height = max(heights)
+
+    combined = Image.new("RGB", (total_width, max_height), QR_BACK_COLOR)
+    x = 0
+    for img in qr_images:
+        combined.paste(img, (x, (max_height - img.height) // 2))
+        x += img.width + CARD_SPACING
+    return combined
+
+
+def encode_png(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class PngLruCache:
+    """Encoded PNG bytes keyed by cache key, evicting least recently used past max_bytes."""
+
+    def __init__(self, max_bytes: int = QR_PNG_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+        cache_requests.inc("qr_png", "miss" if data is None else "hit")
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _key, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+qr_png_cache = PngLruCache()
+
+
+def student_qr_asset_key(student_id: int, asset: str) -> str:
+    if asset == "card":
+        return qr_cache_key("card", *(qr_payload(student_id, action) for action in QR_ACTIONS))
+    return qr_cache_key("qr", qr_payload(student_id, asset))
+
+
+def student_qr_url(student_id: int, asset: str) -> str:
+    return f"/api/students/{student_id}/qr/{asset}.png?v={student_qr_asset_key(student_id, asset)[:16]}"
+
+
+def render_student_qr_png(student_id: int, asset: str) -> tuple[str, bytes]:
+    """Return (cache key, PNG bytes) for "addpoints", "redeem" or the combined "card"."""
+    key = student_qr_asset_key(student_id, asset)
+    data = qr_png_cache.get(key)
+    if data is None:
+        started = time.perf_counter()
+        if asset == "card":
+            image = render_card_image([render_qr_image(qr_payload(student_id, action)) for action in QR_ACTIONS])
+        else:
+            image = render_qr_image(qr_payload(student_id, asset))
+        data = encode_png(image)
+        qr_render_seconds.observe(time.perf_counter() - started, asset)
+        qr_png_cache.put(key, data)
+    return key, data
+
+
+class QrCardManifest:
+    """Maps each file in qr_cards/ to the cache key it was rendered from."""
+
+    def __init__(self, path: Path = QR_MANIFEST_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, str] | None = None
+        self._dirty = False
+
+    def _load(self) -> dict[str, str]:
+        if self._entries is None:
+            try:
+                self._entries = dict(json.loads(self.path.read_text(encoding="utf-8")))
+            except (OSError, ValueError, TypeError):
+                self._entries = {}
+        return self._entries
+
+    def is_current(self, filename: str, key: str) -> bool:
+        with self._lock:
+            current = self._load().get(filename) == key
+        return current and (self.path.parent / filename).exists()
+
+    def record(self, filename: str, key: str) -> None:
+        with self._lock:
+            self._load()[filename] = key
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = dict(self._load())
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(entries, sort_keys=True), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+qr_manifest = QrCardManifest()
+
+
+def generate_qr_card(
+    student_id: int,
+    name: str,
+    class_name: str,
+    manifest: QrCardManifest | None = None,
+) -> bool:
+    """Write the per-action PNGs and combined card, skipping files whose key is unchanged.
+
+    Files go next to the manifest, which is qr_cards/ unless another manifest is given.
+    """
+    manifest = manifest or qr_manifest
+    cards_dir = manifest.path.parent
+    cards_dir.mkdir(parents=True, exist_ok=True)
+    payloads = [(action, qr_payload(student_id, action)) for action in QR_ACTIONS]
+    assets = [
+        (build_student_qr_filename(name, class_name, action), qr_cache_key("qr", payload))
+        for action, payload in payloads
+    ]
+    card_asset = (
+        build_student_card_filename(name, class_name),
+        qr_cache_key("card", *(payload for _action, payload in payloads)),
+    )
+    stale = [asset for asset in [*assets, card_asset] if not manifest.is_current(*asset)]
+    if not stale:
+        cache_requests.inc("qr_card_files", "hit")
+        return False
+    cache_requests.inc("qr_card_files", "miss")
+
+    started = time.perf_counter()
+    qr_images = [render_qr_image(payload) for _action, payload in payloads]
+    for (filename, key), img in zip(assets, qr_images):
+        if (filename, key) in stale:
+            img.save(cards_dir / filename)
+            manifest.record(filename, key)
+
+    # Also create the combined card for legacy compatibility
+    if card_asset in stale:
+        render_card_image(qr_images).save(cards_dir / card_asset[0])
+        manifest.record(*card_asset)
+    qr_render_seconds.observe(time.perf_counter() - started, "card_files")
+    return True
+
+
+class QrCardWorker:
+    """Fills in missing or stale QR cards on a background thread."""
+
+    def __init__(self, manifest: QrCardManifest | None = None, save_every: int = 100) -> None:
+        self.manifest = manifest or qr_manifest
+        self.save_every = save_every
+        self._queue: queue.Queue[tuple[int, str, str] | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="qr-card-worker", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, students: list[tuple[int, str, str]]) -> None:
+        for student in students:
+            self._queue.put(student)
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        self.manifest.save()
+
+    def join(self) -> None:
+        self._queue.join()
+
+    def _run(self) -> None:
+        rendered = 0
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                try:
+                    if generate_qr_card(*item, manifest=self.manifest):
+                        rendered += 1
+                except (OSError, ValueError):
+                    pass
+                if self._queue.empty() or rendered % self.save_every == 0:
+                    self.manifest.save()
+            finally:
+                self._queue.task_done()
+
+
+qr_card_worker = QrCardWorker()
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from PIL import Image
+
+from .metrics import qr_decode_rejected, qr_decode_seconds
+
+
+QR_DECODE_WORKERS = int(os.getenv("EDUPOINTX_QR_DECODE_WORKERS", "2"))
+QR_DECODE_QUEUE = int(os.getenv("EDUPOINTX_QR_DECODE_QUEUE", "8"))
+QR_DECODE_TIMEOUT = float(os.getenv("EDUPOINTX_QR_DECODE_TIMEOUT", "10"))
+QR_DECODE_RETRY_AFTER = int(os.getenv("EDUPOINTX_QR_DECODE_RETRY_AFTER", "2"))
+QR_UPLOAD_MAX_BYTES = int(os.getenv("EDUPOINTX_QR_UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+# Reduced passes keep at least this many pixels on the long edge.
+QR_DECODE_FAST_EDGE = int(os.getenv("EDUPOINTX_QR_DECODE_FAST_EDGE", "1000"))
+UPLOAD_CHUNK_BYTES = 64 * 1024
+# Room for multipart boundaries, part headers and the small form fields sent beside the images.
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+_worker_state = threading.local()
+
+
+class DecodePoolSaturated(RuntimeError):
+    pass
+
+
+class DecodeTimeout(RuntimeError):
+    pass
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def _load_cv2():
+    try:
+        import cv2
+        import numpy as np
+    except ImportError as exc:
+        raise HTTPException(status_code=500, detail="QR scanning dependency is not installed.") from exc
+    return cv2, np
+
+
+def _detector(cv2):
+    # QRCodeDetector is not thread-safe but is cheap to keep, so each worker owns one.
+    detector = getattr(_worker_state, "detector", None)
+    if detector is None:
+        detector = _worker_state.detector = cv2.QRCodeDetector()
+    return detector
+
+
+def _image_size(image_bytes: bytes) -> tuple[int, int] | None:
+    """Read width and height from the header without decoding pixels."""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            return image.size
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+def _decode_passes(cv2, size: tuple[int, int] | None) -> list[tuple[str, int]]:
+    passes = []
+    if size is not None:
+        long_edge = max(size)
+        for factor, flag in (
+            (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+            (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+            (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+        ):
+            if long_edge // factor >= QR_DECODE_FAST_EDGE:
+                passes.append((f"reduced_{factor}", flag))
+                break
+    passes.append(("full", cv2.IMREAD_GRAYSCALE))
+    return passes
+
+
+def _detect(detector, image) -> list[str]:
+    decoded: list[str] = []
+    retval, decoded_info, _points, _ = detector.detectAndDecodeMulti(image)
+    if retval and decoded_info:
+        decoded.extend([item.strip() for item in decoded_info if item and item.strip()])
+
+    if not decoded:
+        single, _points, _ = detector.detectAndDecode(image)
+        if single and single.strip():
+            decoded.append(single.strip())
+
+    uniq: list[str] = []
+    seen: set[str] = set()
+    for item in decoded:
+        if item not in seen:
+            uniq.append(item)
+            seen.add(item)
+    return uniq
+
+
+def decode_qr_payloads(image_bytes: bytes) -> tuple[list[str], str | None]:
+    """Return the decoded strings and the name of the pass that found them.
+
+    A reduced grayscale decode is tried first; full resolution only runs when
+    it finds nothing.
+    """
+    cv2, np = _load_cv2()
+    detector = _detector(cv2)
+    np_bytes = np.frombuffer(image_bytes, dtype=np.uint8)
+    for pass_name, flag in _decode_passes(cv2, _image_size(image_bytes)):
+        image = cv2.imdecode(np_bytes, flag)
+        if image is None:
+            continue
+        decoded = _detect(detector, image)
+        del image
+        if decoded:
+            return decoded, pass_name
+    return [], None
+
+
+def decode_qr_strings(image_bytes: bytes) -> list[str]:
+    return decode_qr_payloads(image_bytes)[0]
+
+
+class UploadLimitMiddleware:
+    """Pure ASGI middleware capping request bodies before the multipart parser spools them.
+
+    ``limit_for(path)`` returns the byte cap for a POST path, or None for no
+    cap. A larger Content-Length is refused before any body is read; otherwise
+    bytes are counted as they arrive and the request fails with 413 as soon as
+    the cap is passed.
+    """
+
+    def __init__(self, app, limit_for: Callable[[str], int | None]) -> None:
+        self.app = app
+        self.limit_for = limit_for
+
+    async def __call__(self, scope, receive, send) -> None:
+        limit = self.limit_for(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        detail = "QR image is too large."
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside form parsing, so FastAPI answers with this 413.
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def read_upload(file: UploadFile, max_bytes: int = QR_UPLOAD_MAX_BYTES) -> bytes:
+    """Read a parsed upload in chunks, giving up as soon as it exceeds max_bytes.
+
+    UploadLimitMiddleware bounds the whole request body; this enforces the
+    per-image cap within a batch.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(f"Image is larger than {max_bytes} bytes.")
+    buffer = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+        buffer.extend(chunk)
+        if len(buffer) > max_bytes:
+            raise UploadTooLarge(f"Image is larger than {max_bytes} bytes.")
+    return bytes(buffer)
+
+
+class QrDecodePool:
+    """Runs decodes on dedicated threads; OpenCV releases the GIL while it works.
+
+    At most ``workers + queue_size`` jobs are admitted. Beyond that callers are
+    refused immediately instead of queueing behind a morning burst of uploads.
+    """
+
+    def __init__(
+        self,
+        workers: int = QR_DECODE_WORKERS,
+        queue_size: int = QR_DECODE_QUEUE,
+        timeout: float = QR_DECODE_TIMEOUT,
+    ) -> None:
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="qr-decode")
+            return self._executor
+
+    async def decode(self, image_bytes: bytes) -> tuple[list[str], str | None]:
+        if not self._slots.acquire(blocking=False):
+            qr_decode_rejected.inc()
+            raise DecodePoolSaturated("QR scanner is busy.")
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            future = self._get_executor().submit(decode_qr_payloads, image_bytes)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the job really finishes, even if the caller times out.
+        future.add_done_callback(lambda _future: self._slots.release())
+        try:
+            decoded, pass_name = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+            outcome = "decoded" if decoded else "not_found"
+            return decoded, pass_name
+        except asyncio.TimeoutError as exc:
+            future.cancel()
+            outcome = "timeout"
+            raise DecodeTimeout("QR decoding timed out.") from exc
+        finally:
+            qr_decode_seconds.observe(time.perf_counter() - started, outcome)
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+qr_decode_pool = QrDecodePool()
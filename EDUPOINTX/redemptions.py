@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from .ledger import charge_balances, chunked, seed_missing_balances, touch_balances
+from .models import Redemption, Reward, Student, StudentBalance
+from .rollups import record_approvals
+
+
+DECISIONS = {"approve", "reject"}
+MAX_ATTEMPTS = 3
+
+redemptions = Redemption.__table__
+rewards = Reward.__table__
+
+
+class RedemptionConflict(RuntimeError):
+    pass
+
+
+def _load_snapshot(session: Session, redemption_ids: list[int]) -> dict:
+    snapshot = {}
+    for chunk in chunked(redemption_ids):
+        rows = session.execute(
+            select(
+                Redemption.id,
+                Redemption.status,
+                Redemption.student_id,
+                Redemption.reward_id,
+                Redemption.created_at,
+                Student.id.label("known_student_id"),
+                Student.class_name,
+                Reward.cost,
+                Reward.stock,
+                StudentBalance.live_points,
+            )
+            .outerjoin(Student, Student.id == Redemption.student_id)
+            .outerjoin(Reward, Reward.id == Redemption.reward_id)
+            .outerjoin(StudentBalance, StudentBalance.student_id == Redemption.student_id)
+            .where(Redemption.id.in_(chunk))
+        )
+        snapshot.update({row.id: row for row in rows})
+    return snapshot
+
+
+def _set_pending_status(
+    session: Session, redemption_ids: list[int], status: str, charged_points: int | None = None
+) -> bool:
+    changed = 0
+    for chunk in chunked(redemption_ids):
+        changed += session.execute(
+            update(redemptions)
+            .where(redemptions.c.id.in_(chunk), redemptions.c.status == "pending")
+            .values(status=status, charged_points=charged_points)
+        ).rowcount
+    return changed == len(redemption_ids)
+
+
+def _attempt(session: Session, requested: dict[int, str]) -> dict[int, tuple[str, str | None]] | None:
+    """Plan and apply one pass; returns None when a guard saw a concurrent change."""
+    snapshot = _load_snapshot(session, list(requested))
+    unseeded = {row.student_id for row in snapshot.values() if row.known_student_id and row.live_points is None}
+    if unseeded:
+        seed_missing_balances(session, unseeded)
+        snapshot = _load_snapshot(session, list(requested))
+
+    outcome: dict[int, tuple[str, str | None]] = {}
+    approvals = []
+    rejects = []
+    for redemption_id, decision in requested.items():
+        row = snapshot.get(redemption_id)
+        if row is None:
+            outcome[redemption_id] = ("skipped", "not_found")
+        elif row.status != "pending":
+            outcome[redemption_id] = ("skipped", "not_pending")
+        elif decision == "reject":
+            rejects.append(row)
+        elif row.known_student_id is None or row.cost is None:
+            outcome[redemption_id] = ("skipped", "not_found")
+        else:
+            approvals.append(row)
+
+    # Oldest requests are served first when points or stock run short.
+    approvals.sort(key=lambda row: (row.created_at, row.id))
+    live = {row.student_id: int(row.live_points) for row in approvals}
+    stock = {row.reward_id: int(row.stock) for row in approvals}
+    charges: dict[int, int] = defaultdict(int)
+    taken: Counter[int] = Counter()
+    for row in approvals:
+        if stock[row.reward_id] <= 0:
+            outcome[row.id] = ("skipped", "out_of_stock")
+        elif live[row.student_id] < row.cost:
+            outcome[row.id] = ("skipped", "insufficient_points")
+        else:
+            stock[row.reward_id] -= 1
+            live[row.student_id] -= row.cost
+            charges[row.student_id] += int(row.cost)
+            taken[row.reward_id] += 1
+            outcome[row.id] = ("approved", None)
+
+    approved_ids = [redemption_id for redemption_id, (status, _) in outcome.items() if status == "approved"]
+    if approved_ids:
+        # One UPDATE per distinct cost, so each row records what it was charged.
+        by_cost: dict[int, list[int]] = defaultdict(list)
+        for redemption_id in approved_ids:
+            by_cost[int(snapshot[redemption_id].cost)].append(redemption_id)
+        for cost, ids in by_cost.items():
+            if not _set_pending_status(session, ids, "approved", cost):
+                return None
+        for reward_id, count in taken.items():
+            decremented = session.execute(
+                update(rewards)
+                .where(rewards.c.id == reward_id, rewards.c.stock >= count)
+                .values(stock=rewards.c.stock - count, version=rewards.c.version + 1)
+            ).rowcount
+            if decremented != 1:
+                return None
+        if not charge_balances(session, charges):
+            return None
+        approved_rows = [snapshot[redemption_id] for redemption_id in approved_ids]
+        record_approvals(
+            session,
+            ((row.created_at.date(), row.class_name, row.reward_id, int(row.cost)) for row in approved_rows),
+        )
+
+    if rejects:
+        if not _set_pending_status(session, [row.id for row in rejects], "rejected"):
+            return None
+        touch_balances(session, {row.student_id for row in rejects} - set(charges))
+        outcome.update({row.id: ("rejected", None) for row in rejects})
+    return outcome
+
+
+def decide_redemptions_bulk(session: Session, items: list[tuple[int, str]]) -> list[dict]:
+    """Apply approve/reject decisions in one transaction and report a result per item.
+
+    Expects no other pending changes on the session: a pass that loses a race
+    is rolled back and retried against fresh data. The caller commits.
+    """
+    requested: dict[int, str] = {}
+    invalid: dict[int, str] = {}
+    for index, (redemption_id, decision) in enumerate(items):
+        normalized = decision.strip().lower()
+        if normalized not in DECISIONS:
+            invalid[index] = "invalid_decision"
+        elif redemption_id in requested:
+            invalid[index] = "duplicate"
+        else:
+            requested[redemption_id] = normalized
+
+    outcome: dict[int, tuple[str, str | None]] = {}
+    if requested:
+        for _ in range(MAX_ATTEMPTS):
+            attempt = _attempt(session, requested)
+            if attempt is not None:
+                outcome = attempt
+                break
+            session.rollback()
+        else:
+            raise RedemptionConflict("Redemptions changed while decisions were applied. Please retry.")
+
+    results = []
+    for index, (redemption_id, decision) in enumerate(items):
+        if index in invalid:
+            status, reason = "skipped", invalid[index]
+        else:
+            status, reason = outcome[redemption_id]
+        results.append({"id": redemption_id, "decision": decision, "status": status, "reason": reason})
+    return results
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import os
+from collections import Counter
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import Connection, delete, desc, func, insert, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import (
+    Activity,
+    ArchivedActivity,
+    ArchivedRedemption,
+    ClassCategoryDaily,
+    ClassRewardDaily,
+    Redemption,
+    Reward,
+    Student,
+    Term,
+)
+
+
+PERIODS = ("all", "week", "month", "term")
+PERIOD_DAYS = {"week": 7, "month": 30}
+# Month-day pairs on which a school term begins, e.g. "01-01,05-01,09-01". Used
+# until a term has been closed; after that the current term starts the day after.
+TERM_STARTS = tuple(
+    tuple(int(part) for part in value.strip().split("-"))
+    for value in os.getenv("EDUPOINTX_TERM_STARTS", "01-01,05-01,09-01").split(",")
+    if value.strip()
+)
+
+category_daily = ClassCategoryDaily.__table__
+reward_daily = ClassRewardDaily.__table__
+
+
+class InvalidPeriod(ValueError):
+    pass
+
+
+def today() -> date:
+    # Timestamps are stored in UTC, so "today" is the UTC date as well.
+    return datetime.now(timezone.utc).date()
+
+
+def term_start(day: date, closed_through: date | None = None) -> date:
+    if closed_through is not None and closed_through < day:
+        return closed_through + timedelta(days=1)
+    starts = sorted(date(day.year, month, month_day) for month, month_day in TERM_STARTS)
+    passed = [start for start in starts if start <= day]
+    if passed:
+        return passed[-1]
+    return starts[-1].replace(year=day.year - 1)
+
+
+def period_window(db: Session, period: str, end: date | None = None) -> tuple[date | None, date | None]:
+    """(first day, last day) of a dashboard period; ``all`` is unbounded."""
+    if period not in PERIODS:
+        raise InvalidPeriod(f"Period must be one of: {', '.join(PERIODS)}.")
+    if period == "all":
+        return None, None
+    end = end or today()
+    if period == "term":
+        return term_start(end, db.scalar(select(func.max(Term.end_date)).where(Term.end_date < end))), end
+    return end - timedelta(days=PERIOD_DAYS[period] - 1), end
+
+
+def _upsert(session: Session, table, keys: list[str], rows: list[dict]) -> None:
+    """Add each row's counters onto the stored row with the same key, creating it if missing."""
+    if not rows:
+        return
+    dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(table)
+    counters = [column.name for column in table.columns if column.name not in keys]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: table.c[name] + stmt.excluded[name] for name in counters},
+    )
+    session.execute(stmt, rows)
+
+
+def record_activities(session: Session, day: date, awards: Iterable[tuple[str, str, int]]) -> None:
+    """Roll (class_name, category, points) awards made on ``day`` into the daily totals."""
+    counts: Counter[tuple[str, str]] = Counter()
+    points: Counter[tuple[str, str]] = Counter()
+    for class_name, category, award_points in awards:
+        counts[(class_name, category)] += 1
+        points[(class_name, category)] += award_points
+    _upsert(
+        session,
+        category_daily,
+        ["day", "class_name", "category"],
+        [
+            {
+                "day": day,
+                "class_name": class_name,
+                "category": category,
+                "activity_count": count,
+                "points": points[(class_name, category)],
+            }
+            for (class_name, category), count in sorted(counts.items())
+        ],
+    )
+
+
+def record_approvals(session: Session, approvals: Iterable[tuple[date, str, int, int]]) -> None:
+    """Roll (request day, class_name, reward_id, charged points) approvals into the daily totals."""
+    counts: Counter[tuple[date, str, int]] = Counter()
+    spent: Counter[tuple[date, str, int]] = Counter()
+    for day, class_name, reward_id, charged in approvals:
+        counts[(day, class_name, reward_id)] += 1
+        spent[(day, class_name, reward_id)] += charged
+    _upsert(
+        session,
+        reward_daily,
+        ["day", "class_name", "reward_id"],
+        [
+            {
+                "day": day,
+                "class_name": class_name,
+                "reward_id": reward_id,
+                "approved_count": count,
+                "spent_points": spent[(day, class_name, reward_id)],
+            }
+            for (day, class_name, reward_id), count in sorted(counts.items())
+        ],
+    )
+
+
+def rebuild_rollups(conn: Connection) -> None:
+    """Recompute both rollup tables from history, closed terms included, in two INSERT ... SELECT statements."""
+    conn.execute(delete(category_daily))
+    conn.execute(delete(reward_daily))
+    activities = union_all(
+        *(
+            select(model.student_id, model.category, model.points, model.created_at)
+            for model in (Activity, ArchivedActivity)
+        )
+    ).subquery()
+    redemptions = union_all(
+        *(
+            select(model.student_id, model.reward_id, model.charged_points, model.created_at).where(
+                model.status == "approved"
+            )
+            for model in (Redemption, ArchivedRedemption)
+        )
+    ).subquery()
+    activity_day = func.date(activities.c.created_at)
+    conn.execute(
+        insert(category_daily).from_select(
+            ["day", "class_name", "category", "activity_count", "points"],
+            select(
+                activity_day, Student.class_name, activities.c.category, func.count(), func.sum(activities.c.points)
+            )
+            .join(Student, Student.id == activities.c.student_id)
+            .group_by(activity_day, Student.class_name, activities.c.category),
+        )
+    )
+    redemption_day = func.date(redemptions.c.created_at)
+    conn.execute(
+        insert(reward_daily).from_select(
+            ["day", "class_name", "reward_id", "approved_count", "spent_points"],
+            select(
+                redemption_day,
+                Student.class_name,
+                redemptions.c.reward_id,
+                func.count(),
+                func.coalesce(func.sum(redemptions.c.charged_points), 0),
+            )
+            .join(Student, Student.id == redemptions.c.student_id)
+            .group_by(redemption_day, Student.class_name, redemptions.c.reward_id),
+        )
+    )
+
+
+def _filtered(stmt, table, class_name: str | None, start: date | None, end: date | None):
+    if class_name:
+        stmt = stmt.where(table.c.class_name == class_name)
+    if start is not None:
+        stmt = stmt.where(table.c.day >= start)
+    if end is not None:
+        stmt = stmt.where(table.c.day <= end)
+    return stmt
+
+
+def category_totals(db: Session, class_name: str, start: date | None, end: date | None) -> list[dict]:
+    total = func.sum(category_daily.c.points)
+    rows = db.execute(
+        _filtered(
+            select(category_daily.c.category, func.sum(category_daily.c.activity_count), total),
+            category_daily,
+            class_name,
+            start,
+            end,
+        )
+        .group_by(category_daily.c.category)
+        .order_by(desc(total), category_daily.c.category)
+    ).all()
+    return [
+        {"category": category, "count": int(count), "total_points": int(total_points)}
+        for category, count, total_points in rows
+    ]
+
+
+def daily_points(db: Session, class_name: str, start: date | None, end: date | None) -> list[dict]:
+    rows = db.execute(
+        _filtered(
+            select(category_daily.c.day, func.sum(category_daily.c.points)),
+            category_daily,
+            class_name,
+            start,
+            end,
+        )
+        .group_by(category_daily.c.day)
+        .order_by(category_daily.c.day)
+    ).all()
+    return [{"date": str(day), "points": int(points)} for day, points in rows]
+
+
+def approval_timeline(db: Session, class_name: str | None, start: date | None, end: date | None) -> list[dict]:
+    rows = db.execute(
+        _filtered(
+            select(reward_daily.c.day, func.sum(reward_daily.c.approved_count)),
+            reward_daily,
+            class_name,
+            start,
+            end,
+        )
+        .group_by(reward_daily.c.day)
+        .order_by(reward_daily.c.day)
+    ).all()
+    return [{"date": str(day), "count": int(count)} for day, count in rows]
+
+
+def reward_totals(
+    db: Session, class_name: str | None, start: date | None, end: date | None, limit: int = 10
+) -> tuple[list[dict], int]:
+    """(most approved rewards, points spent on approvals at the cost charged)."""
+    count = func.sum(reward_daily.c.approved_count)
+    rows = db.execute(
+        _filtered(
+            select(Reward.name, count, func.sum(reward_daily.c.spent_points))
+            .select_from(reward_daily)
+            .join(Reward, Reward.id == reward_daily.c.reward_id),
+            reward_daily,
+            class_name,
+            start,
+            end,
+        )
+        .group_by(Reward.id, Reward.name)
+        .order_by(desc(count), Reward.id)
+    ).all()
+    total_spent = sum(int(spent) for _name, _approved, spent in rows)
+    return [{"name": name, "count": int(approved)} for name, approved, _spent in rows[:limit]], total_spent
+
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import csv
+from typing import IO
+
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.orm import Session
+
+from .awards import CSV_MAX_ROWS, CsvFormatError
+from .ledger import chunked
+from .models import Student, StudentBalance, User
+from .services import _make_unique_username
+
+
+USERNAME_BASE_LENGTH = 40
+
+students = Student.__table__
+balances = StudentBalance.__table__
+users = User.__table__
+
+
+class RosterChanged(RuntimeError):
+    pass
+
+
+def parse_roster_csv(stream: IO[str], max_rows: int = CSV_MAX_ROWS) -> tuple[list[dict], list[dict]]:
+    """Read ``name``, ``class_name`` (or ``class``) and optional ``gender``/``username`` rows.
+
+    Returns (rows, row errors); row numbers count the header as row 1.
+    """
+    reader = csv.DictReader(stream)
+    headers = {(name or "").strip().lower() for name in reader.fieldnames or []}
+    if not headers:
+        raise CsvFormatError("The CSV file is empty.")
+    if "name" not in headers or not headers & {"class_name", "class"}:
+        raise CsvFormatError("Add name and class_name columns.")
+
+    rows: list[dict] = []
+    errors: list[dict] = []
+    for line_number, raw in enumerate(reader, start=2):
+        if len(rows) + len(errors) >= max_rows:
+            raise CsvFormatError(f"Upload at most {max_rows} rows at once.")
+        row = {(key or "").strip().lower(): value.strip() for key, value in raw.items() if isinstance(value, str)}
+        if not any(row.values()):
+            continue
+        name = " ".join(row.get("name", "").split())
+        class_name = " ".join((row.get("class_name") or row.get("class") or "").split())
+        if not name or not class_name:
+            errors.append({"row": line_number, "error": "Name and class_name are required."})
+            continue
+        if len(name) > 100 or len(class_name) > 50:
+            errors.append({"row": line_number, "error": "Name or class_name is too long."})
+            continue
+        rows.append(
+            {
+                "row": line_number,
+                "name": name,
+                "class_name": class_name,
+                "gender": row.get("gender") or None,
+                "username": row.get("username") or None,
+            }
+        )
+    return rows, errors
+
+
+def split_new_rows(session: Session, rows: list[dict]) -> tuple[list[dict], list[dict]]:
+    """Return (rows to create, skipped rows) for students not already on the roster.
+
+    Students that already exist, or repeat earlier in the file, are skipped so
+    an import can be re-run.
+    """
+    keys = sorted({(row["name"].lower(), row["class_name"].lower()) for row in rows})
+    lowered = tuple_(func.lower(Student.name), func.lower(Student.class_name))
+    existing: set[tuple[str, str]] = set()
+    for chunk in chunked(keys, 250):
+        existing.update(
+            (name.lower(), class_name.lower())
+            for name, class_name in session.execute(select(Student.name, Student.class_name).where(lowered.in_(chunk)))
+        )
+
+    new_rows: list[dict] = []
+    skipped: list[dict] = []
+    for row in rows:
+        key = (row["name"].lower(), row["class_name"].lower())
+        if key in existing:
+            skipped.append({"row": row["row"], "name": row["name"], "class_name": row["class_name"]})
+            continue
+        existing.add(key)
+        new_rows.append(row)
+    return new_rows, skipped
+
+
+def import_roster(session: Session, rows: list[dict], password_hashes: list[str]) -> tuple[list[dict], list[dict]]:
+    """Create a student, ledger row and login for each new (name, class) pair.
+
+    ``password_hashes`` holds one hash per new student, counted beforehand with
+    split_new_rows so the KDF never runs inside the write transaction.
+    Usernames are made unique against one preloaded set. Returns (created
+    students with their usernames, skipped rows); the caller commits.
+    """
+    new_rows, skipped = split_new_rows(session, rows)
+    if len(new_rows) > len(password_hashes):
+        raise RosterChanged("The roster changed during the import. Please retry.")
+    if not new_rows:
+        return [], skipped
+
+    # New rows are unique on (name, class), so RETURNING rows are matched by key;
+    # asking SQLite for parameter order would fall back to one INSERT per row.
+    by_key: dict[tuple[str, str], int] = {}
+    for chunk in chunked(new_rows):
+        result = session.execute(
+            insert(students).returning(students.c.id, students.c.name, students.c.class_name),
+            [
+                {"name": row["name"], "class_name": row["class_name"], "gender": row["gender"], "total_points": 0}
+                for row in chunk
+            ],
+        )
+        by_key.update(((name.lower(), class_name.lower()), student_id) for student_id, name, class_name in result)
+    created = [
+        {
+            "student_id": by_key[(row["name"].lower(), row["class_name"].lower())],
+            "name": row["name"],
+            "class_name": row["class_name"],
+            "requested": row["username"],
+        }
+        for row in new_rows
+    ]
+
+    usernames = set(session.scalars(select(User.username)))
+    for student in created:
+        requested = student.pop("requested") or student["name"]
+        student["username"] = _make_unique_username(requested[:USERNAME_BASE_LENGTH], usernames)
+
+    balance_params = [
+        {"student_id": student["student_id"], "earned_points": 0, "spent_points": 0, "live_points": 0, "version": 1}
+        for student in created
+    ]
+    user_params = [
+        {
+            "username": student["username"],
+            "password_hash": password_hash,
+            "role": "student",
+            "student_id": student["student_id"],
+            "teacher_id": None,
+        }
+        for student, password_hash in zip(created, password_hashes)
+    ]
+    for chunk in chunked(balance_params):
+        session.execute(insert(balances), chunk)
+    for chunk in chunked(user_params):
+        session.execute(insert(users), chunk)
+    return created, skipped
@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.engine import Connection, Engine
+
+from .database import engine
+from .migrations import run_migrations
+from .models import Activity, Redemption, Reward, Student, StudentBalance, Teacher, TeacherClass, User
+from .passwords import password_pool
+from .rollups import rebuild_rollups
+from .services import DEFAULT_PASSWORD, _make_unique_username
+
+
+INSERT_CHUNK_ROWS = 5000
+
+STREAMS = ["Bestari", "Amanah", "Cemerlang", "Dedikasi", "Efisien", "Fikrah", "Gemilang", "Harmoni", "Ikhlas", "Jaya"]
+MALE_NAMES = ["Ahmad", "Ali", "Aqil", "Danial", "Faris", "Haziq", "Irfan", "Luqman", "Muhammad", "Zikri"]
+FEMALE_NAMES = ["Aishah", "Alya", "Fatimah", "Humaira", "Nabila", "Nur", "Siti", "Sofea", "Atikah", "Zahra"]
+FAMILY_NAMES = ["Karim", "Hakeem", "Rahman", "Ismail", "Hassan", "Yusof", "Ibrahim", "Osman", "Salleh", "Aziz"]
+DEEDS = {
+    "Discipline": ["Picked up trash after assembly", "Arrived early all week", "Kept the classroom tidy"],
+    "Academics": ["Completed homework early", "Top scorer in class quiz", "Helped a classmate revise"],
+    "Sports": ["Helped team during training", "Won a sports day event", "Led the warm-up"],
+    "Leadership": ["Led group project presentation", "Organised a class activity", "Mentored a junior"],
+    "Other": ["Volunteered at the library", "Helped arrange classroom materials", "Joined a school event"],
+}
+POINT_CHOICES = [5, 10, 10, 15, 20, 20, 25, 30]
+REWARD_ITEMS = ["Stationery Set", "Canteen Voucher", "Library Fast Pass", "Notebook Pack", "Healthy Snack", "Badge"]
+
+
+@dataclass(frozen=True)
+class ScaleSpec:
+    classes: int
+    students: int
+    activities: int
+    redemptions: int
+    rewards: int = 40
+    days: int = 365
+    end: date = date(2025, 12, 31)
+
+
+PRESETS: dict[str, ScaleSpec] = {
+    "small": ScaleSpec(classes=7, students=200, activities=5_000, redemptions=500, rewards=10),
+    "medium": ScaleSpec(classes=20, students=2_000, activities=200_000, redemptions=20_000),
+    "large": ScaleSpec(classes=50, students=10_000, activities=2_000_000, redemptions=200_000),
+}
+
+
+class DatasetNotEmpty(RuntimeError):
+    pass
+
+
+def _class_names(count: int) -> list[str]:
+    base = [f"{form} {stream}" for stream in STREAMS for form in range(1, 6)]
+    return [
+        base[index % len(base)] + (f" {index // len(base) + 1}" if index >= len(base) else "")
+        for index in range(count)
+    ]
+
+
+def _insert_ids(conn: Connection, table, rows: list[dict]) -> list[int]:
+    """Insert rows in chunks and return their ids in row order.
+
+    A single writer gets ascending ids, so this avoids RETURNING, which SQLite
+    cannot order by parameter.
+    """
+    last_id = conn.scalar(select(func.coalesce(func.max(table.c.id), 0)))
+    for start in range(0, len(rows), INSERT_CHUNK_ROWS):
+        conn.execute(insert(table), rows[start : start + INSERT_CHUNK_ROWS])
+    return list(conn.scalars(select(table.c.id).where(table.c.id > last_id).order_by(table.c.id)))
+
+
+def _spread(total: int, days: int) -> list[int]:
+    per_day, extra = divmod(total, days)
+    return [per_day + (1 if day < extra else 0) for day in range(days)]
+
+
+def _school_day_times(rng: random.Random, day: date, count: int) -> list[datetime]:
+    opening = datetime.combine(day, datetime.min.time()) + timedelta(hours=7)
+    return [opening + timedelta(seconds=offset) for offset in sorted(rng.randrange(10 * 3600) for _ in range(count))]
+
+
+def generate_dataset(spec: ScaleSpec, seed: int = 1, target_engine: Engine = engine) -> dict[str, int]:
+    """Fill an empty database with a deterministic school of ``spec``'s size.
+
+    The same seed and spec always give the same rows. History is written in
+    time order, approvals only spend points already earned, and balances are
+    written from the running totals so no ledger rebuild is needed. The daily
+    rollups are computed from the finished history in one pass.
+    """
+    run_migrations(target_engine)
+    rng = random.Random(seed)
+    class_names = _class_names(spec.classes)
+    teacher_count = max(1, (spec.classes + 1) // 2)
+
+    with target_engine.connect() as conn:
+        if conn.scalar(select(func.count()).select_from(Student)):
+            raise DatasetNotEmpty("The database already has students; point DATABASE_URL at a new file.")
+    # Every login gets its own salt, hashed before the write transaction opens.
+    password_hashes = iter(password_pool.hash_many(DEFAULT_PASSWORD, spec.students + teacher_count + 1))
+
+    with target_engine.begin() as conn:
+        teacher_rows = [
+            {
+                "name": f"Cikgu {rng.choice(MALE_NAMES + FEMALE_NAMES)} {rng.choice(FAMILY_NAMES)} {index + 1}",
+                "gender": None,
+            }
+            for index in range(teacher_count)
+        ]
+        teacher_rows.append({"name": "Scale Admin", "gender": None})
+        teacher_ids = _insert_ids(conn, Teacher.__table__, teacher_rows)
+        admin_id = teacher_ids[-1]
+        teacher_by_class = {class_name: teacher_ids[index // 2] for index, class_name in enumerate(class_names)}
+        conn.execute(
+            insert(TeacherClass.__table__),
+            [{"teacher_id": teacher_id, "class_name": name} for name, teacher_id in teacher_by_class.items()]
+            + [{"teacher_id": admin_id, "class_name": name} for name in class_names],
+        )
+
+        student_rows = []
+        for _index in range(spec.students):
+            gender = rng.choice(("male", "female"))
+            first = rng.choice(MALE_NAMES if gender == "male" else FEMALE_NAMES)
+            student_rows.append(
+                {
+                    "name": f"{first} {rng.choice(FAMILY_NAMES)}",
+                    "class_name": rng.choice(class_names),
+                    "gender": gender,
+                    "total_points": 0,
+                }
+            )
+        student_ids = _insert_ids(conn, Student.__table__, student_rows)
+        student_classes = [row["class_name"] for row in student_rows]
+
+        usernames: set[str] = set()
+        user_rows = [
+            {
+                "username": _make_unique_username(row["name"], usernames),
+                "password_hash": next(password_hashes),
+                "role": "student",
+                "student_id": student_id,
+                "teacher_id": None,
+            }
+            for student_id, row in zip(student_ids, student_rows)
+        ]
+        user_rows.extend(
+            {
+                "username": _make_unique_username(
+                    "admin" if teacher_id == admin_id else f"teacher{teacher_id}", usernames
+                ),
+                "password_hash": next(password_hashes),
+                "role": "admin" if teacher_id == admin_id else "teacher",
+                "student_id": None,
+                "teacher_id": teacher_id,
+            }
+            for teacher_id in teacher_ids
+        )
+        for start in range(0, len(user_rows), INSERT_CHUNK_ROWS):
+            conn.execute(insert(User.__table__), user_rows[start : start + INSERT_CHUNK_ROWS])
+
+        reward_rows = [
+            {
+                "name": f"{REWARD_ITEMS[index % len(REWARD_ITEMS)]} {index + 1}",
+                "description": "Generated reward.",
+                "cost": rng.randrange(50, 301, 10),
+                "stock": rng.randrange(5, 51),
+                "source": rng.choice(("Coop", "Canteen")),
+            }
+            for index in range(spec.rewards)
+        ]
+        reward_ids = _insert_ids(conn, Reward.__table__, reward_rows)
+        reward_costs = [row["cost"] for row in reward_rows]
+
+        # Day by day so ids follow created_at and approvals see points earned so far.
+        earned = [0] * len(student_ids)
+        spent = [0] * len(student_ids)
+        categories = list(DEEDS)
+        first_day = spec.end - timedelta(days=spec.days - 1)
+        pending_from = spec.end - timedelta(days=14)
+        activity_buffer: list[dict] = []
+        redemption_buffer: list[dict] = []
+        activity_days = _spread(spec.activities, spec.days)
+        redemption_days = _spread(spec.redemptions, spec.days)
+        for day_index in range(spec.days):
+            day = first_day + timedelta(days=day_index)
+            for created_at in _school_day_times(rng, day, activity_days[day_index]):
+                # Skewed pick: a minority of students collects most of the points.
+                student = int(len(student_ids) * rng.random() ** 1.5)
+                category = rng.choice(categories)
+                points = rng.choice(POINT_CHOICES)
+                earned[student] += points
+                activity_buffer.append(
+                    {
+                        "student_id": student_ids[student],
+                        "teacher_id": teacher_by_class[student_classes[student]],
+                        "category": category,
+                        "points": points,
+                        "reason": rng.choice(DEEDS[category]),
+                        "created_at": created_at,
+                    }
+                )
+            for created_at in _school_day_times(rng, day, redemption_days[day_index]):
+                student = int(len(student_ids) * rng.random() ** 1.5)
+                reward = rng.randrange(len(reward_ids))
+                roll = rng.random()
+                if day >= pending_from and roll < 0.3:
+                    status = "pending"
+                elif roll < 0.9 and earned[student] - spent[student] >= reward_costs[reward]:
+                    status = "approved"
+                    spent[student] += reward_costs[reward]
+                else:
+                    status = "rejected"
+                redemption_buffer.append(
+                    {
+                        "student_id": student_ids[student],
+                        "reward_id": reward_ids[reward],
+                        "status": status,
+                        "charged_points": reward_costs[reward] if status == "approved" else None,
+                        "created_at": created_at,
+                    }
+                )
+            if len(activity_buffer) >= INSERT_CHUNK_ROWS:
+                conn.execute(insert(Activity.__table__), activity_buffer)
+                activity_buffer.clear()
+            if len(redemption_buffer) >= INSERT_CHUNK_ROWS:
+                conn.execute(insert(Redemption.__table__), redemption_buffer)
+                redemption_buffer.clear()
+        if activity_buffer:
+            conn.execute(insert(Activity.__table__), activity_buffer)
+        if redemption_buffer:
+            conn.execute(insert(Redemption.__table__), redemption_buffer)
+
+        balance_rows = [
+            {
+                "student_id": student_id,
+                "earned_points": earned[index],
+                "spent_points": spent[index],
+                "live_points": earned[index] - spent[index],
+                "version": 1,
+            }
+            for index, student_id in enumerate(student_ids)
+        ]
+        for start in range(0, len(balance_rows), INSERT_CHUNK_ROWS):
+            conn.execute(insert(StudentBalance.__table__), balance_rows[start : start + INSERT_CHUNK_ROWS])
+        students = Student.__table__
+        conn.execute(
+            update(students).where(students.c.id == bindparam("b_id")).values(total_points=bindparam("b_points")),
+            [{"b_id": row["student_id"], "b_points": row["live_points"]} for row in balance_rows],
+        )
+        rebuild_rollups(conn)
+
+    return {
+        "classes": len(class_names),
+        "teachers": len(teacher_ids),
+        "students": len(student_ids),
+        "rewards": len(reward_ids),
+        "activities": spec.activities,
+        "redemptions": spec.redemptions,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fill an empty database (DATABASE_URL) with a deterministic synthetic school."
+    )
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="large")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--classes", type=int, help="override the preset's class count")
+    parser.add_argument("--students", type=int, help="override the preset's student count")
+    parser.add_argument("--activities", type=int, help="override the preset's activity count")
+    parser.add_argument("--redemptions", type=int, help="override the preset's redemption count")
+    parser.add_argument("--rewards", type=int, help="override the preset's reward count")
+    parser.add_argument("--days", type=int, help="length of the generated history in days")
+    args = parser.parse_args()
+
+    overrides = {
+        field: getattr(args, field)
+        for field in ("classes", "students", "activities", "redemptions", "rewards", "days")
+        if getattr(args, field) is not None
+    }
+    spec = replace(PRESETS[args.preset], **overrides)
+    started = time.perf_counter()
+    try:
+        counts = generate_dataset(spec, seed=args.seed)
+    except DatasetNotEmpty as exc:
+        parser.exit(1, f"{exc}\n")
+    summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+    print(f"Generated {summary} in {time.perf_counter() - started:.1f}s (seed {args.seed}).")
@@ -1,22 +1,19 @@
 from __future__ import annotations
 
-import hashlib
 import re
 from datetime import datetime
 from pathlib import Path
 
-from sqlalchemy import func, select
+from sqlalchemy import bindparam, func, insert, select, tuple_, update
 from sqlalchemy.orm import Session
 
+from .ledger import chunked, get_live_points, rebuild_student_balances
 from .models import Activity, Redemption, Reward, Student, Teacher, TeacherClass, User
+from .passwords import password_pool
+from .rollups import rebuild_rollups
 
 
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode("utf-8")).hexdigest()
-
-
-def verify_password(password: str, stored_hash: str) -> bool:
-    return hash_password(password) == stored_hash or password == stored_hash
+DEFAULT_PASSWORD = "password123"
 
 
 def _parse_student_card_filename(file_name: str) -> tuple[str, str] | None:
@@ -111,204 +108,282 @@ DEMO_REWARDS: list[tuple[str, str, int, int, str]] = [
 ]
 
 
-def _get_student(session: Session, name: str, class_name: str) -> Student | None:
-    return session.scalar(
-        select(Student).where(
-            func.lower(Student.name) == name.lower(),
-            func.lower(Student.class_name) == class_name.lower(),
-        )
-    )
-
-
-def _get_teacher(session: Session, name: str) -> Teacher | None:
-    return session.scalar(select(Teacher).where(func.lower(Teacher.name) == name.lower()))
-
-
-def _get_reward(session: Session, name: str) -> Reward | None:
-    return session.scalar(select(Reward).where(func.lower(Reward.name) == name.lower()))
-
-
-def _ensure_student(session: Session, name: str, class_name: str, gender: str | None, points: int) -> Student:
-    student = _get_student(session, name, class_name)
-    if student is None:
-        student = Student(name=name, class_name=class_name, gender=gender, total_points=points)
-        session.add(student)
-        session.flush()
-    else:
-        if gender and not student.gender:
-            student.gender = gender
-    return student
-
-
-def _ensure_teacher(session: Session, name: str, gender: str | None) -> Teacher:
-    teacher = _get_teacher(session, name)
-    if teacher is None:
-        teacher = Teacher(name=name, gender=gender)
-        session.add(teacher)
-        session.flush()
-    else:
-        if gender and not teacher.gender:
-            teacher.gender = gender
-    return teacher
-
+SAMPLE_ACTIVITIES: list[tuple[str, str, str, str, int, str]] = [
+    ("Ali Karim", "1 Bestari", "hassan", "Discipline", 20, "Picked up trash after assembly"),
+    ("Fatimah Zahra", "1 Bestari", "hassan", "Leadership", 30, "Led group project presentation"),
+    ("Muhammad Fariz", "1 Bestari", "hassan", "Academics", 25, "Completed homework early"),
+    ("Afiq Haziq", "1 Bestari", "hassan", "Sports", 15, "Helped team during training"),
+    ("Siti Nabila", "2 Amanah", "aishah", "Academic", 40, "Top scorer in mathematics test"),
+    ("Aqil Danish", "3 Cemerlang", "aishah", "Volunteerism", 20, "Helped arrange classroom materials"),
+]
 
-def _ensure_reward(session: Session, name: str, description: str, cost: int, stock: int, source: str) -> Reward:
-    reward = _get_reward(session, name)
-    if reward is None:
-        reward = Reward(name=name, description=description, cost=cost, stock=stock, source=source)
-        session.add(reward)
-        session.flush()
-    return reward
+students = Student.__table__
+teachers = Teacher.__table__
+teacher_classes = TeacherClass.__table__
+rewards = Reward.__table__
+users = User.__table__
+activities = Activity.__table__
+redemptions = Redemption.__table__
+
+StudentKey = tuple[str, str]
+
+
+def _student_key(name: str, class_name: str) -> StudentKey:
+    return name.lower(), class_name.lower()
+
+
+def _upsert_students(session: Session, wanted: list[tuple[str, str, str | None, int]]) -> dict[StudentKey, int]:
+    """Get-or-create students by case-insensitive (name, class); fills in a missing gender.
+
+    Returns ids by key. One lookup per 250 keys plus one insert per chunk of new rows.
+    """
+    keys = list(dict.fromkeys(_student_key(name, class_name) for name, class_name, _gender, _points in wanted))
+    lowered = tuple_(func.lower(Student.name), func.lower(Student.class_name))
+    found: dict[StudentKey, tuple[int, str | None]] = {}
+    for chunk in chunked(keys, 250):
+        for student_id, name, class_name, gender in session.execute(
+            select(Student.id, Student.name, Student.class_name, Student.gender).where(lowered.in_(chunk))
+        ):
+            found.setdefault(_student_key(name, class_name), (student_id, gender))
+
+    ids = {key: student_id for key, (student_id, _gender) in found.items()}
+    new_rows: dict[StudentKey, dict] = {}
+    gender_updates: dict[int, str] = {}
+    for name, class_name, gender, points in wanted:
+        key = _student_key(name, class_name)
+        if key in found:
+            if gender and not found[key][1]:
+                gender_updates.setdefault(found[key][0], gender)
+        else:
+            new_rows.setdefault(
+                key, {"name": name, "class_name": class_name, "gender": gender, "total_points": points}
+            )
+
+    for chunk in chunked(list(new_rows.values())):
+        result = session.execute(
+            insert(students).returning(students.c.id, students.c.name, students.c.class_name), chunk
+        )
+        ids.update((_student_key(name, class_name), student_id) for student_id, name, class_name in result)
+    if gender_updates:
+        session.execute(
+            update(students).where(students.c.id == bindparam("b_id")).values(gender=bindparam("b_gender")),
+            [{"b_id": student_id, "b_gender": gender} for student_id, gender in gender_updates.items()],
+        )
+    return ids
+
+
+def _upsert_teachers(session: Session, wanted: list[tuple[str, str | None]]) -> dict[str, int]:
+    """Get-or-create teachers by case-insensitive name; returns ids by lowered name."""
+    found: dict[str, tuple[int, str | None]] = {}
+    names = sorted({name.lower() for name, _gender in wanted})
+    for teacher_id, name, gender in session.execute(
+        select(Teacher.id, Teacher.name, Teacher.gender).where(func.lower(Teacher.name).in_(names))
+    ):
+        found.setdefault(name.lower(), (teacher_id, gender))
+
+    ids = {key: teacher_id for key, (teacher_id, _gender) in found.items()}
+    new_rows = [{"name": name, "gender": gender} for name, gender in wanted if name.lower() not in found]
+    if new_rows:
+        result = session.execute(insert(teachers).returning(teachers.c.id, teachers.c.name), new_rows)
+        ids.update((name.lower(), teacher_id) for teacher_id, name in result)
+    gender_updates = [
+        {"b_id": found[name.lower()][0], "b_gender": gender}
+        for name, gender in wanted
+        if name.lower() in found and gender and not found[name.lower()][1]
+    ]
+    if gender_updates:
+        session.execute(
+            update(teachers).where(teachers.c.id == bindparam("b_id")).values(gender=bindparam("b_gender")),
+            gender_updates,
+        )
+    return ids
 
 
-def _ensure_user(
+def _upsert_users(
     session: Session,
-    username_base: str,
-    role: str,
-    existing_usernames: set[str],
-    student_id: int | None = None,
-    teacher_id: int | None = None,
-    reset_password: bool = True,
-) -> User:
-    linked_user = None
-    if student_id is not None:
-        linked_user = session.scalar(select(User).where(User.student_id == student_id))
-    elif teacher_id is not None:
-        linked_user = session.scalar(select(User).where(User.teacher_id == teacher_id))
-
-    if linked_user is not None:
-        if reset_password:
-            linked_user.password_hash = hash_password("password123")
-        if linked_user.role != role:
-            linked_user.role = role
-        existing_usernames.add(linked_user.username)
-        return linked_user
-
-    preferred_username = re.sub(r"[^a-z0-9]", "", username_base.lower()) or role
-    existing = session.scalar(select(User).where(User.username == preferred_username))
-    if existing is None and preferred_username not in existing_usernames:
-        username = preferred_username
-        existing_usernames.add(username)
-    else:
-        username = _make_unique_username(username_base, existing_usernames)
-
-    user = User(
-        username=username,
-        password_hash=hash_password("password123"),
-        role=role,
-        student_id=student_id,
-        teacher_id=teacher_id,
-    )
-    session.add(user)
-    session.flush()
-    return user
+    accounts: list[tuple[str, str, int | None, int | None, bool]],
+    password: str,
+) -> None:
+    """Link one login to each (username base, role, student_id, teacher_id, reset_password).
+
+    Existing linked logins get their role corrected and, when asked, their
+    password reset; the rest are created with unique usernames. Every login is
+    read once up front instead of up to two lookups per account, and each new
+    or reset login gets its own salted hash from the password pool.
+    """
+    usernames: set[str] = set()
+    by_student: dict[int, tuple[int, str]] = {}
+    by_teacher: dict[int, tuple[int, str]] = {}
+    for user_id, username, role, student_id, teacher_id in session.execute(
+        select(User.id, User.username, User.role, User.student_id, User.teacher_id).order_by(User.id)
+    ):
+        usernames.add(username)
+        if student_id is not None:
+            by_student.setdefault(student_id, (user_id, role))
+        if teacher_id is not None:
+            by_teacher.setdefault(teacher_id, (user_id, role))
+
+    new_rows: list[dict] = []
+    resets: list[dict] = []
+    role_fixes: list[dict] = []
+    created_links: set[tuple[str, int]] = set()
+    for username_base, role, student_id, teacher_id, reset_password in accounts:
+        link = ("student", student_id) if student_id is not None else ("teacher", teacher_id)
+        if link in created_links:
+            continue
+        linked = by_student.get(student_id) if student_id is not None else by_teacher.get(teacher_id)
+        if linked is not None:
+            user_id, current_role = linked
+            if reset_password:
+                resets.append({"b_id": user_id, "b_role": role})
+            elif current_role != role:
+                role_fixes.append({"b_id": user_id, "b_role": role})
+            continue
+
+        preferred_username = re.sub(r"[^a-z0-9]", "", username_base.lower()) or role
+        if preferred_username not in usernames:
+            username = preferred_username
+            usernames.add(username)
+        else:
+            username = _make_unique_username(username_base, usernames)
+        new_rows.append(
+            {
+                "username": username,
+                "role": role,
+                "student_id": student_id,
+                "teacher_id": teacher_id,
+            }
+        )
+        created_links.add(link)
+
+    password_hashes = iter(password_pool.hash_many(password, len(new_rows) + len(resets)))
+    for row in new_rows:
+        row["password_hash"] = next(password_hashes)
+    for row in resets:
+        row["b_hash"] = next(password_hashes)
+
+    for chunk in chunked(new_rows):
+        session.execute(insert(users), chunk)
+    by_id = users.c.id == bindparam("b_id")
+    if resets:
+        session.execute(
+            update(users).where(by_id).values(role=bindparam("b_role"), password_hash=bindparam("b_hash")), resets
+        )
+    if role_fixes:
+        session.execute(update(users).where(by_id).values(role=bindparam("b_role")), role_fixes)
 
 
-def _ensure_teacher_class(session: Session, teacher_id: int, class_name: str) -> None:
-    existing = session.scalar(
-        select(TeacherClass).where(
-            TeacherClass.teacher_id == teacher_id,
-            TeacherClass.class_name == class_name,
-        )
+def _ensure_teacher_classes(session: Session, assignments: list[tuple[int, str]]) -> None:
+    teacher_ids = sorted({teacher_id for teacher_id, _class_name in assignments})
+    existing = set(
+        session.execute(
+            select(TeacherClass.teacher_id, TeacherClass.class_name).where(TeacherClass.teacher_id.in_(teacher_ids))
+        ).tuples()
     )
-    if existing is None:
-        session.add(TeacherClass(teacher_id=teacher_id, class_name=class_name))
+    missing = [
+        {"teacher_id": teacher_id, "class_name": class_name}
+        for teacher_id, class_name in dict.fromkeys(assignments)
+        if (teacher_id, class_name) not in existing
+    ]
+    if missing:
+        session.execute(insert(teacher_classes), missing)
+
+
+def _upsert_rewards(session: Session, wanted: list[tuple[str, str, int, int, str]]) -> dict[str, int]:
+    """Create rewards missing by case-insensitive name; existing ones are left as admins edited them."""
+    names = sorted({name.lower() for name, *_rest in wanted})
+    ids: dict[str, int] = {}
+    for reward_id, name in session.execute(select(Reward.id, Reward.name).where(func.lower(Reward.name).in_(names))):
+        ids.setdefault(name.lower(), reward_id)
+    new_rows = [
+        {"name": name, "description": description, "cost": cost, "stock": stock, "source": source}
+        for name, description, cost, stock, source in wanted
+        if name.lower() not in ids
+    ]
+    if new_rows:
+        result = session.execute(insert(rewards).returning(rewards.c.id, rewards.c.name), new_rows)
+        ids.update((name.lower(), reward_id) for reward_id, name in result)
+    return ids
 
 
 def ensure_demo_data(session: Session, qr_cards_dir: Path) -> None:
-    existing_usernames: set[str] = set(session.scalars(select(User.username)).all())
-
-    seeded_students: dict[tuple[str, str], Student] = {}
-    for name, class_name, gender, points in DEMO_STUDENTS:
-        student = _ensure_student(session, name, class_name, gender, points)
-        seeded_students[(name.lower(), class_name.lower())] = student
-        _ensure_user(
-            session,
-            name,
-            "student",
-            existing_usernames,
-            student_id=student.id,
-            reset_password=name in REQUESTED_DEMO_STUDENT_NAMES,
-        )
+    """Upsert the demo school in a fixed number of statements, however many rows exist."""
+    demo_keys = {_student_key(name, class_name) for name, class_name, _gender, _points in DEMO_STUDENTS}
+    student_ids = _upsert_students(session, DEMO_STUDENTS)
+    accounts = [
+        (name, "student", student_ids[_student_key(name, class_name)], None, name in REQUESTED_DEMO_STUDENT_NAMES)
+        for name, class_name, _gender, _points in DEMO_STUDENTS
+    ]
 
     # Seed additional demo students from existing combined QR cards only when the
-    # database is empty. This avoids creating students from generated QR action files.
-    if session.scalar(select(func.count()).select_from(Student)) <= len(seeded_students) and qr_cards_dir.exists():
+    # database holds nothing but the demo roster. This avoids creating students from
+    # generated QR action files, and skips the directory scan on a real school.
+    if session.scalar(select(func.count()).select_from(Student)) <= len(demo_keys) and qr_cards_dir.exists():
+        card_students: dict[StudentKey, tuple[str, str, None, int]] = {}
         for file_path in sorted(qr_cards_dir.glob("*.png")):
             parsed = _parse_student_card_filename(file_path.name)
             if not parsed:
                 continue
             name, class_name = parsed
-            key = (name.lower(), class_name.lower())
-            if key in seeded_students:
-                continue
-            student = _ensure_student(session, name, class_name, None, 0)
-            seeded_students[key] = student
-            _ensure_user(session, name, "student", existing_usernames, student_id=student.id)
-
-    teachers_by_username: dict[str, Teacher] = {}
-    for name, gender, username, role, class_names in DEMO_TEACHERS:
-        teacher = _ensure_teacher(session, name, gender)
-        teachers_by_username[username] = teacher
-        _ensure_user(session, username, role, existing_usernames, teacher_id=teacher.id)
-        for class_name in class_names:
-            _ensure_teacher_class(session, teacher.id, class_name)
-
-    rewards = [_ensure_reward(session, *reward_data) for reward_data in DEMO_REWARDS]
-    session.flush()
-
-    if session.scalar(select(func.count()).select_from(Activity)) == 0:
-        hassan = teachers_by_username.get("hassan")
-        aishah = teachers_by_username.get("aishah")
-        sample_activities = [
-            ("Ali Karim", "1 Bestari", hassan, "Discipline", 20, "Picked up trash after assembly"),
-            ("Fatimah Zahra", "1 Bestari", hassan, "Leadership", 30, "Led group project presentation"),
-            ("Muhammad Fariz", "1 Bestari", hassan, "Academics", 25, "Completed homework early"),
-            ("Afiq Haziq", "1 Bestari", hassan, "Sports", 15, "Helped team during training"),
-            ("Siti Nabila", "2 Amanah", aishah, "Academic", 40, "Top scorer in mathematics test"),
-            ("Aqil Danish", "3 Cemerlang", aishah, "Volunteerism", 20, "Helped arrange classroom materials"),
-        ]
-        for name, class_name, teacher, category, points, reason in sample_activities:
-            student = _get_student(session, name, class_name)
-            if student is not None:
-                session.add(
-                    Activity(
-                        student_id=student.id,
-                        teacher_id=teacher.id if teacher else None,
-                        category=category,
-                        points=points,
-                        reason=reason,
-                        created_at=datetime(2025, 7, 13, 13, 58, 28),
-                    )
-                )
-        if rewards:
-            ali = _get_student(session, "Ali Karim", "1 Bestari")
-            if ali is not None:
-                session.add(
-                    Redemption(
-                        student_id=ali.id,
-                        reward_id=rewards[0].id,
-                        status="approved",
-                        created_at=datetime(2025, 7, 15, 9, 30, 0),
-                    )
+            key = _student_key(name, class_name)
+            if key not in demo_keys:
+                card_students.setdefault(key, (name, class_name, None, 0))
+        if card_students:
+            student_ids.update(_upsert_students(session, list(card_students.values())))
+            accounts.extend(
+                (name, "student", student_ids[key], None, True)
+                for key, (name, _class_name, _gender, _points) in card_students.items()
+            )
+
+    teacher_ids = _upsert_teachers(session, [(name, gender) for name, gender, *_rest in DEMO_TEACHERS])
+    teachers_by_username = {username: teacher_ids[name.lower()] for name, _gender, username, *_rest in DEMO_TEACHERS}
+    accounts.extend(
+        (username, role, None, teacher_ids[name.lower()], True)
+        for name, _gender, username, role, _classes in DEMO_TEACHERS
+    )
+    _upsert_users(session, accounts, DEFAULT_PASSWORD)
+    _ensure_teacher_classes(
+        session,
+        [
+            (teacher_ids[name.lower()], class_name)
+            for name, _gender, _username, _role, class_names in DEMO_TEACHERS
+            for class_name in class_names
+        ],
+    )
+    reward_ids = _upsert_rewards(session, DEMO_REWARDS)
+
+    if session.scalar(select(Activity.id).limit(1)) is None:
+        session.execute(
+            insert(activities),
+            [
+                {
+                    "student_id": student_ids[_student_key(name, class_name)],
+                    "teacher_id": teachers_by_username.get(username),
+                    "category": category,
+                    "points": points,
+                    "reason": reason,
+                    "created_at": datetime(2025, 7, 13, 13, 58, 28),
+                }
+                for name, class_name, username, category, points, reason in SAMPLE_ACTIVITIES
+                if _student_key(name, class_name) in student_ids
+            ],
+        )
+        ali_id = student_ids.get(_student_key("Ali Karim", "1 Bestari"))
+        first_reward_id = reward_ids.get(DEMO_REWARDS[0][0].lower()) if DEMO_REWARDS else None
+        if ali_id is not None and first_reward_id is not None:
+            session.execute(
+                insert(redemptions).values(
+                    student_id=ali_id,
+                    reward_id=first_reward_id,
+                    status="approved",
+                    charged_points=DEMO_REWARDS[0][2],
+                    created_at=datetime(2025, 7, 15, 9, 30, 0),
                 )
+            )
+        rebuild_rollups(session.connection())
     session.commit()
 
 
 def recalc_student_points(session: Session, student_id: int) -> int:
-    session.flush()
-    earned = session.scalar(
-        select(func.coalesce(func.sum(Activity.points), 0)).where(Activity.student_id == student_id)
-    )
-    spent = session.scalar(
-        select(func.coalesce(func.sum(Reward.cost), 0))
-        .select_from(Redemption)
-        .join(Reward, Reward.id == Redemption.reward_id)
-        .where(Redemption.student_id == student_id, Redemption.status == "approved")
-    )
-    total = int(earned or 0) - int(spent or 0)
-    student = session.get(Student, student_id)
-    if student:
-        student.total_points = total
-        session.flush()
-    return total
+    rebuild_student_balances(session, [student_id])
+    return get_live_points(session, student_id)
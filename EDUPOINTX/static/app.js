@@ -6,7 +6,8 @@ function isValidUser(user) {
     typeof user === "object" &&
     typeof user.username === "string" &&
     typeof user.role === "string" &&
-    ["student", "teacher", "admin"].includes(user.role)
+    ["student", "teacher", "admin"].includes(user.role) &&
+    (user.role === "student" || typeof user.token === "string")
   );
 }
 
@@ -34,9 +35,17 @@ const state = {
   teacherClass: null,
   adminClass: null,
   adminRedemptionStatus: "pending",
+  adminRedemptionPage: 1,
+  insightPeriod: "all",
 };
 
 const deedCategories = ["Discipline", "Academics", "Sports", "Leadership", "Other"];
+const insightPeriods = [
+  { id: "all", label: "All time" },
+  { id: "week", label: "Last 7 days" },
+  { id: "month", label: "Last 30 days" },
+  { id: "term", label: "This term" },
+];
 
 function escapeHtml(value) {
   return String(value ?? "")
@@ -46,13 +55,21 @@ function escapeHtml(value) {
     .replaceAll('"', "&quot;");
 }
 
+function authHeaders() {
+  return state.user?.token ? { Authorization: `Bearer ${state.user.token}` } : {};
+}
+
 async function api(path, options = {}) {
   const response = await fetch(path, {
-    headers: { "Content-Type": "application/json" },
+    headers: { "Content-Type": "application/json", ...authHeaders() },
     ...options,
   });
   const text = await response.text();
   const data = text ? JSON.parse(text) : {};
+  if (response.status === 401 && state.user?.token) {
+    logout();
+    throw new Error(data.detail || "Session expired. Please log in again.");
+  }
   if (!response.ok) throw new Error(data.detail || "Something went wrong.");
   return data;
 }
@@ -63,12 +80,69 @@ function setUser(user) {
 }
 
 function logout() {
+  disconnectLiveEvents();
   state.user = null;
   localStorage.removeItem("edupointx-user");
   state.page = "welcome";
   render();
 }
 
+const LIVE_EVENT_TYPES = ["points_awarded", "redemption_requested", "redemptions_decided", "stock_changed", "resync"];
+let liveEvents = null;
+let liveRefreshTimer = null;
+
+function connectLiveEvents(className) {
+  if (!("EventSource" in window)) return;
+  // EventSource cannot send an Authorization header, so the token rides in the query string.
+  const params = new URLSearchParams();
+  if (className) params.set("class_name", className);
+  if (state.user?.token) params.set("token", state.user.token);
+  const query = params.toString();
+  const path = query ? `/api/events?${query}` : "/api/events";
+  if (liveEvents && liveEvents.path === path) return;
+  disconnectLiveEvents();
+  liveEvents = new EventSource(path);
+  liveEvents.path = path;
+  LIVE_EVENT_TYPES.forEach((type) => liveEvents.addEventListener(type, scheduleLiveRefresh));
+}
+
+function disconnectLiveEvents() {
+  clearTimeout(liveRefreshTimer);
+  liveEvents?.close();
+  liveEvents = null;
+}
+
+function scheduleLiveRefresh() {
+  // Bursts of events (a whole class being awarded) collapse into one refresh.
+  clearTimeout(liveRefreshTimer);
+  liveRefreshTimer = setTimeout(refreshLiveView, 1000);
+}
+
+function isEditing(root) {
+  if (!root) return false;
+  const active = document.activeElement;
+  if (active && root.contains(active) && active.matches("input, select, textarea")) return true;
+  return Array.from(root.querySelectorAll("input[type='checkbox']")).some((box) => box.checked);
+}
+
+async function refreshLiveView() {
+  if (!state.user) return;
+  // Never redraw under someone who is typing or has ticked items.
+  if (isEditing(appRoot)) {
+    scheduleLiveRefresh();
+    return;
+  }
+  try {
+    if (state.user.role === "student" || !["add", "qr"].includes(state.teacherTab)) {
+      await render();
+    } else if (document.getElementById("adminArea")) {
+      await renderAdminArea();
+    }
+  } catch (_error) {
+    // The next event or user action will retry.
+  }
+}
+
 function setPage(page) {
   state.page = page;
   render();
@@ -169,6 +243,19 @@ async function loadClasses() {
   }
 }
 
+function renderPeriodSelect() {
+  return `<select data-insight-period>${insightPeriods.map((period) => `<option value="${period.id}" ${period.id === state.insightPeriod ? "selected" : ""}>${period.label}</option>`).join("")}</select>`;
+}
+
+function bindPeriodSelect(root, rerender) {
+  root.querySelectorAll("[data-insight-period]").forEach((select) => {
+    select.addEventListener("change", async (event) => {
+      state.insightPeriod = event.target.value;
+      await rerender();
+    });
+  });
+}
+
 function renderTabs(items, active, prefix) {
   return `<div class="tabs">${items
     .map(
@@ -316,6 +403,50 @@ function renderSignup() {
   document.getElementById("backButton").addEventListener("click", () => setPage("select_role_signup"));
 }
 
+function renderRedemptionRows(rows) {
+  return rows
+    .map((row) => `<tr><td>${escapeHtml(row.reward)}</td><td>${escapeHtml(row.status)}</td><td>${escapeHtml(
+      new Date(row.date).toLocaleString()
+    )}</td></tr>`)
+    .join("");
+}
+
+function renderActivityRows(rows) {
+  return rows
+    .map((row) => `<tr><td>${escapeHtml(row.category)}</td><td>${escapeHtml(row.reason)}</td><td>${row.points}</td><td>${escapeHtml(
+      new Date(row.date).toLocaleString()
+    )}</td></tr>`)
+    .join("");
+}
+
+function renderLoadMore(kind, cursor) {
+  if (!cursor) return "";
+  return `<button data-load-more="${kind}" data-cursor="${escapeHtml(cursor)}">Load more</button>`;
+}
+
+function bindLoadMore(studentId) {
+  document.querySelectorAll("[data-load-more]").forEach((button) => {
+    button.addEventListener("click", async () => {
+      const kind = button.dataset.loadMore;
+      button.disabled = true;
+      try {
+        const page = await api(`/api/students/${studentId}/${kind}?cursor=${encodeURIComponent(button.dataset.cursor)}`);
+        const body = document.getElementById(kind === "activities" ? "activityRows" : "redemptionRows");
+        body.insertAdjacentHTML("beforeend", kind === "activities" ? renderActivityRows(page.items) : renderRedemptionRows(page.items));
+        if (page.next_cursor) {
+          button.dataset.cursor = page.next_cursor;
+          button.disabled = false;
+        } else {
+          button.remove();
+        }
+      } catch (error) {
+        button.disabled = false;
+        showActionError(error);
+      }
+    });
+  });
+}
+
 function renderStudentSection(data) {
   if (state.studentTab === "info") {
     return `<div class="card-grid">
@@ -342,19 +473,11 @@ function renderStudentSection(data) {
       .join("")}</div>${message("", "")}</article>`;
   }
   if (state.studentTab === "transactions") {
-    return `<article class="card"><h4>Redemption History</h4>${data.redemptions.length ? `<table class="table"><thead><tr><th>Reward</th><th>Status</th><th>Date</th></tr></thead><tbody>${data.redemptions
-      .map((row) => `<tr><td>${escapeHtml(row.reward)}</td><td>${escapeHtml(row.status)}</td><td>${escapeHtml(
-        new Date(row.date).toLocaleString()
-      )}</td></tr>`)
-      .join("")}</tbody></table>` : `<p class="meta">No redemptions yet.</p>`}</article>`;
+    return `<article class="card"><h4>Redemption History</h4>${data.redemptions.length ? `<table class="table"><thead><tr><th>Reward</th><th>Status</th><th>Date</th></tr></thead><tbody id="redemptionRows">${renderRedemptionRows(data.redemptions)}</tbody></table>${renderLoadMore("redemptions", data.redemptions_next_cursor)}` : `<p class="meta">No redemptions yet.</p>`}</article>`;
   }
   if (state.studentTab === "activities") {
     return `<div class="card-grid">
-      <article class="card"><h4>Activity Log</h4>${data.activities.length ? `<table class="table"><thead><tr><th>Category</th><th>Reason</th><th>Points</th><th>Date</th></tr></thead><tbody>${data.activities
-        .map((row) => `<tr><td>${escapeHtml(row.category)}</td><td>${escapeHtml(row.reason)}</td><td>${row.points}</td><td>${escapeHtml(
-          new Date(row.date).toLocaleString()
-        )}</td></tr>`)
-        .join("")}</tbody></table>` : `<p class="meta">No activity records yet.</p>`}</article>
+      <article class="card"><h4>Activity Log</h4>${data.activities.length ? `<table class="table"><thead><tr><th>Category</th><th>Reason</th><th>Points</th><th>Date</th></tr></thead><tbody id="activityRows">${renderActivityRows(data.activities)}</tbody></table>${renderLoadMore("activities", data.activities_next_cursor)}` : `<p class="meta">No activity records yet.</p>`}</article>
       <article class="card"><h4>Point Trend</h4>${renderLine(data.trend, "points")}</article>
     </div>`;
   }
@@ -377,6 +500,7 @@ function renderStudentSection(data) {
 
 async function renderStudentDashboard() {
   const data = await api(`/api/students/${state.user.student_id}/dashboard`);
+  connectLiveEvents(data.student.class_name);
   appRoot.innerHTML = `
     <div class="dashboard-top">
       <div>
@@ -400,6 +524,7 @@ async function renderStudentDashboard() {
     ${renderStudentSection(data)}
   `;
   document.getElementById("logoutButton").addEventListener("click", logout);
+  bindLoadMore(state.user.student_id);
   bindTabs("student", (value) => {
     state.studentTab = value;
   });
@@ -455,6 +580,15 @@ function renderTeacherTab(data) {
           ${message("", "")}
         </form>
       </article>
+      <article class="card">
+        <h4>Upload Awards CSV</h4>
+        <p class="meta">Columns: student_id (or name and class_name), category, points, reason.</p>
+        <form class="stack" id="awardCsvForm">
+          <label>CSV file<input type="file" name="file" accept=".csv,text/csv" required /></label>
+          <button type="submit">Upload Awards</button>
+          ${message("", "")}
+        </form>
+      </article>
       <article class="card">
         <h4>Students in ${escapeHtml(data.class_name)}</h4>
         <div class="list">${data.students
@@ -472,15 +606,30 @@ function renderTeacherTab(data) {
         ${message("", "")}
       </form>
       <div id="qrStudentResult"></div>
+    </article>
+    <article class="card">
+      <h4>Scan a Group of Cards</h4>
+      <form class="stack" id="qrBatchForm">
+        <label>Upload photo(s) of QR cards<input type="file" name="files" accept=".png,.jpg,.jpeg" multiple required /></label>
+        <label>Deed Category<select name="category">${deedCategories
+          .map((category) => `<option value="${escapeHtml(category)}">${escapeHtml(category)}</option>`)
+          .join("")}</select></label>
+        <label>Reason / Description<input name="reason" required /></label>
+        <label>Point Reward<input name="points" type="number" min="1" max="100" value="10" required /></label>
+        <button type="submit">Scan and Add Points</button>
+        ${message("", "")}
+      </form>
     </article>`;
   }
   if (state.teacherTab === "insights") {
     return `<article class="card"><h4>Class Performance Insights</h4>${renderBars(data.class_points, "name", "points")}</article>`;
   }
   if (state.teacherTab === "categories") {
-    return `<article class="card"><h4>Top Categories</h4>${data.categories.length ? `<table class="table"><thead><tr><th>Category</th><th>Activity Count</th><th>Total Points</th></tr></thead><tbody>${data.categories
+    return `<div class="inline-actions">${renderPeriodSelect()}</div>
+    <article class="card"><h4>Points Per Day</h4>${renderLine(data.daily_points, "points")}</article>
+    <article class="card"><h4>Top Categories</h4>${data.categories.length ? `<table class="table"><thead><tr><th>Category</th><th>Activity Count</th><th>Total Points</th></tr></thead><tbody>${data.categories
       .map((item) => `<tr><td>${escapeHtml(item.category)}</td><td>${item.count}</td><td>${item.total_points}</td></tr>`)
-      .join("")}</tbody></table>` : `<p class="meta">No data yet for this class.</p>`}</article>`;
+      .join("")}</tbody></table>` : `<p class="meta">No data for this class in this period.</p>`}</article>`;
   }
   return `<div class="card-grid">
     <article class="card"><h4>Top 3 Students</h4>${renderBars(data.top3, "student_name", "live_points")}</article>
@@ -496,7 +645,8 @@ async function renderTeacherDashboard() {
     return;
   }
   if (!state.teacherClass || !classes.includes(state.teacherClass)) state.teacherClass = classes[0];
-  const data = await api(`/api/teachers/${state.user.teacher_id}/dashboard?class_name=${encodeURIComponent(state.teacherClass)}`);
+  const data = await api(`/api/teachers/${state.user.teacher_id}/dashboard?class_name=${encodeURIComponent(state.teacherClass)}&period=${state.insightPeriod}`);
+  connectLiveEvents(state.user.role === "admin" ? null : state.teacherClass);
   appRoot.innerHTML = `
     <div class="dashboard-top">
       <div>
@@ -530,6 +680,7 @@ async function renderTeacherDashboard() {
   bindTabs("teacher", (value) => {
     state.teacherTab = value;
   });
+  bindPeriodSelect(appRoot, render);
   const addForm = document.getElementById("teacherAddForm");
   if (addForm) {
     const studentCheckboxes = Array.from(addForm.querySelectorAll("[name='student_ids']"));
@@ -572,6 +723,29 @@ async function renderTeacherDashboard() {
       }
     });
   }
+  const awardCsvForm = document.getElementById("awardCsvForm");
+  if (awardCsvForm) {
+    awardCsvForm.addEventListener("submit", async (event) => {
+      event.preventDefault();
+      try {
+        const response = await fetch(`/api/teachers/${state.user.teacher_id}/activities/csv`, {
+          method: "POST",
+          headers: authHeaders(),
+          body: new FormData(awardCsvForm),
+        });
+        const data = await response.json();
+        if (!response.ok) {
+          const rows = (data.errors || []).slice(0, 5).map((item) => `row ${item.row}: ${item.error}`);
+          throw new Error([data.detail || "Unable to upload awards.", ...rows].join(" "));
+        }
+        showActionSuccess(data, "Awards uploaded successfully.");
+        await render();
+      } catch (error) {
+        awardCsvForm.querySelector(".message").outerHTML = message(error.message, "error");
+        showActionError(error);
+      }
+    });
+  }
   const qrUploadForm = document.getElementById("qrUploadForm");
   if (qrUploadForm) {
     qrUploadForm.addEventListener("submit", async (event) => {
@@ -673,6 +847,28 @@ async function renderTeacherDashboard() {
       }
     });
   }
+  const qrBatchForm = document.getElementById("qrBatchForm");
+  if (qrBatchForm) {
+    qrBatchForm.addEventListener("submit", async (event) => {
+      event.preventDefault();
+      try {
+        const response = await fetch(`/api/teachers/${state.user.teacher_id}/qr/scan-batch`, {
+          method: "POST",
+          headers: authHeaders(),
+          body: new FormData(qrBatchForm),
+        });
+        const data = await response.json();
+        if (!response.ok) throw new Error(data.detail || "Unable to scan QR images.");
+        const names = data.students.map((student) => student.name).join(", ");
+        const unknown = data.unknown_student_ids.length ? ` Unknown ID(s): ${data.unknown_student_ids.join(", ")}.` : "";
+        showActionSuccess({ message: `${data.message} ${names}.${unknown}` }, "Points added successfully.");
+        await render();
+      } catch (error) {
+        qrBatchForm.querySelector(".message").outerHTML = message(error.message, "error");
+        showActionError(error, "QR scan failed.");
+      }
+    });
+  }
   if (state.user.role === "admin") await renderAdminArea();
 }
 
@@ -684,11 +880,12 @@ function adminTabs() {
     { id: "stock-approvals", label: "Stock Approvals" },
     { id: "point-transactions", label: "Point Transactions" },
     { id: "redemption-insights", label: "Redemption Insights" },
+    { id: "roster", label: "Roster, Exports & Terms" },
     { id: "reset-password", label: "Reset Password" },
   ];
 }
 
-function renderAdminContent(data) {
+function renderAdminContent(data, terms) {
   if (state.adminTab === "class-view") {
     return `<div class="card-grid">
       <article class="card"><h4>Students in Class</h4>${data.class_view.students.length ? `<table class="table"><thead><tr><th>ID</th><th>Name</th><th>Points</th></tr></thead><tbody>${data.class_view.students.map((student) => `<tr><td>${student.id}</td><td>${escapeHtml(student.name)}</td><td>${student.points}</td></tr>`).join("")}</tbody></table>` : `<p class="meta">No students found in this class.</p>`}</article>
@@ -740,7 +937,7 @@ function renderAdminContent(data) {
       </div>
       ${data.redemptions.length ? `<table class="table"><thead><tr><th>Student</th><th>Class</th><th>Pts</th><th>Reward</th><th>Cost</th><th>Stock</th><th>Status</th><th>Date</th><th>Decision</th></tr></thead><tbody>${data.redemptions.map((row) => `<tr>
         <td>${escapeHtml(row.student_name)}</td><td>${escapeHtml(row.class_name)}</td><td>${row.points}</td><td>${escapeHtml(row.reward_name)}</td><td>${row.cost}</td><td>${row.stock}</td><td>${escapeHtml(row.status)}</td><td>${escapeHtml(new Date(row.date).toLocaleString())}</td><td><select data-redemption-decision="${row.id}"><option value="">-</option><option value="Approve">Approve</option><option value="Reject">Reject</option></select></td>
-      </tr>`).join("")}</tbody></table><button id="applyRedemptionDecisions">Apply Decisions</button>` : `<p class="meta">No ${escapeHtml(state.adminRedemptionStatus)} requests.</p>`}
+      </tr>`).join("")}</tbody></table>${renderRedemptionPager(data.redemption_page)}<button id="applyRedemptionDecisions">Apply Decisions</button>` : `<p class="meta">No ${escapeHtml(state.adminRedemptionStatus)} requests.</p>`}
     </article>`;
   }
   if (state.adminTab === "point-transactions") {
@@ -752,13 +949,52 @@ function renderAdminContent(data) {
     </article>`;
   }
   if (state.adminTab === "redemption-insights") {
-    return `<div class="card-grid">
+    return `<div class="inline-actions">${renderPeriodSelect()}</div>
+    <div class="card-grid">
       <article class="card"><h4>Status Counts</h4>${renderBars(data.redemption_insights.status_counts, "status", "count")}<p class="meta">Total Points Spent: ${data.redemption_insights.total_spent}</p></article>
       <article class="card"><h4>Approved Redemptions Over Time</h4>${renderLine(data.redemption_insights.timeline, "count")}</article>
       <article class="card"><h4>Top Rewards</h4>${renderBars(data.redemption_insights.top_rewards, "name", "count")}</article>
       <article class="card"><h4>Top Students</h4>${renderBars(data.redemption_insights.top_students, "name", "spent")}</article>
     </div>`;
   }
+  if (state.adminTab === "roster") {
+    return `<div class="card-grid">
+      <article class="card">
+        <h4>Import Student Roster</h4>
+        <p class="meta">Columns: name, class_name, optional gender and username. Existing students are skipped; new accounts start on password123.</p>
+        <form class="stack" id="rosterImportForm">
+          <label>CSV file<input type="file" name="file" accept=".csv,text/csv" required /></label>
+          <button type="submit">Import Roster</button>
+          ${message("", "")}
+        </form>
+      </article>
+      <article class="card">
+        <h4>Export Data</h4>
+        <form class="stack" id="exportForm">
+          <label>Export<select name="kind"><option value="activities">Activities</option><option value="redemptions">Redemptions</option><option value="balances">Balances</option></select></label>
+          <label><input type="checkbox" name="classOnly" /> Only ${escapeHtml(state.adminClass || "")}</label>
+          <label>From<input type="date" name="start" /></label>
+          <label>To<input type="date" name="end" /></label>
+          <button type="submit">Download CSV</button>
+          ${message("", "")}
+        </form>
+      </article>
+      <article class="card">
+        <h4>Close Term</h4>
+        <p class="meta">Moves activities and decided redemptions up to the last day into the archive. Balances carry forward and history stays viewable.</p>
+        ${terms && terms.length ? `<div class="list">${terms.map((term) => `<div class="list-item">
+          <div class="row"><strong>${escapeHtml(term.name)}</strong><span class="pill">${escapeHtml(term.start_date || "...")} to ${escapeHtml(term.end_date)}</span></div>
+          <p class="meta">${term.activities} activities, ${term.redemptions} redemptions archived</p>
+        </div>`).join("")}</div>` : `<p class="meta">No terms closed yet.</p>`}
+        <form class="stack" id="termCloseForm">
+          <label>Term Name<input name="name" maxlength="50" required /></label>
+          <label>Last Day<input type="date" name="end_date" required /></label>
+          <button type="submit">Close Term</button>
+          ${message("", "")}
+        </form>
+      </article>
+    </div>`;
+  }
   return `<article class="card">
     <h4>Reset User Password</h4>
     <form class="stack" id="resetPasswordForm">
@@ -769,8 +1005,19 @@ function renderAdminContent(data) {
   </article>`;
 }
 
+function renderRedemptionPager(page) {
+  const pages = Math.max(Math.ceil(page.total / page.page_size), 1);
+  if (pages <= 1) return "";
+  return `<div class="inline-actions">
+    <button data-redemption-page="${page.page - 1}" ${page.page <= 1 ? "disabled" : ""}>Previous</button>
+    <span class="meta">Page ${page.page} of ${pages} (${page.total} requests)</span>
+    <button data-redemption-page="${page.page + 1}" ${page.page >= pages ? "disabled" : ""}>Next</button>
+  </div>`;
+}
+
 async function renderAdminArea() {
-  const data = await api(`/api/admin/dashboard?class_name=${encodeURIComponent(state.adminClass || state.teacherClass || "")}&redemption_status=${encodeURIComponent(state.adminRedemptionStatus)}`);
+  const terms = state.adminTab === "roster" ? (await api("/api/admin/terms")).terms : null;
+  const data = await api(`/api/admin/dashboard?class_name=${encodeURIComponent(state.adminClass || state.teacherClass || "")}&redemption_status=${encodeURIComponent(state.adminRedemptionStatus)}&redemption_page=${state.adminRedemptionPage}&period=${state.insightPeriod}`);
   if (!state.adminClass) state.adminClass = data.selected_class;
   const adminArea = document.getElementById("adminArea");
   adminArea.innerHTML = `
@@ -780,14 +1027,16 @@ async function renderAdminArea() {
         <select id="adminClass">${data.classes.map((className) => `<option value="${escapeHtml(className)}" ${className === data.selected_class ? "selected" : ""}>${escapeHtml(className)}</option>`).join("")}</select>
       </div>
       ${renderTabs(adminTabs(), state.adminTab, "admin")}
-      ${renderAdminContent(data)}
+      ${renderAdminContent(data, terms)}
     </section>
   `;
   bindTabs("admin", (value) => {
     state.adminTab = value;
   });
+  bindPeriodSelect(adminArea, renderAdminArea);
   document.getElementById("adminClass")?.addEventListener("change", async (event) => {
     state.adminClass = event.target.value;
+    state.adminRedemptionPage = 1;
     await renderAdminArea();
   });
   document.querySelectorAll("[data-assign-teacher]").forEach((button) => {
@@ -861,8 +1110,15 @@ async function renderAdminArea() {
   });
   document.getElementById("adminStatus")?.addEventListener("change", async (event) => {
     state.adminRedemptionStatus = event.target.value;
+    state.adminRedemptionPage = 1;
     await renderAdminArea();
   });
+  document.querySelectorAll("[data-redemption-page]").forEach((button) => {
+    button.addEventListener("click", async () => {
+      state.adminRedemptionPage = Number(button.dataset.redemptionPage);
+      await renderAdminArea();
+    });
+  });
   document.getElementById("applyRedemptionDecisions")?.addEventListener("click", async () => {
     const items = Array.from(document.querySelectorAll("[data-redemption-decision]"))
       .map((select) => ({ id: Number(select.dataset.redemptionDecision), decision: select.value }))
@@ -879,6 +1135,67 @@ async function renderAdminArea() {
       showActionError(error);
     }
   });
+  document.getElementById("rosterImportForm")?.addEventListener("submit", async (event) => {
+    event.preventDefault();
+    try {
+      const response = await fetch("/api/admin/roster/import", {
+        method: "POST",
+        headers: authHeaders(),
+        body: new FormData(event.target),
+      });
+      const data = await response.json();
+      if (!response.ok) {
+        const rows = (data.errors || []).slice(0, 5).map((item) => `row ${item.row}: ${item.error}`);
+        throw new Error([data.detail || "Unable to import roster.", ...rows].join(" "));
+      }
+      event.target.querySelector(".message").outerHTML = message(data.message, "success");
+      showActionSuccess(data, "Roster imported successfully.");
+    } catch (error) {
+      event.target.querySelector(".message").outerHTML = message(error.message, "error");
+      showActionError(error);
+    }
+  });
+  document.getElementById("exportForm")?.addEventListener("submit", async (event) => {
+    event.preventDefault();
+    const formData = new FormData(event.target);
+    const params = new URLSearchParams();
+    if (formData.get("classOnly") && state.adminClass) params.set("class_name", state.adminClass);
+    if (formData.get("start")) params.set("start", formData.get("start"));
+    if (formData.get("end")) params.set("end", formData.get("end"));
+    const kind = formData.get("kind");
+    try {
+      const response = await fetch(`/api/admin/exports/${kind}.csv?${params}`, { headers: authHeaders() });
+      if (!response.ok) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.detail || "Unable to export data.");
+      }
+      const url = URL.createObjectURL(await response.blob());
+      const link = document.createElement("a");
+      link.href = url;
+      link.download = `edupointx-${kind}.csv`;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (error) {
+      event.target.querySelector(".message").outerHTML = message(error.message, "error");
+      showActionError(error);
+    }
+  });
+  document.getElementById("termCloseForm")?.addEventListener("submit", async (event) => {
+    event.preventDefault();
+    const formData = new FormData(event.target);
+    if (!window.confirm(`Close ${formData.get("name")} and archive history up to ${formData.get("end_date")}?`)) return;
+    try {
+      const result = await api("/api/admin/terms/close", {
+        method: "POST",
+        body: JSON.stringify({ name: formData.get("name"), end_date: formData.get("end_date") }),
+      });
+      showActionSuccess(result, "Term closed.");
+      await renderAdminArea();
+    } catch (error) {
+      event.target.querySelector(".message").outerHTML = message(error.message, "error");
+      showActionError(error);
+    }
+  });
   document.getElementById("resetPasswordForm")?.addEventListener("submit", async (event) => {
     event.preventDefault();
     const formData = new FormData(event.target);
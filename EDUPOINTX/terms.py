@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import argparse
+from datetime import date, timedelta
+
+from sqlalchemy import and_, delete, exists, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .history import _raw
+from .migrations import run_migrations
+from .models import (
+    Activity,
+    ArchivedActivity,
+    ArchivedRedemption,
+    OpeningBalance,
+    Redemption,
+    Student,
+    Term,
+)
+from .rollups import today
+
+
+activities = Activity.__table__
+redemptions = Redemption.__table__
+archived_activities = ArchivedActivity.__table__
+archived_redemptions = ArchivedRedemption.__table__
+opening_balances = OpeningBalance.__table__
+
+ACTIVITY_COLUMNS = ["id", "student_id", "teacher_id", "category", "points", "reason", "created_at"]
+REDEMPTION_COLUMNS = ["id", "student_id", "reward_id", "status", "charged_points", "created_at"]
+
+
+class TermCloseError(ValueError):
+    pass
+
+
+def list_terms(session: Session) -> list[dict]:
+    archived = {
+        term_id: count
+        for term_id, count in session.execute(
+            select(ArchivedActivity.term_id, func.count()).group_by(ArchivedActivity.term_id)
+        )
+    }
+    archived_redemption_counts = {
+        term_id: count
+        for term_id, count in session.execute(
+            select(ArchivedRedemption.term_id, func.count()).group_by(ArchivedRedemption.term_id)
+        )
+    }
+    return [
+        {
+            "id": term.id,
+            "name": term.name,
+            "start_date": term.start_date.isoformat() if term.start_date else None,
+            "end_date": term.end_date.isoformat(),
+            "closed_at": term.closed_at.isoformat(),
+            "activities": int(archived.get(term.id, 0)),
+            "redemptions": int(archived_redemption_counts.get(term.id, 0)),
+        }
+        for term in session.scalars(select(Term).order_by(Term.end_date))
+    ]
+
+
+def _term_totals(student_id_column, term_id: int):
+    earned = (
+        select(func.coalesce(func.sum(archived_activities.c.points), 0))
+        .where(archived_activities.c.student_id == student_id_column, archived_activities.c.term_id == term_id)
+        .scalar_subquery()
+    )
+    spent = (
+        select(func.coalesce(func.sum(archived_redemptions.c.charged_points), 0))
+        .where(
+            archived_redemptions.c.student_id == student_id_column,
+            archived_redemptions.c.term_id == term_id,
+            archived_redemptions.c.status == "approved",
+        )
+        .scalar_subquery()
+    )
+    return earned, spent
+
+
+def close_term(session: Session, name: str, end_date: date) -> dict:
+    """Move history up to ``end_date`` into the archive tables and carry balances forward.
+
+    Activities and decided redemptions created on or before ``end_date`` move
+    under a new term; pending requests stay so they can still be decided.
+    Each student's opening balance grows by what was archived, so ledger
+    rebuilds no longer scan closed terms. Live balances and the daily rollups
+    are unchanged. The caller commits.
+    """
+    name = " ".join(name.split())
+    if not name:
+        raise TermCloseError("Term name is required.")
+    if len(name) > 50:
+        raise TermCloseError("Term name is too long.")
+    if end_date >= today():
+        raise TermCloseError("A term can only be closed after its last day.")
+    if session.scalar(select(Term.id).where(func.lower(Term.name) == name.lower())) is not None:
+        raise TermCloseError(f"A term named '{name}' already exists.")
+    previous = session.scalars(select(Term).order_by(Term.end_date.desc()).limit(1)).first()
+    if previous is not None and end_date <= previous.end_date:
+        raise TermCloseError(f"'{previous.name}' already closed history up to {previous.end_date.isoformat()}.")
+
+    # Compared as stored text, like the history cursors, so precision does not matter.
+    cutoff = (end_date + timedelta(days=1)).isoformat()
+    activity_filter = _raw(activities.c.created_at) < cutoff
+    redemption_filter = and_(_raw(redemptions.c.created_at) < cutoff, redemptions.c.status != "pending")
+    if previous is not None:
+        start_date = previous.end_date + timedelta(days=1)
+    else:
+        first = session.scalar(select(func.min(activities.c.created_at)).where(activity_filter))
+        start_date = first.date() if first else None
+    term = Term(name=name, start_date=start_date, end_date=end_date)
+    session.add(term)
+    session.flush()
+
+    moved_activities = session.execute(
+        insert(archived_activities).from_select(
+            [*ACTIVITY_COLUMNS, "term_id"],
+            select(*(activities.c[column] for column in ACTIVITY_COLUMNS), literal(term.id)).where(activity_filter),
+        )
+    ).rowcount
+    moved_redemptions = session.execute(
+        insert(archived_redemptions).from_select(
+            [*REDEMPTION_COLUMNS, "term_id"],
+            select(*(redemptions.c[column] for column in REDEMPTION_COLUMNS), literal(term.id)).where(
+                redemption_filter
+            ),
+        )
+    ).rowcount
+
+    earned, spent = _term_totals(opening_balances.c.student_id, term.id)
+    session.execute(
+        update(opening_balances).values(
+            term_id=term.id,
+            earned_points=opening_balances.c.earned_points + earned,
+            spent_points=opening_balances.c.spent_points + spent,
+        )
+    )
+    earned, spent = _term_totals(Student.id, term.id)
+    session.execute(
+        insert(opening_balances).from_select(
+            ["student_id", "term_id", "earned_points", "spent_points"],
+            select(Student.id, literal(term.id), earned, spent).where(
+                ~exists().where(opening_balances.c.student_id == Student.id)
+            ),
+        )
+    )
+
+    session.execute(delete(activities).where(activity_filter))
+    session.execute(delete(redemptions).where(redemption_filter))
+    return {
+        "id": term.id,
+        "name": term.name,
+        "start_date": start_date.isoformat() if start_date else None,
+        "end_date": end_date.isoformat(),
+        "activities": moved_activities,
+        "redemptions": moved_redemptions,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Close school terms and list the closed ones.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show closed terms and how many rows each archived")
+    close = commands.add_parser("close", help="archive history up to and including --end")
+    close.add_argument("name", help='for example "2025 Term 1"')
+    close.add_argument("--end", type=date.fromisoformat, required=True, help="last day of the term, YYYY-MM-DD")
+    args = parser.parse_args()
+
+    run_migrations()
+    with SessionLocal() as session:
+        if args.command == "list":
+            for term in list_terms(session):
+                print(
+                    f"{term['name']}: {term['start_date'] or '...'} to {term['end_date']}, "
+                    f"{term['activities']} activities and {term['redemptions']} redemptions archived"
+                )
+        else:
+            try:
+                closed = close_term(session, args.name, args.end)
+            except TermCloseError as exc:
+                parser.exit(1, f"{exc}\n")
+            session.commit()
+            print(
+                f"Closed {closed['name']}: archived {closed['activities']} activities "
+                f"and {closed['redemptions']} redemptions."
+            )
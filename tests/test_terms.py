@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from EDUPOINTX.migrations import run_migrations
+from EDUPOINTX.models import Activity, ArchivedActivity, ArchivedRedemption, Redemption, Reward, Student
+from EDUPOINTX.rollups import today
+from EDUPOINTX.terms import close_term
+
+
+def _days_ago(days: int) -> datetime:
+    return datetime.combine(today() - timedelta(days=days), datetime.min.time())
+
+
+def _add_history(session: Session, student_id: int, reward_id: int, days: int) -> None:
+    session.add_all(
+        Activity(student_id=student_id, category="Merit", points=5, reason="Helped", created_at=_days_ago(days))
+        for _ in range(3)
+    )
+    session.add(
+        Redemption(
+            student_id=student_id, reward_id=reward_id, status="approved", charged_points=5, created_at=_days_ago(days)
+        )
+    )
+    session.commit()
+
+
+def test_closing_two_terms_in_a_row_does_not_reuse_archived_ids(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'terms.db'}")
+    run_migrations(engine)
+    with Session(engine) as session:
+        student = Student(name="Ali Karim", class_name="1 Bestari", total_points=0)
+        reward = Reward(name="Pencil", description="A pencil", cost=5, stock=10)
+        session.add_all([student, reward])
+        session.flush()
+
+        _add_history(session, student.id, reward.id, days=20)
+        close_term(session, "Term 1", today() - timedelta(days=15))
+        session.commit()
+
+        # The hot tables are empty now, so these rows would reuse ids 1-3 without AUTOINCREMENT.
+        _add_history(session, student.id, reward.id, days=10)
+        closed = close_term(session, "Term 2", today() - timedelta(days=5))
+        session.commit()
+
+        assert (closed["activities"], closed["redemptions"]) == (3, 1)
+        assert session.scalar(select(func.count(func.distinct(ArchivedActivity.id)))) == 6
+        assert session.scalar(select(func.count(func.distinct(ArchivedRedemption.id)))) == 2